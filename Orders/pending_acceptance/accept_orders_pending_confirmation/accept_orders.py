@@ -3,51 +3,41 @@ import sys
 import json
 import requests
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(project_root, '..', '..', '..'))
 from common.utils import get_best_buy_api_key
+from common.best_buy_client import get_best_buy_client
+from common.acceptance_ledger import AcceptanceLedger
+from common.order_store import open_order_store
+from common.order_snapshot import invalidate_cycle_snapshot
 
 # --- Configuration ---
 LOGS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'best_buy')
-PENDING_ACCEPTANCE_FILE = os.path.join(LOGS_DIR, 'pending_acceptance.json')
-ACCEPTED_LOG_FILE = os.path.join(LOGS_DIR, 'accepted_orders_log.json')
-JOURNAL_FILE = os.path.join(LOGS_DIR, 'order_acceptance_journal.json')
-BEST_BUY_ACCEPT_API_URL_BASE = 'https://marketplace.bestbuy.ca/api/orders'
+LEDGER_FILE = os.path.join(LOGS_DIR, 'order_acceptance_ledger.jsonl')
+# Maximum number of acceptance requests in flight at once. Set to 1 to accept orders one at a time.
+ACCEPT_CONCURRENCY = 8
 
 
-def get_orders_to_accept():
+def get_orders_to_accept(ledger=None, store=None):
     """ Identifies which orders need to be accepted. """
     print("INFO: Identifying orders that need to be accepted...")
 
-    if not os.path.exists(PENDING_ACCEPTANCE_FILE):
-        print("INFO: pending_acceptance.json not found. Assuming no orders to process.")
-        return []
-    with open(PENDING_ACCEPTANCE_FILE, 'r') as f:
-        try:
-            pending_orders = json.load(f)
-        except json.JSONDecodeError:
-            print("ERROR: pending_acceptance.json is corrupted.")
-            return []
+    if store is None:
+        with open_order_store() as store:
+            return get_orders_to_accept(ledger, store)
 
+    pending_orders = [row['order'] for row in store.select_orders('WAITING_ACCEPTANCE', accepted=False)]
     if not pending_orders:
-        print("INFO: pending_acceptance.json is empty. No orders to process.")
+        print("INFO: No unaccepted orders pending acceptance in the order store.")
         return []
 
-    if os.path.exists(ACCEPTED_LOG_FILE):
-        with open(ACCEPTED_LOG_FILE, 'r') as f:
-            try:
-                accepted_orders_log = json.load(f)
-            except json.JSONDecodeError:
-                print("WARNING: accepted_orders_log.json is corrupted. Starting fresh.")
-                accepted_orders_log = []
-    else:
-        accepted_orders_log = []
-        print("INFO: accepted_orders_log.json not found. A new file will be created.")
+    if ledger is None:
+        ledger = AcceptanceLedger(LEDGER_FILE)
 
-    accepted_order_ids = {entry['order_id'] for entry in accepted_orders_log}
-    orders_to_accept = [order for order in pending_orders if order['order_id'] not in accepted_order_ids]
+    orders_to_accept = [order for order in pending_orders if order['order_id'] not in ledger]
 
     if not orders_to_accept:
         print("INFO: No new orders to accept.")
@@ -63,12 +53,8 @@ def accept_order(api_key, order):
         return None
 
     order_id = order['order_id']
-    url = f"{BEST_BUY_ACCEPT_API_URL_BASE}/{order_id}/accept"
-
-    headers = {
-        'Authorization': api_key,
-        'Content-Type': 'application/json'
-    }
+    client = get_best_buy_client(api_key)
+    url = client.url(f"/orders/{order_id}/accept")
 
     order_lines_payload = []
     for line in order.get('order_lines', []):
@@ -85,7 +71,7 @@ def accept_order(api_key, order):
     print(f"INFO: Payload: {json.dumps(payload, indent=2)}")
 
     try:
-        response = requests.put(url, headers=headers, json=payload)
+        response = client.put(url, json=payload)
         response.raise_for_status()
         print(f"SUCCESS: API call for order {order_id} was successful with status code {response.status_code}.")
         if response.content:
@@ -94,59 +80,90 @@ def accept_order(api_key, order):
     except requests.exceptions.RequestException as e:
         print(f"ERROR: API request to accept order {order_id} failed: {e}")
         if e.response is not None:
-            return e.response.json()
+            try:
+                return {"error": str(e), "response": e.response.json()}
+            except ValueError:
+                return {"error": str(e), "response": e.response.text}
         return {"error": str(e)}
 
-def log_acceptance(order_id, api_response):
-    """ Logs the acceptance in the log and journal files. """
-    os.makedirs(LOGS_DIR, exist_ok=True)
-    timestamp = datetime.now().isoformat()
+def is_accepted(api_response):
+    """ True when an acceptance response is not one of the error responses built by accept_order(). """
+    return bool(api_response) and not (isinstance(api_response, dict) and 'error' in api_response)
 
-    print(f"INFO: Logging acceptance for order {order_id} in {ACCEPTED_LOG_FILE}...")
-    if os.path.exists(ACCEPTED_LOG_FILE):
-        with open(ACCEPTED_LOG_FILE, 'r') as f:
-            try:
-                log_data = json.load(f)
-            except json.JSONDecodeError:
-                log_data = []
-    else:
-        log_data = []
+def _accept_order_safely(api_key, order):
+    """ Runs accept_order() and turns any unexpected exception into an error response for that order. """
+    try:
+        return accept_order(api_key, order)
+    except Exception as e:
+        print(f"ERROR: Unexpected error while accepting order {order['order_id']}: {e}")
+        return {"error": str(e)}
 
-    log_data.append({"order_id": order_id, "timestamp": timestamp})
+def accept_orders_concurrently(api_key, orders, max_workers=ACCEPT_CONCURRENCY):
+    """
+    Accepts orders with at most `max_workers` requests in flight.
 
-    with open(ACCEPTED_LOG_FILE, 'w') as f:
-        json.dump(log_data, f, indent=4)
+    Returns (order_id, api_response) pairs in the same order as `orders`,
+    skipping orders for which accept_order() returned nothing.
+    """
+    if not orders:
+        return []
 
-    print(f"INFO: Logging API response for order {order_id} in {JOURNAL_FILE}...")
-    if os.path.exists(JOURNAL_FILE):
-        with open(JOURNAL_FILE, 'r') as f:
-            try:
-                journal_data = json.load(f)
-            except json.JSONDecodeError:
-                journal_data = []
-    else:
-        journal_data = []
+    max_workers = max(1, min(max_workers, len(orders)))
+    print(f"INFO: Accepting {len(orders)} orders with up to {max_workers} concurrent requests...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        responses = list(executor.map(lambda order: _accept_order_safely(api_key, order), orders))
+
+    return [(order['order_id'], api_response) for order, api_response in zip(orders, responses) if api_response]
 
-    journal_data.append({
-        "order_id": order_id,
-        "timestamp": timestamp,
-        "api_response": api_response
-    })
+def log_acceptances(results, ledger=None, store=None):
+    """
+    Commits a batch of (order_id, api_response) acceptance results to the ledger in one write.
+    Every attempt is logged, but only the orders the API accepted are marked accepted in the store.
+    """
+    if not results:
+        return
+    if ledger is None:
+        ledger = AcceptanceLedger(LEDGER_FILE)
 
-    with open(JOURNAL_FILE, 'w') as f:
-        json.dump(journal_data, f, indent=4)
+    timestamp = datetime.now().isoformat()
+    entries = [
+        {"order_id": order_id, "timestamp": timestamp, "api_response": api_response}
+        for order_id, api_response in results
+    ]
+    print(f"INFO: Logging {len(entries)} acceptances in {ledger.path}...")
+    ledger.append_batch(entries)
+
+    accepted_order_ids = [order_id for order_id, api_response in results if is_accepted(api_response)]
+    if not accepted_order_ids:
+        return
+    if store is not None:
+        store.mark_accepted(accepted_order_ids, timestamp)
+    else:
+        with open_order_store() as store:
+            store.mark_accepted(accepted_order_ids, timestamp)
 
 def main():
-    """ Main function to execute the script's logic. """
+    """
+    Main function to execute the script's logic. Returns the IDs of the orders the API accepted;
+    failed attempts are still logged in the ledger but are not returned.
+    """
     print("\n--- Starting Accept Orders Script ---")
+    results = []
     api_key = get_best_buy_api_key()
     if api_key:
-        orders_to_process = get_orders_to_accept()
-        for order in orders_to_process:
-            api_response = accept_order(api_key, order)
-            if api_response:
-                log_acceptance(order['order_id'], api_response)
+        ledger = AcceptanceLedger(LEDGER_FILE)
+        with open_order_store() as store:
+            orders_to_process = get_orders_to_accept(ledger, store)
+            results = accept_orders_concurrently(api_key, orders_to_process)
+            log_acceptances(results, ledger, store)
+    accepted_order_ids = [order_id for order_id, api_response in results if is_accepted(api_response)]
+    if accepted_order_ids:
+        # The accepted orders have left WAITING_ACCEPTANCE, so the cycle snapshot is stale for that state.
+        invalidate_cycle_snapshot('WAITING_ACCEPTANCE')
+    if len(accepted_order_ids) < len(results):
+        print(f"WARNING: {len(results) - len(accepted_order_ids)} acceptance request(s) failed.")
     print("--- Accept Orders Script Finished ---\n")
+    return accepted_order_ids
 
 if __name__ == '__main__':
     main()
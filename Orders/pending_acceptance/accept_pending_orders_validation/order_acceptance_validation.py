@@ -1,6 +1,5 @@
 import os
 import sys
-import json
 import requests
 from datetime import datetime
 
@@ -8,12 +7,15 @@ from datetime import datetime
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(project_root, '..', '..', '..'))
 from common.utils import get_best_buy_api_key
+from common.best_buy_client import get_best_buy_client
+from common.acceptance_ledger import AcceptanceLedger
+from common.order_snapshot import get_cycle_snapshot
+from common.segmented_log import get_segmented_log
 
 # --- Configuration ---
 LOGS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'best_buy')
-ACCEPTED_LOG_FILE = os.path.join(LOGS_DIR, 'accepted_orders_log.json')
+LEDGER_FILE = os.path.join(LOGS_DIR, 'order_acceptance_ledger.jsonl')
 FAILED_LOG_FILE = os.path.join(LOGS_DIR, 'failed_order_acceptances.json')
-BEST_BUY_API_URL = 'https://marketplace.bestbuy.ca/api/orders'
 
 
 def get_currently_pending_orders(api_key):
@@ -22,21 +24,22 @@ def get_currently_pending_orders(api_key):
         print("ERROR: API key is missing. Cannot retrieve orders.")
         return []
 
-    headers = {'Authorization': api_key}
     params = {'order_state_codes': 'WAITING_ACCEPTANCE'}
 
     print("INFO: Calling Best Buy API for a fresh list of pending orders for validation...")
     try:
-        response = requests.get(BEST_BUY_API_URL, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        print(f"SUCCESS: API reports {data.get('total_count', 0)} orders are currently pending acceptance.")
-        return data.get('orders', [])
+        snapshot = get_cycle_snapshot()
+        if snapshot is not None:
+            orders = snapshot.orders('WAITING_ACCEPTANCE', complete=True)
+        else:
+            orders = list(get_best_buy_client(api_key).iter_orders(params))
+        print(f"SUCCESS: API reports {len(orders)} orders are currently pending acceptance.")
+        return orders
     except requests.exceptions.RequestException as e:
         print(f"ERROR: API request failed during validation: {e}")
         return []
 
-def validate_acceptance():
+def validate_acceptance(ledger=None):
     """ Compares recently accepted orders with the current pending list to validate acceptance. """
     print("INFO: Starting order acceptance validation...")
     api_key = get_best_buy_api_key()
@@ -46,45 +49,26 @@ def validate_acceptance():
     currently_pending_orders_list = get_currently_pending_orders(api_key)
     currently_pending_ids = {order['order_id'] for order in currently_pending_orders_list}
 
-    accepted_log = []
-    if not os.path.exists(ACCEPTED_LOG_FILE):
-        print("INFO: accepted_orders_log.json not found. Assuming no orders have been accepted yet.")
-    else:
-        with open(ACCEPTED_LOG_FILE, 'r') as f:
-            try:
-                accepted_log = json.load(f)
-            except json.JSONDecodeError:
-                print("ERROR: accepted_orders_log.json is corrupted.")
-                return 'ERROR'
+    if ledger is None:
+        ledger = AcceptanceLedger(LEDGER_FILE)
+    if not len(ledger):
+        print("INFO: Acceptance ledger is empty. Assuming no orders have been accepted yet.")
 
-    accepted_log_ids = {entry['order_id'] for entry in accepted_log}
-    failed_acceptances = currently_pending_ids.intersection(accepted_log_ids)
+    failed_acceptances = {order_id for order_id in currently_pending_ids if order_id in ledger}
 
     if failed_acceptances:
         print(f"ERROR: Found {len(failed_acceptances)} orders that failed to be accepted.")
         print("Failed Order Numbers:", list(failed_acceptances))
 
-        os.makedirs(LOGS_DIR, exist_ok=True)
-        failed_log_entries = []
-        if os.path.exists(FAILED_LOG_FILE):
-            with open(FAILED_LOG_FILE, 'r') as f:
-                try:
-                    failed_log_entries = json.load(f)
-                except json.JSONDecodeError:
-                    pass
-
-        for order_id in failed_acceptances:
-            failed_log_entries.append({
-                "order_id": order_id,
-                "failure_timestamp": datetime.now().isoformat()
-            })
-
-        with open(FAILED_LOG_FILE, 'w') as f:
-            json.dump(failed_log_entries, f, indent=4)
+        failure_timestamp = datetime.now().isoformat()
+        get_segmented_log(FAILED_LOG_FILE, timestamp_key='failure_timestamp').append([
+            {"order_id": order_id, "failure_timestamp": failure_timestamp}
+            for order_id in failed_acceptances
+        ])
 
         return 'VALIDATION_FAILED'
 
-    new_unprocessed_orders = currently_pending_ids.difference(accepted_log_ids)
+    new_unprocessed_orders = currently_pending_ids.difference(failed_acceptances)
 
     if new_unprocessed_orders:
         print(f"INFO: Found {len(new_unprocessed_orders)} new pending orders that were not in the last run.")
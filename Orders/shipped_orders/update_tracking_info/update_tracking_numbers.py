@@ -1,33 +1,36 @@
 import os
 import sys
-import json
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Add project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(project_root, '..', '..', '..'))
 from common.utils import get_best_buy_api_key
+from common.best_buy_client import get_best_buy_client
+from common.order_store import open_order_store
+from common.segmented_log import get_segmented_log, segmented_log_dir
 
 # --- Configuration ---
 LOGS_DIR_BB = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'best_buy')
-LOGS_DIR_CP = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'canada_post')
 LOGS_DIR_CS = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'customer_service')
-CP_SHIPPING_DATA_FILE = os.path.join(LOGS_DIR_CP, 'cp_shipping_labels_data.json')
 BB_HISTORY_LOG_FILE = os.path.join(LOGS_DIR_BB, 'orders_shipped_and_validated.json')
 CUSTOMER_SERVICE_BB_HISTORY_LOG_FILE = os.path.join(LOGS_DIR_CS, 'orders_shipped_and_validated.json')
-BEST_BUY_API_URL_BASE = 'https://marketplace.bestbuy.ca/api/orders'
+
+# Failed tracking pushes are retried after TRACKING_PUSH_RETRY_BASE_SECONDS, doubling per attempt
+# up to TRACKING_PUSH_RETRY_MAX_SECONDS. After TRACKING_PUSH_MAX_ATTEMPTS the entry is left for manual review.
+TRACKING_PUSH_RETRY_BASE_SECONDS = 60
+TRACKING_PUSH_RETRY_MAX_SECONDS = 6 * 60 * 60
+TRACKING_PUSH_MAX_ATTEMPTS = 12
 
 
 def update_tracking_number(api_key, order_id, tracking_number):
     """ Updates the tracking number for a single order on Best Buy. """
-    url = f"{BEST_BUY_API_URL_BASE}/{order_id}/tracking"
-    headers = {'Authorization': api_key, 'Content-Type': 'application/json'}
     payload = {"carrier_code": "CPCL", "tracking_number": tracking_number}
 
     print(f"INFO: Updating tracking for order {order_id} with tracking number {tracking_number}...")
     try:
-        response = requests.put(url, headers=headers, json=payload)
+        response = get_best_buy_client(api_key).put(f"/orders/{order_id}/tracking", json=payload)
         response.raise_for_status()
         print(f"SUCCESS: Successfully updated tracking for order {order_id}.")
         return True
@@ -39,12 +42,9 @@ def update_tracking_number(api_key, order_id, tracking_number):
 
 def mark_order_as_shipped(api_key, order_id):
     """ Calls the Best Buy API to mark an order as shipped. """
-    url = f"{BEST_BUY_API_URL_BASE}/{order_id}/ship"
-    headers = {'Authorization': api_key}
-
     print(f"INFO: Marking order {order_id} as shipped...")
     try:
-        response = requests.put(url, headers=headers)
+        response = get_best_buy_client(api_key).put(f"/orders/{order_id}/ship")
         response.raise_for_status()
         print(f"SUCCESS: Successfully marked order {order_id} as shipped.")
         return True
@@ -54,81 +54,89 @@ def mark_order_as_shipped(api_key, order_id):
             print("Response:", e.response.text)
         return False
 
-def get_order_details(api_key, order_id):
-    """ Gets the full details for a single order ID. """
-    print(f"INFO: Getting full details for order {order_id}...")
-    params = {'order_ids': order_id}
-    headers = {'Authorization': api_key}
-
-    try:
-        response = requests.get(BEST_BUY_API_URL_BASE, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if data.get('orders'):
-            return data['orders'][0]
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"ERROR: Could not get order details for {order_id}: {e}")
-        return None
+def get_orders_details(api_key, order_ids):
+    """ Gets the full details for many order IDs with batched lookups, keyed by order ID. """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    print(f"INFO: Getting full details for {len(order_ids)} orders...")
+    details = get_best_buy_client(api_key).get_orders_by_ids(order_ids)
+    for order_id in order_ids:
+        if order_id not in details:
+            print(f"ERROR: Could not get order details for {order_id}.")
+    return details
 
 def log_bb_history(order_details_json):
-    """ Appends the full order details to the history logs. """
+    """ Appends the full order details (one order or a list of orders) to the history logs. """
     if not order_details_json:
         return
+    new_entries = order_details_json if isinstance(order_details_json, list) else [order_details_json]
 
     for log_path in [BB_HISTORY_LOG_FILE, CUSTOMER_SERVICE_BB_HISTORY_LOG_FILE]:
-        os.makedirs(os.path.dirname(log_path), exist_ok=True)
-        log_entries = []
-        if os.path.exists(log_path):
-            with open(log_path, 'r') as f:
-                try:
-                    log_entries = json.load(f)
-                except json.JSONDecodeError:
-                    log_entries = []
-        
-        log_entries.append(order_details_json)
-
-        with open(log_path, 'w') as f:
-            json.dump(log_entries, f, indent=4)
-        print(f"SUCCESS: Appended order details to {log_path}")
+        get_segmented_log(log_path, timestamp_key='last_updated_date').append(new_entries)
+        print(f"SUCCESS: Appended {len(new_entries)} order details to {segmented_log_dir(log_path)}")
+
+def tracking_push_retry_at(attempts, now=None):
+    """ Returns when to retry a push that has now failed `attempts` times, as an ISO timestamp. """
+    delay = min(TRACKING_PUSH_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), TRACKING_PUSH_RETRY_MAX_SECONDS)
+    return ((now or datetime.now()) + timedelta(seconds=delay)).isoformat()
+
+def push_tracking(api_key, store, entry):
+    """
+    Pushes one outbox entry: the tracking number first, then the ship call.
+    Returns True once both have succeeded; otherwise schedules a retry.
+    """
+    order_id, tracking_pin = entry['order_id'], entry['tracking_pin']
+    error = None
+    if not entry['tracking_updated']:
+        if update_tracking_number(api_key, order_id, tracking_pin):
+            store.mark_tracking_updated(order_id)
+        else:
+            error = "tracking update failed"
+
+    if error is None:
+        if mark_order_as_shipped(api_key, order_id):
+            store.mark_tracking_pushed([order_id])
+            return True
+        error = "ship call failed"
+
+    attempts = entry['attempts'] + 1
+    retry_at = tracking_push_retry_at(attempts)
+    store.record_tracking_push_failure(order_id, error, retry_at)
+    if attempts >= TRACKING_PUSH_MAX_ATTEMPTS:
+        print(f"CRITICAL WARNING: Tracking push for order {order_id} failed {attempts} times ({error}). Giving up; it needs manual review.")
+    else:
+        print(f"WARNING: Tracking push for order {order_id} failed ({error}). Retry {attempts} scheduled for {retry_at}.")
+    return False
 
 def main():
-    """ Main function to read shipping data and update tracking numbers. """
+    """
+    Main function to drain the tracking-push outbox: every labelled order is pushed once,
+    and failed pushes are retried with backoff. Returns the IDs of the orders marked as shipped.
+    """
     print("\n--- Starting Update Tracking Numbers Script ---")
 
     api_key = get_best_buy_api_key()
     if not api_key:
-        return
+        return []
 
-    if not os.path.exists(CP_SHIPPING_DATA_FILE):
-        print(f"INFO: {CP_SHIPPING_DATA_FILE} not found. No tracking numbers to update.")
-        return
-    
-    with open(CP_SHIPPING_DATA_FILE, 'r') as f:
-        try:
-            shipped_data = json.load(f)
-        except json.JSONDecodeError:
-            print(f"ERROR: {CP_SHIPPING_DATA_FILE} is corrupted.")
-            return
-
-    if not shipped_data:
-        print("INFO: No shipped data found to process.")
-        return
+    with open_order_store() as store:
+        due_entries = store.select_due_tracking_pushes(max_attempts=TRACKING_PUSH_MAX_ATTEMPTS)
 
-    for shipment in shipped_data:
-        order_id = shipment.get('order_id')
-        tracking_pin = shipment.get('tracking_pin')
-        
-        if order_id and tracking_pin:
-            if update_tracking_number(api_key, order_id, tracking_pin):
-                if mark_order_as_shipped(api_key, order_id):
-                    order_details = get_order_details(api_key, order_id)
-                    if order_details:
-                        log_bb_history(order_details)
-        else:
-            print(f"WARNING: Skipping shipment due to missing order_id or tracking_pin: {shipment}")
+        if not due_entries:
+            print("INFO: No tracking pushes are due.")
+            return []
+
+        print(f"INFO: {len(due_entries)} tracking pushes are due.")
+        shipped_order_ids = [entry['order_id'] for entry in due_entries if push_tracking(api_key, store, entry)]
+
+        orders_details = list(get_orders_details(api_key, shipped_order_ids).values())
+        if orders_details:
+            store.upsert_orders(orders_details)
+            log_bb_history(orders_details)
 
     print("--- Update Tracking Numbers Script Finished ---\n")
+    return shipped_order_ids
 
 if __name__ == '__main__':
     main()
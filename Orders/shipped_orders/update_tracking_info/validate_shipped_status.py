@@ -1,68 +1,87 @@
 import os
 import sys
 import json
-import requests
+from datetime import datetime, timedelta
 
 # Add project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(project_root, '..', '..', '..'))
 from common.utils import get_best_buy_api_key
+from common.best_buy_client import get_best_buy_client
+from common.order_store import open_order_store
 
 # --- Configuration ---
-LOGS_DIR_CP = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'canada_post')
-CP_SHIPPING_DATA_FILE = os.path.join(LOGS_DIR_CP, 'cp_shipping_labels_data.json')
-BEST_BUY_API_URL = 'https://marketplace.bestbuy.ca/api/orders'
+# Only orders whose tracking was pushed within this window are re-checked. Older unconfirmed
+# orders are counted in the summary as expired instead of being polled forever.
+VALIDATION_MAX_AGE = timedelta(days=7)
+# States that confirm the ship call went through.
+VALIDATED_STATES = ('SHIPPING', 'SHIPPED')
 
 
-def check_order_status(api_key, order_id):
-    """ Checks the status of a single order on Best Buy. """
-    params = {'order_ids': order_id}
-    headers = {'Authorization': api_key}
+def check_order_statuses(api_key, order_ids):
+    """ Checks the status of many orders on Best Buy with batched lookups. Returns {order_id: order_state}. """
+    orders = get_best_buy_client(api_key).get_orders_by_ids(order_ids)
+    return {order_id: order.get('order_state') for order_id, order in orders.items()}
 
-    try:
-        response = requests.get(BEST_BUY_API_URL, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if data.get('orders'):
-            return data['orders'][0].get('order_state')
-    except requests.exceptions.RequestException as e:
-        print(f"ERROR: Could not get status for order {order_id}: {e}")
-    return None
+def print_validation_summary(summary):
+    print("INFO: Shipped status validation summary:")
+    print(f"    Checked:     {summary['checked']}")
+    print(f"    Validated:   {summary['validated']}")
+    print(f"    Unconfirmed: {summary['unconfirmed']}")
+    print(f"    Expired (pushed more than {VALIDATION_MAX_AGE.days} days ago, no longer checked): {summary['expired']}")
 
-def main():
-    """ Main function to validate that orders have been marked as shipped. """
+def main(now=None):
+    """
+    Validates that recently pushed orders have been marked as shipped.
+    Returns a summary dict, which is also stored in the order store's metadata.
+    """
     print("\n--- Starting Validate Shipped Status Script ---")
 
     api_key = get_best_buy_api_key()
     if not api_key:
-        return
-    
-    if not os.path.exists(CP_SHIPPING_DATA_FILE):
-        print(f"INFO: {CP_SHIPPING_DATA_FILE} not found. No orders to validate.")
-        return
-    
-    with open(CP_SHIPPING_DATA_FILE, 'r') as f:
-        try:
-            shipped_data = json.load(f)
-        except json.JSONDecodeError:
-            print(f"ERROR: {CP_SHIPPING_DATA_FILE} is corrupted.")
-            return
+        return None
 
-    if not shipped_data:
-        print("INFO: No shipped data found to validate.")
-        return
-        
-    for shipment in shipped_data:
-        order_id = shipment.get('order_id')
-        if order_id:
-            print(f"INFO: Validating status for order {order_id}...")
-            status = check_order_status(api_key, order_id)
-            if status == 'SHIPPING' or status == 'SHIPPED':
-                print(f"SUCCESS: Order {order_id} is marked as {status}.")
-            else:
-                print(f"WARNING: Order {order_id} has status '{status}', not 'SHIPPING' or 'SHIPPED'.")
-            
+    now = now or datetime.now()
+    cutoff = (now - VALIDATION_MAX_AGE).isoformat()
+    with open_order_store() as store:
+        candidates = store.select_orders_to_validate(cutoff)
+        summary = {
+            "checked_at": now.isoformat(),
+            "checked": len(candidates),
+            "validated": 0,
+            "unconfirmed": 0,
+            "expired": store.count_unvalidated_before(cutoff),
+            "unconfirmed_orders": {},
+        }
+
+        if not candidates:
+            print("INFO: No shipped data found to validate.")
+        else:
+            order_ids = [candidate['order_id'] for candidate in candidates]
+            print(f"INFO: Validating status for {len(order_ids)} orders pushed since {cutoff}...")
+            statuses = check_order_statuses(api_key, order_ids)
+            store.record_validation_checks({order_id: statuses.get(order_id) for order_id in order_ids}, now.isoformat())
+
+            for candidate in candidates:
+                order_id = candidate['order_id']
+                status = statuses.get(order_id)
+                if status:
+                    store.update_order_state(order_id, status)
+                if status in VALIDATED_STATES:
+                    print(f"SUCCESS: Order {order_id} is marked as {status}.")
+                    store.mark_shipped_validated([order_id], now.isoformat())
+                    summary['validated'] += 1
+                else:
+                    print(f"WARNING: Order {order_id} has status '{status}', not 'SHIPPING' or 'SHIPPED' "
+                          f"(check {candidate['checks'] + 1}, pushed at {candidate['tracking_pushed_at']}).")
+                    summary['unconfirmed'] += 1
+                    summary['unconfirmed_orders'][order_id] = status
+
+        store.set_meta('last_shipped_validation_summary', json.dumps(summary))
+
+    print_validation_summary(summary)
     print("--- Validate Shipped Status Script Finished ---\n")
+    return summary
 
 if __name__ == '__main__':
     main()
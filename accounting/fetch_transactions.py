@@ -1,9 +1,11 @@
 import json
 import os
-import requests
+import sys
 from datetime import datetime, timedelta
 
-API_BASE_URL = "https://marketplace.bestbuy.ca/api"
+# Add project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.best_buy_client import get_best_buy_client
 
 def load_api_key(secret_file="secrets.txt"):
     """Loads the Best Buy API key from the secrets file."""
@@ -25,7 +27,7 @@ def get_transactions(api_key, date_from=None):
     """
     print("Connecting to Mirakl API to fetch accounting transactions...")
 
-    headers = {"Authorization": api_key}
+    client = get_best_buy_client(api_key)
 
     if not date_from:
         # Fetch transactions from the last 30 days by default.
@@ -42,7 +44,7 @@ def get_transactions(api_key, date_from=None):
         if next_page_token:
             params["page_token"] = next_page_token
 
-        response = requests.get(f"{API_BASE_URL}/sellerpayment/transactions_logs", headers=headers, params=params)
+        response = client.get("/sellerpayment/transactions_logs", params=params)
 
         if response.status_code != 200:
             print(f"Error fetching transactions: {response.status_code} - {response.text}")
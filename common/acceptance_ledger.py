@@ -0,0 +1,103 @@
+import os
+import json
+from common.utils import append_json_lines
+
+# --- Configuration ---
+LOGS_DIR = os.path.join(os.path.dirname(__file__), '..', 'logs', 'best_buy')
+LEDGER_FILE = os.path.join(LOGS_DIR, 'order_acceptance_ledger.jsonl')
+LEGACY_ACCEPTED_LOG_FILE = os.path.join(LOGS_DIR, 'accepted_orders_log.json')
+LEGACY_JOURNAL_FILE = os.path.join(LOGS_DIR, 'order_acceptance_journal.json')
+
+
+class AcceptanceLedger:
+    """
+    Append-only record of order acceptances, stored as JSON Lines.
+
+    Every acceptance is one line holding the order ID, timestamp and the raw
+    API response. The file is read once when the ledger is opened to build an
+    in-memory order_id index; after that, lookups never touch the disk and
+    new entries are appended without rewriting the history.
+    """
+
+    def __init__(self, path=LEDGER_FILE):
+        self.path = path
+        self._index = {}
+        self._load()
+
+    def _load(self):
+        """ Builds the order_id index from the ledger, importing legacy logs on first use. """
+        if not os.path.exists(self.path):
+            self._import_legacy_logs()
+            return
+
+        with open(self.path, 'r') as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write is skipped, not fatal.
+                    print(f"WARNING: Skipping corrupted line {line_number} in {self.path}.")
+                    continue
+                self._index[entry['order_id']] = entry
+
+    def _import_legacy_logs(self):
+        """ Seeds a new ledger from accepted_orders_log.json and order_acceptance_journal.json. """
+        legacy_dir = os.path.dirname(self.path)
+        accepted_log = _read_json_list(os.path.join(legacy_dir, os.path.basename(LEGACY_ACCEPTED_LOG_FILE)))
+        journal = _read_json_list(os.path.join(legacy_dir, os.path.basename(LEGACY_JOURNAL_FILE)))
+        if not accepted_log and not journal:
+            return
+
+        responses = {entry['order_id']: entry.get('api_response') for entry in journal if 'order_id' in entry}
+        entries = [
+            {
+                "order_id": entry['order_id'],
+                "timestamp": entry.get('timestamp'),
+                "api_response": responses.get(entry['order_id'])
+            }
+            for entry in accepted_log if 'order_id' in entry
+        ]
+        print(f"INFO: Importing {len(entries)} legacy acceptance records into {self.path}...")
+        self.append_batch(entries)
+
+    def append_batch(self, entries):
+        """ Appends a batch of acceptance entries in a single write and updates the index. """
+        if not entries:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        append_json_lines(self.path, entries)
+        for entry in entries:
+            self._index[entry['order_id']] = entry
+
+    def append(self, order_id, timestamp, api_response):
+        """ Appends a single acceptance entry. """
+        self.append_batch([{"order_id": order_id, "timestamp": timestamp, "api_response": api_response}])
+
+    def __contains__(self, order_id):
+        return order_id in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, order_id):
+        """ Returns the latest ledger entry for an order, or None. """
+        return self._index.get(order_id)
+
+    def accepted_order_ids(self):
+        """ Returns the set of all order IDs recorded in the ledger. """
+        return set(self._index)
+
+
+def _read_json_list(path):
+    """ Reads a JSON array file, returning an empty list if it is missing or corrupted. """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            print(f"WARNING: {path} is corrupted. Skipping legacy import.")
+            return []
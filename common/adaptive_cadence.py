@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+# --- Configuration ---
+# Each idle run stretches the interval by this factor, up to the active profile's ceiling.
+DEFAULT_DECAY_FACTOR = 1.5
+# After new orders arrive, the interval stays at the floor for this long, since orders tend to come in bursts.
+DEFAULT_RECENT_WINDOW = timedelta(minutes=15)
+
+
+class CadenceProfile:
+    """
+    Interval bounds for a recurring time window, e.g. weekday business hours.
+
+    `days` are weekday numbers (Monday is 0). The window runs from
+    `start_hour` up to, but not including, `end_hour`, in local time.
+    """
+
+    def __init__(self, name, min_interval, max_interval, days=range(7), start_hour=0, end_hour=24):
+        if min_interval > max_interval:
+            raise ValueError(f"Cadence profile {name}: min_interval is greater than max_interval")
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.days = frozenset(days)
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+
+    def matches(self, moment):
+        return moment.weekday() in self.days and self.start_hour <= moment.hour < self.end_hour
+
+    def __repr__(self):
+        return f"CadenceProfile({self.name!r}, {self.min_interval}-{self.max_interval}s)"
+
+
+class AdaptiveCadence:
+    """
+    Polling interval that follows the observed order arrival rate.
+
+    Call `observe(new_orders)` after each run. While orders are arriving, or
+    arrived within `recent_window`, the interval stays at the active
+    profile's floor. Each idle run multiplies the interval by `decay`, up to
+    the profile's ceiling. The active profile is the first one in
+    `profiles` that matches the current time, falling back to `default`.
+    `interval()` is always clamped to the active profile, so the ceiling
+    drops as soon as business hours start.
+    """
+
+    def __init__(self, default, profiles=(), decay=DEFAULT_DECAY_FACTOR,
+                 recent_window=DEFAULT_RECENT_WINDOW, clock=datetime.now):
+        self.default = default
+        self.profiles = tuple(profiles)
+        self.decay = decay
+        self.recent_window = recent_window
+        self._clock = clock
+        self.last_arrival = None
+        self._interval = default.min_interval
+
+    def profile(self, moment=None):
+        """ Returns the profile in effect at `moment` (now by default). """
+        moment = moment or self._clock()
+        for profile in self.profiles:
+            if profile.matches(moment):
+                return profile
+        return self.default
+
+    def interval(self):
+        """ Returns the current interval in seconds, clamped to the active profile. """
+        profile = self.profile()
+        return min(max(self._interval, profile.min_interval), profile.max_interval)
+
+    def observe(self, new_orders):
+        """ Records how many new orders a run saw and returns the interval until the next run. """
+        now = self._clock()
+        profile = self.profile(now)
+        if new_orders:
+            self.last_arrival = now
+        if self.last_arrival is not None and now - self.last_arrival <= self.recent_window:
+            self._interval = profile.min_interval
+        else:
+            self._interval = min(self.interval() * self.decay, profile.max_interval)
+        return self.interval()
@@ -0,0 +1,227 @@
+import os
+import sys
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+# Add project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.rate_limiter import TokenBucket, compute_backoff, parse_retry_after
+
+# --- Configuration ---
+BEST_BUY_API_BASE_URL = 'https://marketplace.bestbuy.ca/api'
+CONNECT_TIMEOUT_SECONDS = 5
+READ_TIMEOUT_SECONDS = 30
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+# Request budgets per endpoint family, as (requests per second, burst size).
+# The family is the first path segment after /api, e.g. /api/orders -> 'orders'.
+ENDPOINT_BUDGETS = {
+    'orders': (5, 10),
+    'inbox': (2, 4),
+    'sellerpayment': (1, 2),
+}
+DEFAULT_ENDPOINT_BUDGET = (2, 4)
+
+# Retry policy for throttled (429) and transient server (5xx) responses.
+MAX_RETRIES = 4
+RETRY_BASE_DELAY_SECONDS = 1
+RETRY_MAX_DELAY_SECONDS = 30
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# A response asking to wait longer than this is returned to the caller instead of being retried.
+RETRY_AFTER_MAX_SECONDS = 120
+
+# Page size for OR11 order listing. Mirakl caps `max` at 100.
+ORDERS_PAGE_SIZE = 100
+# Order IDs per batched `order_ids` lookup, and how many lookups run at once.
+ORDER_IDS_CHUNK_SIZE = 100
+ORDER_LOOKUP_WORKERS = 4
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class BestBuyClient:
+    """
+    Shared HTTP client for the Best Buy (Mirakl) marketplace API.
+
+    Wraps a pooled, keep-alive `requests.Session` with the auth headers built
+    once, so every call in a cycle reuses a handful of warm TLS connections.
+    Methods return the raw `requests.Response`; callers keep calling
+    `raise_for_status()` and handling `requests.exceptions.RequestException`
+    exactly as they did with bare `requests` calls.
+
+    Every call first takes a token from its endpoint family's rate limiter.
+    Throttled, 5xx and connection-error calls are retried with jittered
+    exponential backoff that honours `Retry-After`. Only the final response
+    or exception reaches the caller.
+    """
+
+    def __init__(self, api_key, base_url=BEST_BUY_API_BASE_URL,
+                 timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS),
+                 pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 endpoint_budgets=None, max_retries=MAX_RETRIES, sleep=time.sleep):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._sleep = sleep
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': api_key,
+            'Accept': 'application/json',
+        })
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        budgets = dict(ENDPOINT_BUDGETS)
+        budgets.update(endpoint_budgets or {})
+        self._limiters = {family: TokenBucket(rate, burst, sleep=sleep) for family, (rate, burst) in budgets.items()}
+        self._default_limiter = TokenBucket(*DEFAULT_ENDPOINT_BUDGET, sleep=sleep)
+
+    def url(self, path):
+        """ Resolves an API path such as '/orders' against the base URL. """
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def limiter_for(self, url):
+        """ Returns the rate limiter for the endpoint family of a URL. """
+        relative = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        family = relative.lstrip('/').split('/', 1)[0].split('?', 1)[0]
+        return self._limiters.get(family, self._default_limiter)
+
+    def _send(self, send, path, **kwargs):
+        """ Sends a request through the rate limiter, retrying throttled and transient failures. """
+        kwargs.setdefault('timeout', self.timeout)
+        url = self.url(path)
+        limiter = self.limiter_for(url)
+
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            try:
+                response = send(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = compute_backoff(attempt, RETRY_BASE_DELAY_SECONDS, RETRY_MAX_DELAY_SECONDS)
+                print(f"WARNING: Request to {url} failed ({e}). Retrying in {delay:.1f}s...")
+                self._sleep(delay)
+                continue
+
+            status_code = getattr(response, 'status_code', None)
+            if not isinstance(status_code, int) or status_code not in RETRY_STATUS_CODES:
+                limiter.reward()
+                return response
+            if attempt >= self.max_retries:
+                return response
+
+            if status_code == 429:
+                limiter.penalize()
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None and retry_after > RETRY_AFTER_MAX_SECONDS:
+                print(f"WARNING: {url} returned HTTP {status_code} with Retry-After {retry_after:.0f}s, "
+                      f"longer than the {RETRY_AFTER_MAX_SECONDS}s limit. Not retrying.")
+                return response
+            delay = compute_backoff(attempt, RETRY_BASE_DELAY_SECONDS, RETRY_MAX_DELAY_SECONDS, retry_after)
+            print(f"WARNING: {url} returned HTTP {status_code}. Retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{self.max_retries})...")
+            self._sleep(delay)
+        return response
+
+    def get(self, path, params=None, **kwargs):
+        return self._send(self.session.get, path, params=params, **kwargs)
+
+    def put(self, path, json=None, **kwargs):
+        return self._send(self.session.put, path, json=json, **kwargs)
+
+    def post(self, path, json=None, **kwargs):
+        return self._send(self.session.post, path, json=json, **kwargs)
+
+    def _fetch_orders_page(self, params, page_size, offset):
+        """ Fetches one page of /orders and returns the decoded JSON body. """
+        page_params = dict(params or {})
+        page_params.update({'max': page_size, 'offset': offset})
+        response = self.get('/orders', params=page_params)
+        response.raise_for_status()
+        return response.json()
+
+    def iter_order_pages(self, params=None, page_size=ORDERS_PAGE_SIZE, prefetch=True):
+        """
+        Yields the OR11 order listing one page (list of orders) at a time.
+
+        Follows `total_count` with `max`/`offset` paging, so no orders are
+        missed above the API's default page size. With `prefetch`, the next
+        page is requested in the background while the caller processes the
+        current one. Request errors propagate to the caller.
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            offset = 0
+            data = self._fetch_orders_page(params, page_size, offset)
+            while True:
+                orders = data.get('orders', [])
+                total_count = data.get('total_count', 0)
+                offset += len(orders)
+                has_more = bool(orders) and offset < total_count
+
+                next_page = None
+                if has_more and executor:
+                    next_page = executor.submit(self._fetch_orders_page, params, page_size, offset)
+
+                if orders:
+                    yield orders
+                if not has_more:
+                    return
+                data = next_page.result() if next_page else self._fetch_orders_page(params, page_size, offset)
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+    def iter_orders(self, params=None, page_size=ORDERS_PAGE_SIZE, prefetch=True):
+        """ Yields orders one at a time across every page of the OR11 order listing. """
+        for page in self.iter_order_pages(params, page_size, prefetch):
+            yield from page
+
+    def get_orders_by_ids(self, order_ids, chunk_size=ORDER_IDS_CHUNK_SIZE, max_workers=ORDER_LOOKUP_WORKERS):
+        """
+        Looks up many orders with batched `order_ids` requests and returns {order_id: order}.
+
+        IDs are split into chunks of `chunk_size` that are fetched concurrently.
+        A chunk that fails is logged and skipped, so its orders are simply
+        missing from the result.
+        """
+        order_ids = list(dict.fromkeys(order_id for order_id in order_ids if order_id))
+        if not order_ids:
+            return {}
+        chunks = [order_ids[i:i + chunk_size] for i in range(0, len(order_ids), chunk_size)]
+
+        def fetch_chunk(chunk):
+            try:
+                return self._fetch_orders_page({'order_ids': ','.join(chunk)}, len(chunk), 0).get('orders', [])
+            except requests.exceptions.RequestException as e:
+                print(f"ERROR: Batched lookup of {len(chunk)} orders failed: {e}")
+                return []
+
+        orders = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+            for chunk_orders in executor.map(fetch_chunk, chunks):
+                for order in chunk_orders:
+                    orders[order['order_id']] = order
+        return orders
+
+    def close(self):
+        self.session.close()
+
+
+def get_best_buy_client(api_key):
+    """ Returns the process-wide client for an API key, creating it on first use. """
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = BestBuyClient(api_key)
+            _clients[api_key] = client
+        return client
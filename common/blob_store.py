@@ -0,0 +1,56 @@
+import os
+import gzip
+import hashlib
+import threading
+
+# --- Configuration ---
+BLOB_COMPRESSION_LEVEL = 6
+
+
+class BlobStore:
+    """
+    Content-addressed store of gzip-compressed blobs.
+
+    A blob's ID is the SHA-256 of its uncompressed bytes. Blobs are stored
+    as `<root>/<id[:2]>/<id>.gz`, so storing the same content twice is
+    free and an ID always refers to exactly one payload. Writes go through
+    a temporary file and an atomic rename.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, blob_id):
+        return os.path.join(self.root, blob_id[:2], f"{blob_id}.gz")
+
+    def put(self, data):
+        """ Stores `data` (str or bytes) and returns its blob ID. """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        blob_id = hashlib.sha256(data).hexdigest()
+        path = self._path(blob_id)
+        if os.path.exists(path):
+            return blob_id
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=BLOB_COMPRESSION_LEVEL))
+        os.replace(temp_path, path)
+        return blob_id
+
+    def get(self, blob_id):
+        """ Returns the uncompressed bytes of a blob, or None if it is not stored. """
+        path = self._path(blob_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return gzip.decompress(f.read())
+
+    def get_text(self, blob_id):
+        """ Returns a blob decoded as UTF-8 text, or None. """
+        data = self.get(blob_id)
+        return data.decode('utf-8') if data is not None else None
+
+    def __contains__(self, blob_id):
+        return os.path.exists(self._path(blob_id))
@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import threading
+from datetime import datetime
+
+# Add project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.spool_queue import SpoolQueue
+
+# --- Configuration ---
+EVENTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'logs', 'events')
+# Event types accepted by the ingestion service, with the queue each one goes to and the `data` fields it requires.
+EVENT_TYPES = {
+    'order.state_changed': {'queue': 'orders', 'required': ('order_id', 'order_state')},
+    'message.created': {'queue': 'messages', 'required': ('thread_id', 'message_id', 'body')},
+}
+MAX_EVENT_ID_LENGTH = 128
+# An event whose handler keeps failing is returned to pending/ this many times before it is moved to failed/.
+MAX_EVENT_ATTEMPTS = 5
+
+_enqueue_lock = threading.Lock()
+
+
+class EventValidationError(ValueError):
+    """ Raised when an event payload is missing fields or has the wrong shape. """
+
+
+def validate_event(payload):
+    """
+    Checks an incoming event and returns it normalised:
+    `{"event_id", "event_type", "occurred_at", "data"}`, plus `received_at`.
+    Raises EventValidationError describing the first problem found.
+    """
+    if not isinstance(payload, dict):
+        raise EventValidationError("event must be a JSON object")
+
+    event_id = payload.get('event_id')
+    if not isinstance(event_id, str) or not event_id.strip():
+        raise EventValidationError("event_id is required")
+    event_id = event_id.strip()
+    if len(event_id) > MAX_EVENT_ID_LENGTH or not all(c.isalnum() or c in '-_.:' for c in event_id):
+        raise EventValidationError("event_id may only contain letters, digits, '-', '_', '.' and ':' (max 128 characters)")
+
+    event_type = payload.get('event_type')
+    if event_type not in EVENT_TYPES:
+        raise EventValidationError(f"event_type must be one of: {', '.join(sorted(EVENT_TYPES))}")
+
+    data = payload.get('data')
+    if not isinstance(data, dict):
+        raise EventValidationError("data must be a JSON object")
+    missing = [field for field in EVENT_TYPES[event_type]['required'] if not isinstance(data.get(field), str) or not data.get(field)]
+    if missing:
+        raise EventValidationError(f"data is missing required fields: {', '.join(missing)}")
+
+    occurred_at = payload.get('occurred_at')
+    if occurred_at is not None:
+        try:
+            datetime.fromisoformat(str(occurred_at).replace('Z', '+00:00'))
+        except ValueError:
+            raise EventValidationError("occurred_at must be an ISO 8601 timestamp")
+
+    return {
+        "event_id": event_id,
+        "event_type": event_type,
+        "occurred_at": occurred_at,
+        "received_at": datetime.now().isoformat(),
+        "data": data,
+    }
+
+
+def open_event_queue(queue_name, events_dir=EVENTS_DIR):
+    """ Returns the durable spool queue for one kind of event ('orders' or 'messages'). """
+    return SpoolQueue(os.path.join(events_dir, queue_name))
+
+
+def _event_file_name(event_id):
+    # Colons are valid in event IDs but not in Windows file names.
+    return f"{event_id.replace(':', '_')}.json"
+
+
+def enqueue_event(event, events_dir=EVENTS_DIR):
+    """
+    Writes a validated event to its queue. Returns False if an event with the same ID
+    was already received (pending, being processed or done), so redeliveries are ignored.
+    """
+    spool = open_event_queue(EVENT_TYPES[event['event_type']]['queue'], events_dir)
+    name = _event_file_name(event['event_id'])
+    with _enqueue_lock:
+        if spool.state_of(name) in ('pending', 'claimed', 'done'):
+            return False
+        spool.enqueue(name, json.dumps(event))
+    return True
+
+
+def has_pending_events(queue_name, events_dir=EVENTS_DIR):
+    """ Cheap check used by the scheduler: lists only the queue's pending/ directory. """
+    pending_dir = os.path.join(events_dir, queue_name, 'pending')
+    return os.path.isdir(pending_dir) and any(not name.startswith('.') for name in os.listdir(pending_dir))
+
+
+def consume_events(queue_name, handler, events_dir=EVENTS_DIR):
+    """
+    Claims every pending event in a queue and passes the decoded events to `handler` in one call.
+    Events are marked done if the handler returns. If it raises, each event's `attempts` count is
+    incremented and the event goes back to pending/, to be retried on the next call, until it has
+    failed MAX_EVENT_ATTEMPTS times; then it is moved to failed/. Returns the handled events.
+    """
+    spool = open_event_queue(queue_name, events_dir)
+    items = spool.claim()
+    if not items:
+        return []
+
+    events, valid_items = [], []
+    for item in items:
+        try:
+            events.append(json.loads(item.read()))
+            valid_items.append(item)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"ERROR: Could not read event {item.name}: {e}")
+            spool.fail(item)
+
+    try:
+        handler(events)
+    except Exception as e:
+        print(f"ERROR: Handling {len(events)} '{queue_name}' events failed: {e}")
+        for item, event in zip(valid_items, events):
+            event['attempts'] = event.get('attempts', 0) + 1
+            if event['attempts'] >= MAX_EVENT_ATTEMPTS:
+                print(f"ERROR: Event {event['event_id']} failed {event['attempts']} times. Moving it to failed/.")
+                spool.fail(item)
+            else:
+                spool.release(item, json.dumps(event))
+        raise
+    for item in valid_items:
+        spool.complete(item)
+    print(f"INFO: Consumed {len(events)} '{queue_name}' events.")
+    return events
@@ -0,0 +1,215 @@
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait as wait_for_futures
+
+# --- Configuration ---
+DEFAULT_MAX_WORKERS = 4
+# Upper bound on how long the loop sleeps between checks, so stop requests are noticed promptly.
+MAX_IDLE_SECONDS = 30
+
+
+class Job:
+    """
+    A periodic unit of work for the JobScheduler.
+
+    `func` is called with no arguments every `interval` seconds, measured
+    from the start of the previous run. `after` names jobs this one depends
+    on. A dependent job never starts while one of its dependencies is
+    running, waits until each dependency has finished once, and runs again
+    as soon as a dependency finishes, without waiting for its own interval.
+
+    With a `cadence` (see common/adaptive_cadence.py), the interval is
+    dynamic. After each successful run, the value `func` returned (the
+    number of new orders it saw) is passed to `cadence.observe()`, and that
+    sets the next interval.
+
+    `JobScheduler.trigger()` makes a job due immediately, e.g. when an event
+    arrives for it. A `quiet` job only logs when it fails, for frequent
+    housekeeping jobs that would otherwise flood the console.
+    """
+
+    def __init__(self, name, func, interval=None, after=(), cadence=None, quiet=False):
+        if interval is None and cadence is None:
+            raise ValueError(f"Job {name} needs an interval or a cadence")
+        self.name = name
+        self.func = func
+        self.cadence = cadence
+        self.interval = cadence.interval() if cadence is not None else interval
+        self.after = tuple(after)
+        self.quiet = quiet
+        self.running = False
+        self.next_run = None
+        self.dependency_finished = False
+        self.triggered = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_started = None
+        self.last_duration = None
+        self.last_error = None
+
+    def __repr__(self):
+        return f"Job({self.name!r}, interval={self.interval})"
+
+
+class JobScheduler:
+    """
+    Runs Jobs on a thread pool, each on its own interval and respecting declared dependencies.
+
+    Independent jobs run in parallel. A job that is due while its previous
+    run is still going is skipped, not queued: its next run is pushed back
+    by one interval. A job that raises is logged and scheduled again as
+    usual, so one failing phase never stops the others.
+    """
+
+    def __init__(self, jobs, max_workers=DEFAULT_MAX_WORKERS, clock=time.monotonic):
+        self.jobs = {}
+        for job in jobs:
+            if job.name in self.jobs:
+                raise ValueError(f"Duplicate job name: {job.name}")
+            self.jobs[job.name] = job
+        for job in self.jobs.values():
+            for dependency in job.after:
+                if dependency not in self.jobs:
+                    raise ValueError(f"Job {job.name} depends on unknown job {dependency}")
+        self._check_for_cycles()
+
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._futures = set()
+
+    def _check_for_cycles(self):
+        visiting, done = set(), set()
+
+        def visit(name, path):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Job dependencies form a cycle: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dependency in self.jobs[name].after:
+                visit(dependency, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.jobs:
+            visit(name, [])
+
+    def _is_blocked(self, job):
+        """ True while a dependency is running or has never finished. """
+        return any(self.jobs[name].running or self.jobs[name].runs == 0 for name in job.after)
+
+    def _due_at(self, job):
+        """ Returns when an idle job is next due. A cadence can bring this forward, e.g. when business hours start. """
+        if job.cadence is not None and job.next_run is not None and job.last_started is not None:
+            return min(job.next_run, job.last_started + job.cadence.interval())
+        return job.next_run
+
+    def _is_ready(self, job, now):
+        if self._is_blocked(job):
+            return False
+        return job.next_run is None or now >= self._due_at(job) or job.dependency_finished or job.triggered
+
+    def run_pending(self):
+        """ Starts every job that is due and whose dependencies allow it. Returns the started job names. """
+        started = []
+        with self._lock:
+            now = self._clock()
+            for job in self.jobs.values():
+                if job.running:
+                    if job.next_run is not None and now >= job.next_run:
+                        job.skipped += 1
+                        job.next_run = now + job.interval
+                        print(f"WARNING: Job '{job.name}' is still running from {now - job.last_started:.0f}s ago. Skipping this run.")
+                    continue
+                if not self._is_ready(job, now):
+                    continue
+                job.running = True
+                job.dependency_finished = False
+                job.triggered = False
+                job.last_started = now
+                job.next_run = now + job.interval
+                started.append(job)
+
+        for job in started:
+            if not job.quiet:
+                print(f"\n>>> Starting job '{job.name}'...")
+            future = self._executor.submit(self._run, job)
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(self._discard_future)
+        return [job.name for job in started]
+
+    def trigger(self, name):
+        """
+        Makes a job due now, e.g. because an event arrived for it. If the job is
+        running, it runs once more as soon as it finishes (dependencies still apply).
+        """
+        with self._lock:
+            self.jobs[name].triggered = True
+        self._wake.set()
+
+    def _discard_future(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _run(self, job):
+        error = None
+        result = None
+        try:
+            result = job.func()
+        except (Exception, SystemExit) as e:
+            # Phase entry points may call sys.exit() on failure; that must not take down the worker.
+            error = e
+            print(f"ERROR: Job '{job.name}' failed: {e}")
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                now = self._clock()
+                job.running = False
+                job.runs += 1
+                job.last_duration = now - job.last_started
+                job.last_error = error
+                if error is not None:
+                    job.failures += 1
+                elif job.cadence is not None:
+                    job.interval = job.cadence.observe(result or 0)
+                    job.next_run = job.last_started + job.interval
+                for other in self.jobs.values():
+                    if job.name in other.after:
+                        other.dependency_finished = True
+            if not job.quiet or error is not None:
+                print(f"<<< Job '{job.name}' finished in {job.last_duration:.1f}s. Next run in {max(job.next_run - now, 0):.0f}s.")
+            self._wake.set()
+
+    def seconds_until_next_run(self):
+        """ Returns how long until the next job is due (0 if one can start now). """
+        with self._lock:
+            now = self._clock()
+            # Running and blocked jobs are left out; a finishing job wakes the loop anyway.
+            idle = [job for job in self.jobs.values() if not job.running and not self._is_blocked(job)]
+            if any(self._is_ready(job, now) for job in idle):
+                return 0
+            waits = [self._due_at(job) - now for job in idle if job.next_run is not None]
+            return max(min(waits), 0) if waits else MAX_IDLE_SECONDS
+
+    def wait_idle(self, timeout=None):
+        """ Waits for every started job to finish. Returns True if none are left running. """
+        with self._lock:
+            futures = list(self._futures)
+        _, not_done = wait_for_futures(futures, timeout=timeout)
+        return not not_done
+
+    def run_forever(self, stop_event=None):
+        """ Runs jobs until `stop_event` is set, sleeping until the next job is due or one finishes. """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self._wake.clear()
+            self.run_pending()
+            self._wake.wait(min(self.seconds_until_next_run(), MAX_IDLE_SECONDS))
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+# Add project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.best_buy_client import get_best_buy_client
+from common.order_store import open_order_store
+from common.order_sync import IncrementalOrderSync
+
+# --- Configuration ---
+# Order states fetched together in one paginated pass at the start of a cycle.
+SNAPSHOT_STATE_CODES = ('WAITING_ACCEPTANCE', 'SHIPPING')
+# Jobs that start while a snapshot is in use share it, unless it is older than this many seconds.
+SNAPSHOT_MAX_AGE_SECONDS = 60
+
+_current_snapshot = None
+_current_snapshot_lock = threading.Lock()
+_snapshot_users = 0
+
+
+class OrderSnapshot:
+    """
+    Per-cycle cache of the OR11 order listing, partitioned by order state.
+
+    The first read fetches every state in SNAPSHOT_STATE_CODES in one
+    paginated pass, as an incremental sync when a watermark exists. Later
+    reads in the same cycle are served from memory. A caller that needs the
+    complete listing for a state, such as acceptance validation, passes
+    `complete=True`. If the cached data is only an incremental delta, that
+    state is refetched in full. `invalidate()` drops states whose orders
+    were just changed, so the next read refetches them.
+    """
+
+    def __init__(self, api_key, state_codes=SNAPSHOT_STATE_CODES):
+        self.api_key = api_key
+        self.state_codes = tuple(state_codes)
+        self._orders = {}
+        self._complete = {}
+        self._lock = threading.Lock()
+        self.fetch_count = 0
+        self.created_at = time.monotonic()
+
+    def _load(self, states, complete):
+        """ Fetches the given states in one paginated pass and caches them per state. """
+        codes = ','.join(states)
+        partitions = {state: [] for state in states}
+        with open_order_store() as store:
+            sync = None if complete else IncrementalOrderSync(store, codes)
+            params = sync.params() if sync else {'order_state_codes': codes}
+            print(f"INFO: Fetching order snapshot for {codes} ({sync.describe() if sync else 'full listing'})...")
+            for page in get_best_buy_client(self.api_key).iter_order_pages(params):
+                if sync:
+                    sync.observe(page)
+                for order in page:
+                    if order.get('order_state') in partitions:
+                        partitions[order['order_state']].append(order)
+            if sync:
+                sync.commit()
+
+        self.fetch_count += 1
+        is_complete = complete or sync.is_full_sync
+        for state in states:
+            self._orders[state] = partitions[state]
+            self._complete[state] = is_complete
+        print("SUCCESS: Order snapshot holds " + ", ".join(f"{len(partitions[s])} {s}" for s in states) + " orders.")
+
+    def orders(self, state, complete=False):
+        """ Returns the cached orders for a state, fetching them if needed. Request errors propagate. """
+        with self._lock:
+            if state not in self._orders:
+                missing = [s for s in self.state_codes if s not in self._orders] if state in self.state_codes else [state]
+                self._load(missing, complete)
+            elif complete and not self._complete.get(state):
+                self._load([state], True)
+            return list(self._orders[state])
+
+    def is_complete(self, state):
+        """ Returns True when the cached orders for a state came from a full listing. """
+        with self._lock:
+            return state in self._orders and self._complete.get(state, False)
+
+    def invalidate(self, *states):
+        """ Drops cached states (all of them when none are given) after a write that changed them. """
+        with self._lock:
+            for state in states or list(self._orders):
+                self._orders.pop(state, None)
+                self._complete.pop(state, None)
+
+
+def get_cycle_snapshot():
+    """ Returns the active cycle snapshot, or None when running outside the scheduler. """
+    return _current_snapshot
+
+
+@contextmanager
+def shared_cycle_snapshot(api_key, max_age=SNAPSHOT_MAX_AGE_SECONDS):
+    """
+    Shares one order snapshot between jobs that run at the same time.
+
+    The first job to enter opens a snapshot. Jobs that enter while it is
+    in use reuse it, unless it is older than `max_age`, in which case a
+    fresh one replaces it. The snapshot is discarded when the last job
+    leaves, so the next run always starts from fresh data.
+    """
+    global _current_snapshot, _snapshot_users
+    with _current_snapshot_lock:
+        if api_key and (_current_snapshot is None or time.monotonic() - _current_snapshot.created_at > max_age):
+            _current_snapshot = OrderSnapshot(api_key)
+        _snapshot_users += 1
+        snapshot = _current_snapshot
+    try:
+        yield snapshot
+    finally:
+        with _current_snapshot_lock:
+            _snapshot_users -= 1
+            if _snapshot_users == 0:
+                _current_snapshot = None
+
+
+def invalidate_cycle_snapshot(*states):
+    """ Invalidates states in the active cycle snapshot, if there is one. """
+    snapshot = get_cycle_snapshot()
+    if snapshot is not None:
+        snapshot.invalidate(*states)
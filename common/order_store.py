@@ -0,0 +1,474 @@
+import os
+import sys
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+# Add project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.acceptance_ledger import AcceptanceLedger
+from common.segmented_log import get_segmented_log, segmented_log_dir
+
+# --- Configuration ---
+LOGS_ROOT = os.path.join(os.path.dirname(__file__), '..', 'logs')
+ORDER_STORE_FILE = os.path.join(LOGS_ROOT, 'order_lifecycle.db')
+
+# Lifecycle stages, in the order an order moves through them. Each stage has a
+# flag column and a matching `<stage>_at` timestamp column.
+LIFECYCLE_STAGES = ('accepted', 'label_created', 'tracking_pushed', 'shipped_validated')
+# State given to an order that a complete listing of its state no longer returns (cancelled,
+# refunded, or moved on). The next listing that returns the order restores its real state.
+EVICTED_STATE = 'EVICTED'
+
+# Structured columns kept for each Canada Post shipment details document. The raw XML lives
+# in a blob store and is referenced by `details_blob_id`.
+SHIPMENT_COLUMNS = (
+    'order_id', 'tracking_pin', 'shipment_status', 'service_code', 'expected_mailing_date',
+    'expected_delivery_date', 'due_amount', 'destination_name', 'destination_city',
+    'destination_province', 'destination_postal_code', 'destination_country',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    order_state TEXT,
+    order_json TEXT,
+    accepted INTEGER NOT NULL DEFAULT 0,
+    accepted_at TEXT,
+    label_created INTEGER NOT NULL DEFAULT 0,
+    label_created_at TEXT,
+    tracking_pin TEXT,
+    tracking_pushed INTEGER NOT NULL DEFAULT 0,
+    tracking_pushed_at TEXT,
+    shipped_validated INTEGER NOT NULL DEFAULT 0,
+    shipped_validated_at TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_state ON orders (order_state, accepted);
+CREATE INDEX IF NOT EXISTS idx_orders_label_created ON orders (label_created, order_state);
+CREATE INDEX IF NOT EXISTS idx_orders_tracking_pushed ON orders (tracking_pushed, label_created);
+CREATE INDEX IF NOT EXISTS idx_orders_shipped_validated ON orders (shipped_validated, tracking_pushed);
+CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON orders (updated_at);
+CREATE INDEX IF NOT EXISTS idx_orders_tracking_pushed_at ON orders (tracking_pushed_at);
+CREATE INDEX IF NOT EXISTS idx_orders_validation_window ON orders (shipped_validated, tracking_pushed, tracking_pushed_at);
+CREATE TABLE IF NOT EXISTS shipments (
+    details_blob_id TEXT PRIMARY KEY,
+    order_id TEXT,
+    tracking_pin TEXT,
+    shipment_status TEXT,
+    service_code TEXT,
+    expected_mailing_date TEXT,
+    expected_delivery_date TEXT,
+    due_amount TEXT,
+    destination_name TEXT,
+    destination_city TEXT,
+    destination_province TEXT,
+    destination_postal_code TEXT,
+    destination_country TEXT,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shipments_order_id ON shipments (order_id);
+CREATE INDEX IF NOT EXISTS idx_shipments_tracking_pin ON shipments (tracking_pin);
+CREATE TABLE IF NOT EXISTS tracking_outbox (
+    order_id TEXT PRIMARY KEY,
+    tracking_pin TEXT NOT NULL,
+    enqueued_at TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT NOT NULL,
+    last_error TEXT,
+    tracking_updated INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    done_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tracking_outbox_due ON tracking_outbox (done, next_attempt_at);
+CREATE TABLE IF NOT EXISTS shipped_validation (
+    order_id TEXT PRIMARY KEY,
+    checks INTEGER NOT NULL DEFAULT 0,
+    last_state TEXT,
+    last_checked_at TEXT
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Serialises the first-use JSON import, so scheduler jobs opening a fresh store at the same time import it once.
+_json_import_lock = threading.Lock()
+
+
+class OrderStore:
+    """
+    Embedded SQLite store holding one row per order across every phase.
+
+    The raw Best Buy order payload is kept in `order_json`, and each phase
+    records its progress in a lifecycle flag (accepted, label_created,
+    tracking_pushed, shipped_validated). Phases select only the rows in the
+    state they care about instead of re-parsing the JSON logs. The database
+    runs in WAL mode so readers never block the writer.
+    """
+
+    def __init__(self, path=ORDER_STORE_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._seed_tracking_outbox()
+
+    def close(self):
+        self._conn.close()
+
+    def _seed_tracking_outbox(self):
+        """ Enqueues the labelled-but-unpushed orders of a store created before the tracking outbox existed. """
+        if self.get_meta('tracking_outbox_seeded_at') is not None:
+            return
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR IGNORE INTO tracking_outbox (order_id, tracking_pin, enqueued_at, next_attempt_at)
+                SELECT order_id, tracking_pin, COALESCE(label_created_at, ?), ?
+                FROM orders WHERE label_created = 1 AND tracking_pushed = 0 AND tracking_pin IS NOT NULL
+                """,
+                (now, now),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('tracking_outbox_seeded_at', ?)", (now,)
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # --- Writes ---
+
+    def upsert_orders(self, orders):
+        """ Inserts new orders or refreshes the state and payload of known ones. """
+        if not orders:
+            return 0
+        now = datetime.now().isoformat()
+        rows = [(order['order_id'], order.get('order_state'), json.dumps(order), now, now) for order in orders]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO orders (order_id, order_state, order_json, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(order_id) DO UPDATE SET
+                    order_state = COALESCE(excluded.order_state, orders.order_state),
+                    order_json = excluded.order_json,
+                    updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def mark_stage(self, stage, order_ids, timestamp=None):
+        """ Sets a lifecycle flag for the given orders, creating placeholder rows if needed. """
+        if stage not in LIFECYCLE_STAGES:
+            raise ValueError(f"Unknown lifecycle stage: {stage}")
+        order_ids = list(order_ids)
+        if not order_ids:
+            return 0
+        timestamp = timestamp or datetime.now().isoformat()
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO orders (order_id, created_at, updated_at) VALUES (?, ?, ?)",
+                [(order_id, now, now) for order_id in order_ids],
+            )
+            self._conn.executemany(
+                f"UPDATE orders SET {stage} = 1, {stage}_at = ?, updated_at = ? WHERE order_id = ?",
+                [(timestamp, now, order_id) for order_id in order_ids],
+            )
+        return len(order_ids)
+
+    def mark_accepted(self, order_ids, timestamp=None):
+        return self.mark_stage('accepted', order_ids, timestamp)
+
+    def mark_label_created(self, order_id, tracking_pin, timestamp=None, enqueue_tracking_push=True):
+        """
+        Records a created label and enqueues its tracking push in the outbox (once per order).
+        Historical labels are imported with enqueue_tracking_push=False so they are never pushed again.
+        """
+        self.mark_stage('label_created', [order_id], timestamp)
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE orders SET tracking_pin = ? WHERE order_id = ?", (tracking_pin, order_id))
+            if tracking_pin and enqueue_tracking_push:
+                # A new label for an order that was not pushed yet replaces the queued PIN.
+                self._conn.execute(
+                    """
+                    INSERT INTO tracking_outbox (order_id, tracking_pin, enqueued_at, next_attempt_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(order_id) DO UPDATE SET
+                        tracking_pin = excluded.tracking_pin,
+                        tracking_updated = 0,
+                        next_attempt_at = excluded.next_attempt_at
+                    WHERE tracking_outbox.done = 0 AND tracking_outbox.tracking_pin != excluded.tracking_pin
+                    """,
+                    (order_id, tracking_pin, now, now),
+                )
+
+    def mark_tracking_pushed(self, order_ids, timestamp=None):
+        """ Sets the tracking_pushed flag and closes the orders' outbox entries. """
+        order_ids = list(order_ids)
+        count = self.mark_stage('tracking_pushed', order_ids, timestamp)
+        done_at = timestamp or datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE tracking_outbox SET done = 1, done_at = ? WHERE order_id = ? AND done = 0",
+                [(done_at, order_id) for order_id in order_ids],
+            )
+        return count
+
+    def mark_tracking_updated(self, order_id):
+        """ Records that the tracking PUT succeeded, so a retry only repeats the ship call. """
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE tracking_outbox SET tracking_updated = 1 WHERE order_id = ?", (order_id,))
+
+    def record_tracking_push_failure(self, order_id, error, next_attempt_at):
+        """ Counts a failed push attempt and schedules the next one. """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE tracking_outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? WHERE order_id = ?",
+                (str(error), next_attempt_at, order_id),
+            )
+
+    def mark_shipped_validated(self, order_ids, timestamp=None):
+        return self.mark_stage('shipped_validated', order_ids, timestamp)
+
+    def update_order_state(self, order_id, order_state):
+        """ Records the latest marketplace state seen for an order without touching its payload. """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE orders SET order_state = ?, updated_at = ? WHERE order_id = ?",
+                (order_state, datetime.now().isoformat(), order_id),
+            )
+
+    def evict_unlisted_orders(self, order_state, listed_order_ids):
+        """
+        Moves the orders recorded in `order_state` that are not in `listed_order_ids` to EVICTED_STATE.
+        Only call this with the IDs of a complete listing of that state. Returns the evicted order IDs.
+        """
+        listed_order_ids = set(listed_order_ids)
+        rows = self._conn.execute("SELECT order_id FROM orders WHERE order_state = ?", (order_state,)).fetchall()
+        evicted = [row['order_id'] for row in rows if row['order_id'] not in listed_order_ids]
+        if evicted:
+            now = datetime.now().isoformat()
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "UPDATE orders SET order_state = ?, updated_at = ? WHERE order_id = ? AND order_state = ?",
+                    [(EVICTED_STATE, now, order_id, order_state) for order_id in evicted],
+                )
+        return evicted
+
+    def record_shipment_details(self, details_blob_id, details, timestamp=None):
+        """ Stores the structured fields of a shipment details document under its blob ID. """
+        timestamp = timestamp or datetime.now().isoformat()
+        columns = ('details_blob_id',) + SHIPMENT_COLUMNS + ('recorded_at',)
+        values = [details_blob_id] + [details.get(column) for column in SHIPMENT_COLUMNS] + [timestamp]
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO shipments ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values,
+            )
+
+    def record_validation_checks(self, order_states, timestamp=None):
+        """ Records the Best Buy state seen for each checked order ({order_id: state or None}). """
+        timestamp = timestamp or datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO shipped_validation (order_id, checks, last_state, last_checked_at)
+                VALUES (?, 1, ?, ?)
+                ON CONFLICT(order_id) DO UPDATE SET
+                    checks = shipped_validation.checks + 1,
+                    last_state = COALESCE(excluded.last_state, shipped_validation.last_state),
+                    last_checked_at = excluded.last_checked_at
+                """,
+                [(order_id, state, timestamp) for order_id, state in order_states.items()],
+            )
+
+    # --- Reads ---
+
+    def select_orders(self, order_state=None, **stage_flags):
+        """
+        Returns the rows matching a marketplace state and lifecycle flags.
+
+        Example: `select_orders('SHIPPING', label_created=False)` returns the
+        orders awaiting shipment that do not have a label yet.
+        """
+        clauses, params = [], []
+        if order_state is not None:
+            clauses.append("order_state = ?")
+            params.append(order_state)
+        for stage, value in stage_flags.items():
+            if stage not in LIFECYCLE_STAGES:
+                raise ValueError(f"Unknown lifecycle stage: {stage}")
+            clauses.append(f"{stage} = ?")
+            params.append(1 if value else 0)
+
+        query = "SELECT * FROM orders"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at"
+        return [_row_to_dict(row) for row in self._conn.execute(query, params)]
+
+    def select_due_tracking_pushes(self, now=None, max_attempts=None):
+        """ Returns the open outbox entries whose next attempt is due, oldest first. """
+        query = "SELECT * FROM tracking_outbox WHERE done = 0 AND next_attempt_at <= ?"
+        params = [now or datetime.now().isoformat()]
+        if max_attempts is not None:
+            query += " AND attempts < ?"
+            params.append(max_attempts)
+        query += " ORDER BY next_attempt_at"
+        return [dict(row) for row in self._conn.execute(query, params)]
+
+    def select_orders_to_validate(self, pushed_since):
+        """
+        Returns the pushed, unvalidated orders whose tracking was pushed at or after `pushed_since`,
+        with their validation record (`checks`, `last_state`, `last_checked_at`).
+        """
+        query = """
+            SELECT orders.order_id, orders.tracking_pin, orders.tracking_pushed_at,
+                   COALESCE(shipped_validation.checks, 0) AS checks,
+                   shipped_validation.last_state, shipped_validation.last_checked_at
+            FROM orders LEFT JOIN shipped_validation ON shipped_validation.order_id = orders.order_id
+            WHERE orders.tracking_pushed = 1 AND orders.shipped_validated = 0 AND orders.tracking_pushed_at >= ?
+            ORDER BY orders.tracking_pushed_at
+        """
+        return [dict(row) for row in self._conn.execute(query, (pushed_since,))]
+
+    def count_unvalidated_before(self, pushed_before):
+        """ Counts the pushed, unvalidated orders that fell outside the validation window. """
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM orders WHERE tracking_pushed = 1 AND shipped_validated = 0 AND tracking_pushed_at < ?",
+            (pushed_before,),
+        ).fetchone()
+        return row[0]
+
+    def get_order(self, order_id):
+        """ Returns a single row by order ID, or None. """
+        row = self._conn.execute("SELECT * FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def select_shipments(self, order_id=None, tracking_pin=None):
+        """ Returns recorded shipment rows, optionally filtered by order ID and/or tracking PIN. """
+        clauses, params = [], []
+        if order_id is not None:
+            clauses.append("order_id = ?")
+            params.append(order_id)
+        if tracking_pin is not None:
+            clauses.append("tracking_pin = ?")
+            params.append(tracking_pin)
+        query = "SELECT * FROM shipments"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY recorded_at"
+        return [dict(row) for row in self._conn.execute(query, params)]
+
+    def get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO store_meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+
+def _row_to_dict(row):
+    """ Converts a row to a dict, decoding the stored order payload into `order`. """
+    data = dict(row)
+    order_json = data.pop('order_json', None)
+    data['order'] = json.loads(order_json) if order_json else {"order_id": data['order_id']}
+    return data
+
+
+def _read_json_list(path):
+    """ Reads a JSON array file, returning an empty list if it is missing or corrupted. """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError:
+            print(f"WARNING: {path} is corrupted. Skipping it during import.")
+            return []
+    return data if isinstance(data, list) else []
+
+
+def _read_log(legacy_path, timestamp_key='timestamp'):
+    """ Reads an append-only log from its segments, importing the legacy JSON array first if needed. """
+    if not os.path.exists(legacy_path) and not os.path.isdir(segmented_log_dir(legacy_path)):
+        return []
+    return list(get_segmented_log(legacy_path, timestamp_key=timestamp_key).read())
+
+
+def import_json_logs(store, logs_root=LOGS_ROOT):
+    """ One-shot import of the per-phase JSON logs into the order store. """
+    logs_bb = os.path.join(logs_root, 'best_buy')
+    logs_cp = os.path.join(logs_root, 'canada_post')
+
+    pending_acceptance = _read_json_list(os.path.join(logs_bb, 'pending_acceptance.json'))
+    pending_shipping = _read_json_list(os.path.join(logs_bb, 'orders_pending_shipping.json'))
+    shipped_and_validated = _read_log(os.path.join(logs_bb, 'orders_shipped_and_validated.json'), 'last_updated_date')
+    store.upsert_orders(pending_acceptance)
+    store.upsert_orders(pending_shipping)
+    store.upsert_orders(shipped_and_validated)
+
+    ledger = AcceptanceLedger(os.path.join(logs_bb, 'order_acceptance_ledger.jsonl'))
+    for order_id in ledger.accepted_order_ids():
+        store.mark_accepted([order_id], ledger.get(order_id).get('timestamp'))
+
+    label_count = 0
+    for shipment in _read_log(os.path.join(logs_cp, 'cp_shipping_labels_data.json')):
+        if shipment.get('order_id') and shipment.get('tracking_pin'):
+            # Labels from before the store existed were handled by the old scripts; they are not pushed again.
+            store.mark_label_created(shipment['order_id'], shipment['tracking_pin'], shipment.get('timestamp'),
+                                     enqueue_tracking_push=False)
+            label_count += 1
+
+    # The shipped log only holds orders whose tracking was pushed and whose shipped state was confirmed.
+    for order in shipped_and_validated:
+        if order.get('order_id'):
+            store.mark_tracking_pushed([order['order_id']], order.get('last_updated_date'))
+            store.mark_shipped_validated([order['order_id']], order.get('last_updated_date'))
+
+    store.set_meta('json_import_completed_at', datetime.now().isoformat())
+    print(f"SUCCESS: Imported {len(pending_acceptance)} pending acceptance, {len(pending_shipping)} pending shipping, "
+          f"{len(ledger)} accepted, {label_count} labelled and {len(shipped_and_validated)} shipped orders into {store.path}.")
+
+
+def open_order_store(path=ORDER_STORE_FILE, logs_root=LOGS_ROOT):
+    """ Opens the shared order store, importing the legacy JSON logs the first time it is used. """
+    store = OrderStore(path)
+    if store.get_meta('json_import_completed_at') is None:
+        with _json_import_lock:
+            # Another job may have finished the import while this one waited for the lock.
+            if store.get_meta('json_import_completed_at') is None:
+                print(f"INFO: Order store {path} has not been seeded yet. Importing existing JSON logs...")
+                import_json_logs(store, logs_root)
+    return store
+
+
+def main():
+    """ Runs the JSON log importer as a standalone script. """
+    print("\n--- Starting Order Store Import Script ---")
+    with OrderStore() as store:
+        import_json_logs(store)
+    print("--- Order Store Import Script Finished ---\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import requests
+
+# Add project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.best_buy_client import get_best_buy_client, ORDERS_PAGE_SIZE
+from common.order_store import open_order_store
+from common.order_sync import IncrementalOrderSync
+from common.order_snapshot import get_cycle_snapshot
+
+
+class PendingOrderQueue:
+    """
+    JSON file of the orders currently in one marketplace state, e.g. `pending_acceptance.json`.
+
+    `sync()` merges the latest API listing into the file and evicts orders
+    that have left the state, so the file only holds orders in flight.
+    An order is evicted when:
+      - the listing returns it in a different state;
+      - the order store reports a different state for it (the store is
+        updated by every listing, so this catches orders that moved on in
+        another phase); or
+      - the listing is complete (a full listing that finished) and the
+        order is not in it.
+    An incremental listing only holds orders that changed, so an order's
+    absence from it is never a reason to evict. The file is rewritten
+    atomically and only when something changed.
+
+    The workflow selects its work from the order store, so with a `store`,
+    a complete listing also evicts the missing orders there (see
+    `OrderStore.evict_unlisted_orders`). Otherwise a cancelled order would
+    stay selectable, and could still get a label.
+    """
+
+    def __init__(self, path, order_state):
+        self.path = path
+        self.order_state = order_state
+        self.name = os.path.basename(path)
+
+    def load(self):
+        """ Returns the queued orders, or an empty list if the file is missing or corrupted. """
+        if not os.path.exists(self.path):
+            print(f"INFO: {self.name} not found. A new file will be created.")
+            return []
+        with open(self.path, 'r') as f:
+            try:
+                orders = json.load(f)
+            except json.JSONDecodeError:
+                print(f"WARNING: {self.name} is corrupted. Starting fresh.")
+                return []
+        return orders if isinstance(orders, list) else []
+
+    def save(self, orders):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(orders, f, indent=4)
+        os.replace(temp_path, self.path)
+
+    def _left_state(self, order_id, listed_states, complete, store):
+        listed_state = listed_states.get(order_id)
+        if listed_state is not None:
+            return listed_state != self.order_state
+        if complete:
+            return True
+        if store is not None:
+            row = store.get_order(order_id)
+            return bool(row and row.get('order_state') and row['order_state'] != self.order_state)
+        return False
+
+    def sync(self, listed_orders, complete=False, store=None):
+        """
+        Merges a listing into the queue and evicts orders that have left the state.
+
+        `complete` must only be True for a full listing that was read to the
+        end. Returns an `(added, evicted)` pair of order ID lists.
+        """
+        listed_states = {}
+        latest = {}
+        for order in listed_orders:
+            listed_states[order['order_id']] = order.get('order_state') or self.order_state
+            latest[order['order_id']] = order
+
+        existing_orders = self.load()
+        remaining, evicted, seen = [], [], set()
+        changed = not os.path.exists(self.path)
+        for order in existing_orders:
+            order_id = order.get('order_id')
+            if order_id in seen:
+                changed = True
+                continue
+            seen.add(order_id)
+            if self._left_state(order_id, listed_states, complete, store):
+                evicted.append(order_id)
+                continue
+            refreshed = latest.get(order_id, order)
+            changed = changed or refreshed != order
+            remaining.append(refreshed)
+
+        added = []
+        for order_id, order in latest.items():
+            if order_id not in seen and listed_states[order_id] == self.order_state:
+                remaining.append(order)
+                added.append(order_id)
+
+        if added or evicted or changed:
+            self.save(remaining)
+        if complete and store is not None:
+            evicted_from_store = store.evict_unlisted_orders(self.order_state, latest)
+            if evicted_from_store:
+                print(f"INFO: Evicted {len(evicted_from_store)} orders that are no longer {self.order_state} from the order store: {evicted_from_store}")
+                evicted.extend(order_id for order_id in evicted_from_store if order_id not in evicted)
+        for order_id in added:
+            print(f"INFO: Added new order {order_id} to {self.name}.")
+        if evicted:
+            print(f"INFO: Evicted {len(evicted)} orders that are no longer {self.order_state} from {self.name}: {evicted}")
+        if not added and not evicted:
+            print(f"INFO: No orders added to or evicted from {self.name}.")
+        print(f"INFO: {self.name} holds {len(remaining)} {self.order_state} orders.")
+        return added, evicted
+
+    def compact(self, store):
+        """ Evicts every queued order the order store no longer reports in this state. Returns the evicted IDs. """
+        _, evicted = self.sync([], complete=False, store=store)
+        return evicted
+
+
+def iter_state_order_pages(api_key, order_state, page_size=ORDERS_PAGE_SIZE, sync=None):
+    """ Streams the orders in `order_state` from the Best Buy API, one page at a time. """
+    if not api_key:
+        print("ERROR: API key is missing. Cannot retrieve orders.")
+        return
+
+    if sync is not None:
+        params = sync.params()
+        print(f"INFO: Calling Best Buy API to retrieve '{order_state}' orders ({sync.describe()})...")
+    else:
+        params = {
+            'order_state_codes': order_state
+        }
+        print(f"INFO: Calling Best Buy API to retrieve '{order_state}' orders...")
+
+    order_count = 0
+    try:
+        for page in get_best_buy_client(api_key).iter_order_pages(params, page_size):
+            order_count += len(page)
+            if sync is not None:
+                sync.observe(page)
+            yield page
+    except requests.exceptions.RequestException as e:
+        print(f"ERROR: API request failed after {order_count} orders: {e}")
+        return
+
+    if sync is not None:
+        sync.commit()
+    print(f"SUCCESS: Found {order_count} '{order_state}' orders from API.")
+
+def _snapshot_pages(snapshot, order_state):
+    """ Serves the `order_state` orders from the scheduler's per-cycle order snapshot. """
+    try:
+        orders = snapshot.orders(order_state)
+    except requests.exceptions.RequestException as e:
+        print(f"ERROR: API request failed while fetching the order snapshot: {e}")
+        return
+    print(f"INFO: Using {len(orders)} '{order_state}' orders from this cycle's order snapshot.")
+    yield orders
+
+def refresh_pending_queue(api_key, order_state, path):
+    """
+    Lists the orders in `order_state`, records them in the order store and syncs the pending file at `path`.
+
+    The listing comes from this cycle's order snapshot when the scheduler
+    took one, and from an incremental API sync otherwise. Returns the IDs
+    of orders seen for the first time.
+    """
+    listed_orders = []
+    with open_order_store() as store:
+        snapshot = get_cycle_snapshot()
+        sync = None
+        if snapshot is not None:
+            pages = _snapshot_pages(snapshot, order_state)
+        else:
+            sync = IncrementalOrderSync(store, order_state)
+            pages = iter_state_order_pages(api_key, order_state, sync=sync)
+        for page in pages:
+            store.upsert_orders(page)
+            listed_orders.extend(page)
+        # Only a full listing that finished proves an absent order has left the state.
+        complete = snapshot.is_complete(order_state) if snapshot is not None else sync.is_full_sync and sync.committed
+        print(f"INFO: Updating {path}...")
+        added, _ = PendingOrderQueue(path, order_state).sync(listed_orders, complete=complete, store=store)
+    return added
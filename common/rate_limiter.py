@@ -0,0 +1,89 @@
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that adapts its refill rate to throttling.
+
+    `rate` tokens are added per second, up to `capacity`. Each call takes one
+    token and waits if none is left. When the API throttles us, `penalize()`
+    halves the rate (down to `min_rate`); each success lets `reward()` raise
+    it again towards the configured rate.
+    """
+
+    def __init__(self, rate, capacity, min_rate=None, clock=time.monotonic, sleep=time.sleep):
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.min_rate = float(min_rate) if min_rate else self.base_rate / 8
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """ Blocks until a token is available, then takes it. """
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+    def penalize(self):
+        """ Slows the bucket down after a throttled response. """
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def reward(self):
+        """ Moves the rate back towards its configured value after a successful call. """
+        if self.rate >= self.base_rate:
+            return
+        with self._lock:
+            self._refill()
+            self.rate = min(self.base_rate, self.rate * 1.1)
+
+
+def parse_retry_after(value):
+    """ Returns the delay in seconds from a Retry-After header (seconds or HTTP-date), or None. """
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def compute_backoff(attempt, base_delay, max_delay, retry_after=None):
+    """
+    Returns how long to wait before retry number `attempt` (starting at 0).
+
+    Uses full-jitter exponential backoff capped at `max_delay`, but never
+    waits less than the server's Retry-After, even when that is longer than
+    the cap. Callers decide whether a long Retry-After is worth waiting for.
+    """
+    delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+# Add project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.best_buy_client import get_best_buy_client
+
+# --- Configuration ---
+READINESS_INITIAL_DELAY_SECONDS = 1
+READINESS_MAX_DELAY_SECONDS = 8
+READINESS_BACKOFF_FACTOR = 2
+READINESS_TIMEOUT_SECONDS = 60
+
+
+def wait_until(condition, timeout=READINESS_TIMEOUT_SECONDS, initial_delay=READINESS_INITIAL_DELAY_SECONDS,
+               max_delay=READINESS_MAX_DELAY_SECONDS, factor=READINESS_BACKOFF_FACTOR,
+               sleep=time.sleep, clock=time.monotonic):
+    """
+    Polls `condition()` until it returns a truthy value or `timeout` seconds pass.
+
+    The first check runs immediately. The delay between checks starts at
+    `initial_delay` and grows by `factor` up to `max_delay`, and a sleep
+    never runs past the deadline. Returns the last value of `condition()`,
+    so a falsy result means the deadline was reached.
+    """
+    deadline = clock() + timeout
+    delay = initial_delay
+    while True:
+        result = condition()
+        if result:
+            return result
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return result
+        sleep(min(delay, remaining))
+        delay = min(max_delay, delay * factor)
+
+
+def wait_for_orders(api_key, order_ids, is_ready, timeout=READINESS_TIMEOUT_SECONDS, **kwargs):
+    """
+    Waits until every order in `order_ids` satisfies `is_ready(order)`.
+
+    Each poll is one batched `order_ids` lookup covering only the orders
+    that are not ready yet, so the set being polled shrinks as the API
+    catches up. Returns the IDs that were still not ready at the deadline
+    (an empty set means everything was ready).
+    """
+    remaining = set(order_id for order_id in order_ids if order_id)
+    total = len(remaining)
+    if not remaining:
+        return set()
+    client = get_best_buy_client(api_key)
+
+    def all_ready():
+        orders = client.get_orders_by_ids(sorted(remaining))
+        for order_id, order in orders.items():
+            if is_ready(order):
+                remaining.discard(order_id)
+        return not remaining
+
+    started = time.monotonic()
+    if wait_until(all_ready, timeout=timeout, **kwargs):
+        print(f"INFO: {total} order(s) reached the expected state after {time.monotonic() - started:.1f}s.")
+    else:
+        print(f"WARNING: {len(remaining)} order(s) had not reached the expected state after {timeout}s: {sorted(remaining)}")
+    return remaining
@@ -0,0 +1,287 @@
+import os
+import gzip
+import json
+import shutil
+import threading
+from datetime import datetime
+from common.utils import append_json_lines
+
+# --- Configuration ---
+# Entries are grouped into one segment per period; every segment but the current one is sealed and compressed.
+SEGMENT_PERIOD_FORMATS = {
+    'day': '%Y-%m-%d',
+    'month': '%Y-%m',
+}
+DEFAULT_SEGMENT_PERIOD = 'month'
+MANIFEST_FILE = 'manifest.json'
+LEGACY_SEGMENT = 'legacy'
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def _local_time(value):
+    """
+    Returns a timestamp (ISO string or datetime) as a naive local-time ISO string, or None if it cannot be parsed.
+
+    Entries are stamped with `datetime.now().isoformat()`, but some carry
+    the API's UTC times (`...Z`). Both are reduced to naive local time, so
+    the manifest boundaries, segment names and range filters can all be
+    compared as plain strings.
+    """
+    if isinstance(value, str) and value:
+        try:
+            value = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _entry_time(entry, timestamp_key):
+    """ Returns the timestamp of an entry as a naive local-time ISO string, or None. """
+    if isinstance(entry, dict):
+        return _local_time(entry.get(timestamp_key))
+    return None
+
+
+class SegmentedLog:
+    """
+    Append-only log split into time-based JSON Lines segments.
+
+    New entries go to the segment for the current period, e.g.
+    `2026-10.jsonl`. When a new period starts, earlier segments are sealed:
+    they are gzip-compressed to `<period>.jsonl.gz` and never rewritten
+    again. A small `manifest.json` records each segment's entry count,
+    first and last timestamps, and whether it is sealed. `read(start, end)`
+    can therefore skip segments outside the requested time range without
+    opening them.
+
+    If `legacy_path` points at an old JSON-array log, its entries are split
+    into sealed segments by timestamp the first time the log is opened.
+    Entries without a timestamp go to a `legacy` segment. The legacy file
+    is left untouched.
+    """
+
+    def __init__(self, directory, period=DEFAULT_SEGMENT_PERIOD, legacy_path=None,
+                 timestamp_key='timestamp', clock=datetime.now):
+        if period not in SEGMENT_PERIOD_FORMATS:
+            raise ValueError(f"Unknown segment period: {period}")
+        self.directory = directory
+        self.period_format = SEGMENT_PERIOD_FORMATS[period]
+        self.timestamp_key = timestamp_key
+        self._clock = clock
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._load_manifest()
+        if legacy_path and not self.manifest.get('legacy_imported'):
+            self._import_legacy(legacy_path)
+
+    # --- Manifest ---
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def _load_manifest(self):
+        path = self._manifest_path()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                try:
+                    manifest = json.load(f)
+                    if isinstance(manifest.get('segments'), dict):
+                        # Manifests written before boundaries were kept in local time may hold UTC strings.
+                        for info in manifest['segments'].values():
+                            info['first'] = _local_time(info.get('first'))
+                            info['last'] = _local_time(info.get('last'))
+                        return manifest
+                except (json.JSONDecodeError, AttributeError):
+                    pass
+            print(f"WARNING: {path} is corrupted. Rebuilding it from the segment files.")
+            return self._rebuild_manifest()
+        return {"segments": {}, "legacy_imported": False}
+
+    def _rebuild_manifest(self):
+        manifest = {"segments": {}, "legacy_imported": True}
+        self.manifest = manifest
+        for file_name in sorted(os.listdir(self.directory)):
+            if file_name.endswith('.jsonl') or file_name.endswith('.jsonl.gz'):
+                name = file_name.split('.jsonl', 1)[0]
+                sealed = file_name.endswith('.gz')
+                entries = list(self._read_segment_file(os.path.join(self.directory, file_name)))
+                self._note_segment(name, entries, sealed=sealed)
+        self._save_manifest()
+        return manifest
+
+    def _save_manifest(self):
+        path = self._manifest_path()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(temp_path, path)
+
+    def _note_segment(self, name, entries, sealed=False, appended_at=None):
+        """ Updates a segment's manifest record with newly written entries. """
+        info = self.manifest['segments'].setdefault(name, {"count": 0, "first": None, "last": None, "sealed": False})
+        info['count'] += len(entries)
+        times = [t for t in (_entry_time(entry, self.timestamp_key) for entry in entries) if t]
+        if appended_at:
+            times.append(appended_at)
+        if times:
+            info['first'] = min([t for t in [info['first']] + times if t])
+            info['last'] = max([t for t in [info['last']] + times if t])
+        info['sealed'] = sealed or info['sealed']
+
+    # --- Segment files ---
+
+    def _active_path(self, name):
+        return os.path.join(self.directory, f"{name}.jsonl")
+
+    def _sealed_path(self, name):
+        return os.path.join(self.directory, f"{name}.jsonl.gz")
+
+    def _read_segment_file(self, path):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted append is skipped, not fatal.
+                    continue
+
+    def _write_sealed(self, name, entries):
+        """ Writes (or extends) a sealed segment. Only used while importing legacy logs. """
+        path = self._sealed_path(name)
+        existing = list(self._read_segment_file(path)) if os.path.exists(path) else []
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            for entry in existing + entries:
+                f.write(json.dumps(entry) + '\n')
+        os.replace(temp_path, path)
+        self._note_segment(name, entries, sealed=True)
+
+    def _write_active(self, name, entries, appended_at=None):
+        """ Appends entries to the (unsealed) segment file for a period. """
+        append_json_lines(self._active_path(name), entries)
+        self._note_segment(name, entries, appended_at=appended_at)
+
+    def _seal(self, name):
+        """ Compresses a finished segment and marks it sealed. """
+        active_path = self._active_path(name)
+        if os.path.exists(active_path):
+            temp_path = f"{self._sealed_path(name)}.tmp"
+            with open(active_path, 'rb') as source, gzip.open(temp_path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.replace(temp_path, self._sealed_path(name))
+            os.remove(active_path)
+        self.manifest['segments'].setdefault(name, {"count": 0, "first": None, "last": None, "sealed": False})['sealed'] = True
+
+    def _import_legacy(self, legacy_path):
+        entries = []
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'r') as f:
+                try:
+                    data = json.load(f)
+                    entries = data if isinstance(data, list) else []
+                except json.JSONDecodeError:
+                    print(f"WARNING: {legacy_path} is corrupted. Starting its segmented log empty.")
+
+        buckets = {}
+        for entry in entries:
+            timestamp = _entry_time(entry, self.timestamp_key)
+            name = datetime.fromisoformat(timestamp).strftime(self.period_format) if timestamp else LEGACY_SEGMENT
+            buckets.setdefault(name, []).append(entry)
+
+        current = self.current_segment()
+        with self._lock:
+            for name, bucket in sorted(buckets.items()):
+                if name == current:
+                    self._write_active(name, bucket)
+                else:
+                    self._write_sealed(name, bucket)
+            self.manifest['legacy_imported'] = True
+            self._save_manifest()
+        if entries:
+            print(f"INFO: Imported {len(entries)} entries from {legacy_path} into {len(buckets)} segments in {self.directory}.")
+
+    # --- Public API ---
+
+    def current_segment(self):
+        return self._clock().strftime(self.period_format)
+
+    def append(self, entries):
+        """ Appends entries (a dict or a list of dicts) to the current segment, sealing older segments first. """
+        if isinstance(entries, dict):
+            entries = [entries]
+        if not entries:
+            return 0
+        now = self._clock()
+        name = now.strftime(self.period_format)
+        with self._lock:
+            for other, info in self.manifest['segments'].items():
+                if other != name and not info['sealed']:
+                    self._seal(other)
+            if self.manifest['segments'].get(name, {}).get('sealed'):
+                # Entries for a sealed period (e.g. after a clock change) are appended as a new gzip member.
+                with gzip.open(self._sealed_path(name), 'at', encoding='utf-8') as f:
+                    f.writelines(json.dumps(entry) + '\n' for entry in entries)
+                self._note_segment(name, entries, appended_at=now.isoformat())
+            else:
+                self._write_active(name, entries, appended_at=now.isoformat())
+            self._save_manifest()
+        return len(entries)
+
+    def segments(self, start=None, end=None):
+        """ Returns the names of segments that may hold entries between `start` and `end` (ISO strings or datetimes). """
+        start, end = _local_time(start), _local_time(end)
+        selected = []
+        for name, info in self.manifest['segments'].items():
+            if info['first'] and info['last']:
+                if start and info['last'] < start:
+                    continue
+                if end and info['first'] > end:
+                    continue
+            selected.append(name)
+        return sorted(selected, key=lambda name: (self.manifest['segments'][name]['first'] or '', name))
+
+    def read(self, start=None, end=None):
+        """ Yields entries in append order, limited to the segments (and entry timestamps) within the range. """
+        start, end = _local_time(start), _local_time(end)
+        for name in self.segments(start, end):
+            info = self.manifest['segments'][name]
+            path = self._sealed_path(name) if info['sealed'] else self._active_path(name)
+            if not os.path.exists(path):
+                continue
+            for entry in self._read_segment_file(path):
+                timestamp = _entry_time(entry, self.timestamp_key)
+                if timestamp and ((start and timestamp < start) or (end and timestamp > end)):
+                    continue
+                yield entry
+
+    def __len__(self):
+        return sum(info['count'] for info in self.manifest['segments'].values())
+
+
+def segmented_log_dir(legacy_path):
+    """ Returns the segment directory used in place of a legacy JSON log, e.g. `x.json` -> `x.segments/`. """
+    return f"{os.path.splitext(legacy_path)[0]}.segments"
+
+
+def get_segmented_log(legacy_path, period=DEFAULT_SEGMENT_PERIOD, timestamp_key='timestamp'):
+    """
+    Returns the process-wide segmented log that replaces a legacy JSON-array log file.
+    The legacy file is imported the first time its segment directory is created.
+    """
+    key = os.path.abspath(legacy_path)
+    with _logs_lock:
+        log = _logs.get(key)
+        if log is None:
+            log = SegmentedLog(segmented_log_dir(legacy_path), period, legacy_path=legacy_path, timestamp_key=timestamp_key)
+            _logs[key] = log
+        return log
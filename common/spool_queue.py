@@ -0,0 +1,163 @@
+import os
+import time
+
+# --- Configuration ---
+SPOOL_STATES = ('pending', 'claimed', 'done', 'failed')
+# A claim not renewed or finished within this many seconds is treated as abandoned and returned to pending.
+DEFAULT_LEASE_SECONDS = 15 * 60
+
+
+class SpoolItem:
+    """ A claimed spool file. `name` is the file name, `path` its location under claimed/. """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+
+    @property
+    def key(self):
+        """ The file name without its extension, e.g. the order ID for `<order_id>.xml`. """
+        return os.path.splitext(self.name)[0]
+
+    def read(self):
+        with open(self.path, 'r') as f:
+            return f.read()
+
+    def __repr__(self):
+        return f"SpoolItem({self.name!r})"
+
+
+class SpoolQueue:
+    """
+    File-based work queue made of pending/, claimed/, done/ and failed/ directories.
+
+    Producers `enqueue()` a file into pending/. It is written under a
+    temporary name and then renamed, so consumers never see half-written
+    work. Consumers `claim()` files by renaming them into claimed/. Only
+    one worker can win each rename, so several workers can share a spool.
+    A claim is a lease, recorded as the claimed file's mtime. A claim that
+    is neither finished (`complete()` / `fail()`) nor `renew()`ed within
+    `lease_seconds` goes back to pending. Only pending/ and claimed/ are
+    listed per cycle, so the cost stays flat as done/ grows.
+    """
+
+    def __init__(self, root, lease_seconds=DEFAULT_LEASE_SECONDS, clock=time.time):
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self._clock = clock
+        self.dirs = {state: os.path.join(root, state) for state in SPOOL_STATES}
+        for path in self.dirs.values():
+            os.makedirs(path, exist_ok=True)
+        self._adopt_loose_files()
+
+    def _adopt_loose_files(self):
+        """ Moves files left directly in the spool root (the pre-queue layout) into pending/. """
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isfile(path) and not name.startswith('.'):
+                os.replace(path, os.path.join(self.dirs['pending'], name))
+
+    def _path(self, state, name):
+        return os.path.join(self.dirs[state], name)
+
+    def state_of(self, name):
+        """ Returns which directory currently holds `name`, or None. """
+        for state in SPOOL_STATES:
+            if os.path.exists(self._path(state, name)):
+                return state
+        return None
+
+    def enqueue(self, name, content):
+        """
+        Atomically adds a file to pending/.
+
+        Returns False without writing when the same name is already claimed
+        or done, so finished work is never resubmitted. A previously failed
+        file is replaced and retried.
+        """
+        if self.state_of(name) in ('claimed', 'done'):
+            return False
+        temp_path = self._path('pending', f".{name}.tmp")
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        os.replace(temp_path, self._path('pending', name))
+        failed_path = self._path('failed', name)
+        if os.path.exists(failed_path):
+            os.remove(failed_path)
+        return True
+
+    def pending(self):
+        """ Returns the names waiting in pending/. """
+        return sorted(name for name in os.listdir(self.dirs['pending']) if not name.startswith('.'))
+
+    def reclaim_expired(self):
+        """ Returns claims whose lease has expired to pending/. Returns the reclaimed names. """
+        reclaimed = []
+        now = self._clock()
+        for name in os.listdir(self.dirs['claimed']):
+            path = self._path('claimed', name)
+            try:
+                if now - os.path.getmtime(path) < self.lease_seconds:
+                    continue
+                os.replace(path, self._path('pending', name))
+            except FileNotFoundError:
+                continue
+            print(f"WARNING: Lease on spool item {name} expired; returning it to pending.")
+            reclaimed.append(name)
+        return reclaimed
+
+    def claim(self, limit=None):
+        """ Claims up to `limit` pending files (all of them by default) and returns them as SpoolItems. """
+        self.reclaim_expired()
+        items = []
+        for name in self.pending():
+            if limit is not None and len(items) >= limit:
+                break
+            claimed_path = self._path('claimed', name)
+            try:
+                os.replace(self._path('pending', name), claimed_path)
+            except FileNotFoundError:
+                # Another worker claimed it first.
+                continue
+            now = self._clock()
+            os.utime(claimed_path, (now, now))
+            items.append(SpoolItem(name, claimed_path))
+        return items
+
+    def renew(self, item):
+        """ Extends the lease on a claimed item. """
+        now = self._clock()
+        os.utime(item.path, (now, now))
+
+    def _finish(self, item, state):
+        target = self._path(state, item.name)
+        try:
+            os.replace(item.path, target)
+        except FileNotFoundError:
+            print(f"WARNING: Spool item {item.name} was no longer claimed when it finished.")
+            return
+        item.path = target
+
+    def complete(self, item):
+        """ Moves a claimed item to done/. """
+        self._finish(item, 'done')
+
+    def fail(self, item):
+        """ Moves a claimed item to failed/, where the next enqueue of the same name retries it. """
+        self._finish(item, 'failed')
+
+    def release(self, item, content=None):
+        """ Returns a claimed item to pending/ so it is claimed again, optionally replacing its content. """
+        if content is None:
+            self._finish(item, 'pending')
+            return
+        target = self._path('pending', item.name)
+        temp_path = self._path('pending', f".{item.name}.tmp")
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        os.replace(temp_path, target)
+        try:
+            os.remove(item.path)
+        except FileNotFoundError:
+            pass
+        item.path = target
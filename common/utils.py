@@ -1,4 +1,5 @@
 import os
+import json
 
 SECRETS_FILE = os.path.join(os.path.dirname(__file__), '..', 'secrets.txt')
 
@@ -16,6 +17,22 @@ def get_secret(key_name):
         print(f"ERROR: {SECRETS_FILE} not found.")
         return None
 
+def append_json_lines(path, entries):
+    """
+    Appends entries to a JSON Lines file and fsyncs it. If the file ends in a torn
+    line from an interrupted write, a newline is written first so the new entries
+    start on their own lines (readers skip the torn line).
+    """
+    with open(path, 'ab+') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write(''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
 def get_best_buy_api_key():
     """ Helper function to get the Best Buy API key. """
     return get_secret('BEST_BUY_API_KEY')
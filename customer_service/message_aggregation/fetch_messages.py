@@ -1,9 +1,15 @@
 import json
 import os
-import requests
+import sys
+import threading
 from datetime import datetime, timedelta
 
-API_BASE_URL = "https://marketplace.bestbuy.ca/api"
+# Add project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.best_buy_client import get_best_buy_client
+
+# Polled and pushed messages are saved from different scheduler jobs; their read-modify-write of the messages file is serialised.
+_messages_file_lock = threading.Lock()
 
 def load_api_key(secret_file="secrets.txt"):
     """Loads the Best Buy API key from the secrets file."""
@@ -23,7 +29,7 @@ def get_new_messages(api_key):
     """
     print("Connecting to Mirakl API to check for new messages...")
 
-    headers = {"Authorization": api_key}
+    client = get_best_buy_client(api_key)
 
     # For testing, we'll fetch threads updated in the last 24 hours.
     # A more robust implementation would store the timestamp of the last run.
@@ -41,7 +47,7 @@ def get_new_messages(api_key):
         if next_page_token:
             params["page_token"] = next_page_token
 
-        response = requests.get(f"{API_BASE_URL}/inbox/threads", headers=headers, params=params)
+        response = client.get("/inbox/threads", params=params)
 
         if response.status_code != 200:
             print(f"Error fetching messages: {response.status_code} - {response.text}")
@@ -78,12 +84,35 @@ def transform_threads_to_messages(threads):
             })
     return transformed_messages
 
+def transform_message_events(events):
+    """
+    Transforms `message.created` webhook events (see common/event_queue.py) into the same message format.
+    """
+    transformed_messages = []
+    for event in events:
+        data = event["data"]
+        transformed_messages.append({
+            "message_id": data["message_id"],
+            "thread_id": data["thread_id"],
+            "order_id": data.get("order_id") or "N/A",
+            "customer_id": data.get("customer_id") or "N/A",
+            "subject": data.get("subject", ""),
+            "message": data["body"],
+            "timestamp": event.get("occurred_at") or event["received_at"],
+            "status": "UNREAD"
+        })
+    return transformed_messages
+
 def save_messages_to_json(messages, file_path="customer_service/messages.json"):
     """
     Saves a list of messages to a JSON file.
     """
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
+    with _messages_file_lock:
+        _merge_messages_into_file(messages, file_path)
+
+def _merge_messages_into_file(messages, file_path):
     try:
         with open(file_path, "r") as f:
             existing_messages = json.load(f)
@@ -0,0 +1,77 @@
+import hmac
+import os
+import sys
+
+from flask import Flask, request, jsonify
+
+# Add project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.event_queue import EVENTS_DIR, EventValidationError, validate_event, enqueue_event
+from common.utils import get_secret
+
+# --- Configuration ---
+HOST = '127.0.0.1'
+PORT = 5002
+# Largest number of events accepted in one request body.
+MAX_BATCH_SIZE = 100
+
+app = Flask(__name__)
+app.config['EVENTS_DIR'] = EVENTS_DIR
+# Shared secret the sender must pass in the X-Webhook-Token header. Every request is refused until it is set.
+app.config['WEBHOOK_TOKEN'] = None
+
+
+def _is_authorized():
+    expected = app.config.get('WEBHOOK_TOKEN')
+    if not expected:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Webhook-Token', ''), expected)
+
+def _ingest(payload):
+    """ Validates and queues one event. Returns its result entry and HTTP status. """
+    try:
+        event = validate_event(payload)
+    except EventValidationError as e:
+        event_id = payload.get('event_id') if isinstance(payload, dict) else None
+        return {"event_id": event_id, "status": "rejected", "error": str(e)}, 400
+
+    if enqueue_event(event, app.config['EVENTS_DIR']):
+        return {"event_id": event['event_id'], "status": "queued"}, 202
+    return {"event_id": event['event_id'], "status": "duplicate"}, 200
+
+@app.route('/health')
+def health():
+    return jsonify({"status": "ok"}), 200
+
+@app.route('/api/events', methods=['POST'])
+def receive_events():
+    """
+    Accepts one marketplace event, or a list of up to MAX_BATCH_SIZE events.
+    Expects JSON body: {"event_id": "...", "event_type": "order.state_changed", "occurred_at": "...", "data": {...}}
+
+    A single event returns 202 when queued, 200 when it was already received and 400 when invalid.
+    A batch always returns 200 with a result per event, so one bad event never causes the others to be resent.
+    """
+    if not _is_authorized():
+        return jsonify({"error": "invalid or missing X-Webhook-Token"}), 401
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({"error": "request body must be JSON"}), 400
+
+    if isinstance(payload, list):
+        if len(payload) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"at most {MAX_BATCH_SIZE} events per request"}), 413
+        results = [_ingest(item)[0] for item in payload]
+        return jsonify({"results": results}), 200
+
+    result, status = _ingest(payload)
+    return jsonify(result), status
+
+if __name__ == '__main__':
+    app.config['WEBHOOK_TOKEN'] = get_secret('WEBHOOK_TOKEN')
+    if not app.config['WEBHOOK_TOKEN']:
+        print("ERROR: WEBHOOK_TOKEN is not set in secrets.txt. The service refuses events without a shared token.")
+        sys.exit(1)
+    # Listens on localhost only. Expose it through a reverse proxy or tunnel that terminates TLS.
+    app.run(host=HOST, port=PORT)
@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+
+import requests
+
+# Add project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.utils import get_secret
+
+# --- Configuration ---
+DEFAULT_URL = 'http://127.0.0.1:5002/api/events'
+
+
+def build_order_event(order_id, order_state):
+    return {
+        "event_id": f"evt-{uuid.uuid4()}",
+        "event_type": "order.state_changed",
+        "occurred_at": datetime.now(timezone.utc).isoformat(),
+        "data": {"order_id": order_id, "order_state": order_state},
+    }
+
+def build_message_event(order_id, body, subject="Question about my order"):
+    return {
+        "event_id": f"evt-{uuid.uuid4()}",
+        "event_type": "message.created",
+        "occurred_at": datetime.now(timezone.utc).isoformat(),
+        "data": {
+            "thread_id": f"thread-{order_id}",
+            "message_id": f"msg-{uuid.uuid4()}",
+            "order_id": order_id,
+            "customer_id": "stand-in-customer",
+            "subject": subject,
+            "body": body,
+        },
+    }
+
+def send_events(events, url=DEFAULT_URL, token=None):
+    """ Posts events to the ingestion service and prints each result. """
+    headers = {'X-Webhook-Token': token} if token else {}
+    body = events[0] if len(events) == 1 else events
+    response = requests.post(url, json=body, headers=headers, timeout=10)
+    print(f"INFO: {response.status_code} {response.text.strip()}")
+    return response
+
+def main():
+    """ Stand-in for the marketplace: sends sample events to a locally running ingestion service. """
+    parser = argparse.ArgumentParser(description="Send sample marketplace events to the local ingestion service.")
+    parser.add_argument('kind', choices=('order', 'message'))
+    parser.add_argument('--order-id', default='TEST-ORDER-1')
+    parser.add_argument('--state', default='WAITING_ACCEPTANCE', help="order_state for order events")
+    parser.add_argument('--body', default='Hi, when will my order ship?', help="message body for message events")
+    parser.add_argument('--count', type=int, default=1, help="number of events to send in one batch")
+    parser.add_argument('--duplicate', action='store_true', help="send the same events a second time to check deduplication")
+    parser.add_argument('--url', default=DEFAULT_URL)
+    args = parser.parse_args()
+
+    if args.kind == 'order':
+        events = [build_order_event(args.order_id, args.state) for _ in range(args.count)]
+    else:
+        events = [build_message_event(args.order_id, args.body) for _ in range(args.count)]
+
+    token = get_secret('WEBHOOK_TOKEN')
+    send_events(events, args.url, token)
+    if args.duplicate:
+        print("INFO: Resending the same events...")
+        send_events(events, args.url, token)
+
+if __name__ == '__main__':
+    main()
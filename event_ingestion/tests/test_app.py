@@ -0,0 +1,96 @@
+import unittest
+import json
+import shutil
+import tempfile
+
+# Add project root to path to allow importing 'app'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from event_ingestion.src.app import app
+from common.event_queue import consume_events
+
+
+def order_event(event_id='evt-1', order_state='WAITING_ACCEPTANCE'):
+    return {
+        "event_id": event_id,
+        "event_type": "order.state_changed",
+        "occurred_at": "2026-10-17T12:00:00Z",
+        "data": {"order_id": "ORDER-1", "order_state": order_state},
+    }
+
+class TestEventApi(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a test client writing to a temporary events directory."""
+        self.events_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.events_dir)
+        app.config.update(EVENTS_DIR=self.events_dir, WEBHOOK_TOKEN='test-token')
+        self.app = app.test_client()
+        self.app.testing = True
+
+    def post(self, body, headers=None):
+        headers = {'X-Webhook-Token': 'test-token'} if headers is None else headers
+        return self.app.post('/api/events', data=json.dumps(body), content_type='application/json', headers=headers)
+
+    def queued(self, queue_name):
+        handled = []
+        consume_events(queue_name, handled.extend, self.events_dir)
+        return handled
+
+    def test_event_is_queued_once(self):
+        response = self.post(order_event())
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.data)['status'], 'queued')
+
+        response = self.post(order_event())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['status'], 'duplicate')
+
+        events = self.queued('orders')
+        self.assertEqual([event['event_id'] for event in events], ['evt-1'])
+        self.assertEqual(events[0]['data']['order_state'], 'WAITING_ACCEPTANCE')
+
+    def test_redelivery_after_processing_is_ignored(self):
+        self.post(order_event())
+        self.queued('orders')
+        self.assertEqual(json.loads(self.post(order_event()).data)['status'], 'duplicate')
+        self.assertEqual(self.queued('orders'), [])
+
+    def test_invalid_event_is_rejected(self):
+        event = order_event()
+        del event['data']['order_state']
+        response = self.post(event)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('order_state', json.loads(response.data)['error'])
+
+        response = self.post(dict(order_event(), event_type='order.deleted'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.queued('orders'), [])
+
+    def test_batch_returns_a_result_per_event(self):
+        message = {
+            "event_id": "evt-2",
+            "event_type": "message.created",
+            "data": {"thread_id": "T-1", "message_id": "M-1", "body": "Hello"},
+        }
+        response = self.post([order_event(), message, {"event_id": "evt-3"}])
+        self.assertEqual(response.status_code, 200)
+        statuses = [result['status'] for result in json.loads(response.data)['results']]
+        self.assertEqual(statuses, ['queued', 'queued', 'rejected'])
+        self.assertEqual(len(self.queued('messages')), 1)
+
+    def test_token_is_required(self):
+        self.assertEqual(self.post(order_event(), headers={}).status_code, 401)
+        self.assertEqual(self.post(order_event(), headers={'X-Webhook-Token': 'wrong'}).status_code, 401)
+        app.config['WEBHOOK_TOKEN'] = None
+        self.assertEqual(self.post(order_event()).status_code, 401)
+        self.assertEqual(self.queued('orders'), [])
+
+    def test_non_json_body_is_rejected(self):
+        response = self.app.post('/api/events', data='not json', content_type='text/plain', headers={'X-Webhook-Token': 'test-token'})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import tempfile
 from unittest.mock import patch, MagicMock
 
 # Add project root to path to allow importing 'logic'
@@ -8,6 +9,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
 
 # Now we can import the logic module
 from fulfillment_service.src import logic
+from common.order_store import OrderStore
 
 class TestLogic(unittest.TestCase):
 
@@ -61,6 +63,36 @@ class TestLogic(unittest.TestCase):
         self.assertIn("RAM-123", work_order['required_components'])
         self.assertEqual(work_order['required_components']['RAM-123'], 'ram')
 
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.log_shipping_data')
+    @patch('requests.Session.post')
+    @patch('fulfillment_service.src.logic.download_label')
+    @patch('fulfillment_service.src.logic.create_xml_payload', return_value="<shipment/>")
+    @patch('fulfillment_service.src.logic.get_canada_post_credentials', return_value=("user", "pass", "123", "456", "789"))
+    def test_generated_label_queues_tracking_push(self, mock_credentials, mock_payload, mock_download, mock_post, mock_log):
+        """
+        Test that a label created through the service is queued for the tracking push to Best Buy.
+        """
+        mock_post.return_value = MagicMock(status_code=200, text="""
+        <shipment-info xmlns="http://www.canadapost.ca/ws/shipment-v8">
+            <tracking-pin>TRACK-123</tracking-pin>
+            <links><link rel="label" href="http://example.com/label.pdf"/></links>
+        </shipment-info>
+        """)
+        mock_download.side_effect = lambda url, user, password, path: open(path, 'wb').close()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, 'order_lifecycle.db')
+            with patch('fulfillment_service.src.logic.PDF_OUTPUT_DIR', temp_dir), \
+                 patch('shipping.canada_post.cp_shipping.cp_pdf_labels.open_order_store', lambda: OrderStore(db_path)):
+                label_info, error = logic.generate_shipping_label({"order_id": "TEST-1"})
+
+            self.assertIsNone(error)
+            self.assertEqual(label_info['tracking_pin'], "TRACK-123")
+            with OrderStore(db_path) as store:
+                due = store.select_due_tracking_pushes()
+                self.assertEqual([(entry['order_id'], entry['tracking_pin']) for entry in due], [("TEST-1", "TRACK-123")])
+                self.assertTrue(store.get_order("TEST-1")['label_created'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,57 +1,88 @@
-import time
+import sys
+import os
+
+# Add project root to the Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
 from Orders.pending_acceptance.orders_pending_acceptance.retieve_pending_acceptance import main as retrieve_main
 from Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders import main as accept_main
 from Orders.pending_acceptance.accept_pending_orders_validation.order_acceptance_validation import validate_acceptance
+from common.utils import get_best_buy_api_key
+from common.readiness import wait_for_orders
+
+# How long to wait for accepted orders to leave WAITING_ACCEPTANCE before validating anyway.
+ACCEPTANCE_READY_TIMEOUT_SECONDS = 60
+
+
+def wait_for_acceptances(accepted_order_ids):
+    """ Polls only the just-accepted orders until none of them is still WAITING_ACCEPTANCE. """
+    if not accepted_order_ids:
+        return set()
+    api_key = get_best_buy_api_key()
+    if not api_key:
+        return set(accepted_order_ids)
+    print(f"\nINFO: Waiting for the API to process {len(accepted_order_ids)} acceptance(s)...")
+    return wait_for_orders(
+        api_key,
+        accepted_order_ids,
+        lambda order: order.get('order_state') != 'WAITING_ACCEPTANCE',
+        timeout=ACCEPTANCE_READY_TIMEOUT_SECONDS,
+    )
+
+def main_orchestrator():
+    """
+    Orchestrates the entire order acceptance process flow.
+    Returns how many new pending orders were seen, which drives the scheduler's polling cadence.
+    """
+    print("=============================================")
+    print("=== PHASE 1: Best Buy Order Acceptance ===")
+    print("=============================================")
+
+    max_retries = 3
+    retry_count = 0
+    new_order_count = 0
+
+    while retry_count < max_retries:
+        print(f"\n>>> Main Loop Attempt: {retry_count + 1}/{max_retries} <<<")
+
+        print("\n>>> STEP 1.1: Retrieving all orders pending acceptance...")
+        new_order_count += len(retrieve_main() or [])
+
+        print("\n>>> STEP 1.2: Sending requests to accept new orders...")
+        accepted_order_ids = accept_main()
 
-def main_orchestrator(): """ Orchestrates the entire order acceptance process flow. """ 
-print("=============================================") 
-print("=== PHASE 1: Best Buy Order Acceptance ===") 
-print("=============================================")
-
-max_retries = 3
-retry_count = 0
-
-while retry_count < max_retries:
-    print(f"\n>>> Main Loop Attempt: {retry_count + 1}/{max_retries} <<<")
-    
-    print("\n>>> STEP 1.1: Retrieving all orders pending acceptance...")
-    retrieve_main()
-    
-    print("\n>>> STEP 1.2: Sending requests to accept new orders...")
-    accept_main()
-    
-    print("\nINFO: Waiting for 5 seconds for API to process acceptances...")
-    time.sleep(5)
-    
-    print("\n>>> STEP 1.3: Validating that orders were accepted...")
-    validation_status = validate_acceptance()
-    
-    print(f"\n>>> FINAL VALIDATION STATUS FOR PHASE 1: {validation_status} <<<")
-    
-    if validation_status == 'SUCCESS':
-        print("\n✅ Graceful termination of Phase 1: All orders processed successfully.")
-        break
-        
-    elif validation_status == 'VALIDATION_FAILED':
-        print("\n❌ Error in Phase 1: Some orders failed to be accepted. Check 'failed_order_acceptances.json'.")
-        break
-        
-    elif validation_status == 'NEW_ORDERS_FOUND':
-        retry_count += 1
-        print(f"\n🔄 New orders found. Looping back to the start.")
-        if retry_count >= max_retries:
-            print("\n❌ Error: Reached max retries for Phase 1. Exiting to avoid infinite loop.")
+        wait_for_acceptances(accepted_order_ids)
+
+        print("\n>>> STEP 1.3: Validating that orders were accepted...")
+        validation_status = validate_acceptance()
+
+        print(f"\n>>> FINAL VALIDATION STATUS FOR PHASE 1: {validation_status} <<<")
+
+        if validation_status == 'SUCCESS':
+            print("\n✅ Graceful termination of Phase 1: All orders processed successfully.")
+            break
+
+        elif validation_status == 'VALIDATION_FAILED':
+            print("\n❌ Error in Phase 1: Some orders failed to be accepted. Check 'failed_order_acceptances.json'.")
             break
-        print("---------------------------------------------")
-        time.sleep(2)
-        
-    else:
-        print("\n- Phase 1 finished, but some pending orders may remain. Please check the logs.")
-        break
-
-print("\n=============================================")
-print("===      Phase 1 Process Has Concluded      ===")
-print("=============================================")
+
+        elif validation_status == 'NEW_ORDERS_FOUND':
+            retry_count += 1
+            print(f"\n🔄 New orders found. Looping back to the start.")
+            if retry_count >= max_retries:
+                print("\n❌ Error: Reached max retries for Phase 1. Exiting to avoid infinite loop.")
+                break
+            print("---------------------------------------------")
+
+        else:
+            print("\n- Phase 1 finished, but some pending orders may remain. Please check the logs.")
+            break
+
+    print("\n=============================================")
+    print("===      Phase 1 Process Has Concluded      ===")
+    print("=============================================")
+    return new_order_count
 
 if __name__ == '__main__':
     main_orchestrator()
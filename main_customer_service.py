@@ -4,7 +4,8 @@ import os
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from customer_service.message_aggregation.fetch_messages import fetch_and_save_messages
+from customer_service.message_aggregation.fetch_messages import fetch_and_save_messages, transform_message_events, save_messages_to_json
+from common.event_queue import consume_events
 
 def main():
     """
@@ -21,5 +22,13 @@ def main():
         # and notifications (e.g., sending an alert to an admin).
         sys.exit(1)
 
+def ingest_message_events():
+    """
+    Saves messages pushed by the event ingestion service (event_ingestion/), without calling the API.
+    Returns the number of events handled.
+    """
+    events = consume_events('messages', lambda events: save_messages_to_json(transform_message_events(events)))
+    return len(events)
+
 if __name__ == "__main__":
     main()
@@ -8,41 +8,111 @@ sys.path.insert(0, project_root)
 
 from main_acceptance import main_orchestrator as accept_orders_main
 from main_shipping import process_shippable_orders
+from shipping.canada_post.cp_shipping.cp_pdf_labels import shutdown_tracking_validation
 from main_tracking import main_orchestrator as tracking_update_main
-from main_customer_service import main as customer_service_main
+from main_customer_service import main as customer_service_main, ingest_message_events
+from common.utils import get_best_buy_api_key
+from common.event_queue import consume_events, has_pending_events
+from common.order_snapshot import shared_cycle_snapshot
+from common.job_scheduler import Job, JobScheduler
+from common.adaptive_cadence import AdaptiveCadence, CadenceProfile
 
-SCHEDULER_INTERVAL_SECONDS = 900 # 15 minutes
+# --- Configuration ---
+# How often each phase runs, in seconds, measured from the start of its previous run.
+TRACKING_INTERVAL_SECONDS = 900
+# Messages normally arrive through the event ingestion service; polling the inbox is a slow reconciliation pass.
+CUSTOMER_SERVICE_INTERVAL_SECONDS = 1800
+# How often the event queues written by event_ingestion/ are checked. Checking an empty queue is a directory listing.
+EVENT_POLL_SECONDS = 5
+# Order states whose events make the matching job run right away.
+EVENT_TRIGGERED_JOBS = {'WAITING_ACCEPTANCE': 'acceptance', 'SHIPPING': 'shipping'}
+# Phases that run at the same time each get a worker thread.
+SCHEDULER_WORKERS = 6
+
+# Acceptance and shipping retrieval poll adaptively. They run at the profile's floor while new orders
+# are arriving, and back off toward its ceiling when idle. Profiles are checked in order, in local time;
+# the first match wins, otherwise the off-hours profile applies.
+BUSINESS_DAYS = range(0, 5)
+ACCEPTANCE_CADENCE_PROFILES = [
+    CadenceProfile('business hours', min_interval=60, max_interval=300, days=BUSINESS_DAYS, start_hour=8, end_hour=20),
+    CadenceProfile('weekend daytime', min_interval=120, max_interval=600, days=(5, 6), start_hour=9, end_hour=18),
+]
+ACCEPTANCE_OFF_HOURS_PROFILE = CadenceProfile('off hours', min_interval=120, max_interval=1800)
+SHIPPING_CADENCE_PROFILES = [
+    CadenceProfile('business hours', min_interval=300, max_interval=900, days=BUSINESS_DAYS, start_hour=8, end_hour=20),
+]
+SHIPPING_OFF_HOURS_PROFILE = CadenceProfile('off hours', min_interval=600, max_interval=3600)
+
+
+def with_order_snapshot(func):
+    """ Runs a phase with the order snapshot shared by whichever phases are running at the same time. """
+    def run():
+        with shared_cycle_snapshot(get_best_buy_api_key()):
+            return func()
+    return run
+
+def dispatch_events(trigger):
+    """
+    Hands queued marketplace events to the jobs that handle them.
+
+    An order event is only a hint: the state it carries picks the job to
+    trigger (acceptance or shipping), and that job reads the order's real
+    state from the API as usual. Nothing in the payload is written to the
+    order store. Queued messages trigger the 'messages' job.
+    """
+    if has_pending_events('orders'):
+        states = set()
+        consume_events('orders', lambda events: states.update(event['data']['order_state'] for event in events))
+        for job_name in sorted({EVENT_TRIGGERED_JOBS[state] for state in states if state in EVENT_TRIGGERED_JOBS}):
+            print(f"INFO: Order events received. Triggering job '{job_name}'.")
+            trigger(job_name)
+    if has_pending_events('messages'):
+        trigger('messages')
+
+def build_jobs(trigger):
+    """
+    Declares the workflow phases as jobs. Tracking runs after shipping; the other phases are independent.
+    `trigger(job_name)` is used by the events job to start a job early.
+    """
+    return [
+        Job('acceptance', with_order_snapshot(accept_orders_main),
+            cadence=AdaptiveCadence(ACCEPTANCE_OFF_HOURS_PROFILE, ACCEPTANCE_CADENCE_PROFILES)),
+        Job('shipping', with_order_snapshot(process_shippable_orders),
+            cadence=AdaptiveCadence(SHIPPING_OFF_HOURS_PROFILE, SHIPPING_CADENCE_PROFILES)),
+        Job('tracking', tracking_update_main, TRACKING_INTERVAL_SECONDS, after=('shipping',)),
+        Job('customer_service', customer_service_main, CUSTOMER_SERVICE_INTERVAL_SECONDS),
+        Job('events', lambda: dispatch_events(trigger), EVENT_POLL_SECONDS, quiet=True),
+        # Runs when triggered by the events job. It may overlap customer_service; save_messages_to_json serialises their writes.
+        Job('messages', ingest_message_events, CUSTOMER_SERVICE_INTERVAL_SECONDS),
+    ]
 
 def main():
     """
-    Master scheduler to run the entire order processing workflow in a loop.
+    Master scheduler that runs each phase of the order processing workflow on its own interval.
     """
     print("=============================================")
     print("===      STARTING MASTER SCHEDULER        ===")
     print("=============================================")
+    print(f"INFO: Scheduler started at {time.ctime()}.")
 
-    while True:
-        print(f"\n\n\n{'='*20} RUNNING WORKFLOW CYCLE AT {time.ctime()} {'='*20}")
-
-        # --- PHASE 1: ACCEPT NEW ORDERS ---
-        print("\n>>> Checking for new orders to accept...")
-        accept_orders_main()
-
-        # --- PHASE 2: PROCESS SHIPPABLE ORDERS ---
-        print("\n>>> Checking for shippable orders...")
-        process_shippable_orders()
-
-        # --- PHASE 3: UPDATE TRACKING FOR SHIPPED ORDERS ---
-        print("\n>>> Checking for shipped orders to update...")
-        tracking_update_main()
-
-        # --- PHASE 5: AGGREGATE CUSTOMER MESSAGES ---
-        print("\n>>> Checking for new customer messages...")
-        customer_service_main()
+    # The events job triggers other jobs; the scheduler exists by the time it first runs.
+    scheduler = JobScheduler(build_jobs(lambda job_name: scheduler.trigger(job_name)), max_workers=SCHEDULER_WORKERS)
+    for job in scheduler.jobs.values():
+        after = f", after {', '.join(job.after)}" if job.after else ""
+        if job.cadence is not None:
+            profile = job.cadence.profile()
+            print(f"INFO: Job '{job.name}' polls adaptively, now every {profile.min_interval / 60:g}-{profile.max_interval / 60:g} minutes ({profile.name}){after}.")
+        else:
+            print(f"INFO: Job '{job.name}' runs every {job.interval / 60:g} minutes{after}.")
 
-        print(f"\n{'='*20} WORKFLOW CYCLE COMPLETE {'='*20}")
-        print(f"--- Scheduler sleeping for {SCHEDULER_INTERVAL_SECONDS / 60} minutes... ---")
-        time.sleep(SCHEDULER_INTERVAL_SECONDS)
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        print("\nINFO: Stopping scheduler. Waiting for running jobs to finish...")
+    finally:
+        scheduler.shutdown(wait=True)
+        # The shipping job leaves tracking PIN validations running in the background.
+        shutdown_tracking_validation()
 
 
 if __name__ == '__main__':
@@ -7,6 +7,27 @@ sys.path.insert(0, project_root)
 
 from Orders.shipped_orders.update_tracking_info.update_tracking_numbers import main as update_tracking_main
 from Orders.shipped_orders.update_tracking_info.validate_shipped_status import main as validate_status_main
+from common.utils import get_best_buy_api_key
+from common.readiness import wait_for_orders
+
+# How long to wait for orders marked as shipped to reach SHIPPED before validating anyway.
+TRACKING_READY_TIMEOUT_SECONDS = 30
+
+
+def wait_for_shipments(shipped_order_ids):
+    """ Polls only the orders just marked as shipped until all of them report SHIPPED. """
+    if not shipped_order_ids:
+        return set()
+    api_key = get_best_buy_api_key()
+    if not api_key:
+        return set(shipped_order_ids)
+    print(f"\nINFO: Waiting for the API to process {len(shipped_order_ids)} tracking update(s)...")
+    return wait_for_orders(
+        api_key,
+        shipped_order_ids,
+        lambda order: order.get('order_state') == 'SHIPPED',
+        timeout=TRACKING_READY_TIMEOUT_SECONDS,
+    )
 
 def main_orchestrator():
     """
@@ -17,11 +38,9 @@ def main_orchestrator():
     print("=============================================")
 
     print("\n>>> STEP 4.1: Updating Best Buy with tracking numbers...")
-    update_tracking_main()
+    shipped_order_ids = update_tracking_main()
 
-    import time
-    print("\nINFO: Waiting for 15 seconds for API to process tracking update...")
-    time.sleep(15)
+    wait_for_shipments(shipped_order_ids)
 
     print("\n>>> STEP 4.2: Validating that order statuses are updated...")
     validate_status_main()
@@ -1,18 +1,21 @@
 import os
 import sys
+import re
 import json
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from functools import lru_cache
+from xml.sax.saxutils import escape
 
 # Add project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(project_root, '..', '..', '..'))
 from common.utils import get_canada_post_credentials
+from common.spool_queue import SpoolQueue
 
 # --- Configuration ---
 LOGS_DIR_BB = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'best_buy')
 LOGS_DIR_CP = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'canada_post')
 ORDERS_FILE = os.path.join(LOGS_DIR_BB, 'orders_pending_shipping.json')
+# Spool of shipment XML payloads, with pending/, claimed/, done/ and failed/ subdirectories.
 XML_OUTPUT_DIR = os.path.join(LOGS_DIR_CP, 'create_label_xml_files')
 
 SENDER_NAME = "VISIONVATION INC."
@@ -25,72 +28,151 @@ SENDER_POSTAL_CODE = "M2J 4N3"
 SENDER_COUNTRY = "CA"
 
 
-def create_xml_payload(order, contract_id, paid_by_customer):
+# Shipment-v8 request document. `{name}` fields are filled in when the template is compiled
+# (sender, parcel and settlement values) or per order (recipient, SKU and order ID).
+SHIPMENT_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<shipment xmlns="http://www.canadapost.ca/ws/shipment-v8">
+  <transmit-shipment>true</transmit-shipment>
+  <requested-shipping-point>{shipping_point}</requested-shipping-point>
+  <delivery-spec>
+    <service-code>DOM.EP</service-code>
+    <sender>
+      <name>{sender_name}</name>
+      <company>{sender_company}</company>
+      <contact-phone>{sender_contact_phone}</contact-phone>
+      <address-details>
+        <address-line-1>{sender_address}</address-line-1>
+        <city>{sender_city}</city>
+        <prov-state>{sender_province}</prov-state>
+        <country-code>{sender_country}</country-code>
+        <postal-zip-code>{sender_postal_code}</postal-zip-code>
+      </address-details>
+    </sender>
+    <destination>
+      <name>{recipient_name}</name>
+      <company>{recipient_company}</company>
+      <address-details>
+        <address-line-1>{street_1}</address-line-1>
+        <city>{city}</city>
+        <prov-state>{state}</prov-state>
+        <country-code>CA</country-code>
+        <postal-zip-code>{zip_code}</postal-zip-code>
+      </address-details>
+    </destination>
+    <options>
+      <option>
+        <option-code>DC</option-code>
+      </option>
+    </options>
+    <parcel-characteristics>
+      <weight>1.8</weight>
+      <dimensions>
+        <length>35</length>
+        <width>25</width>
+        <height>5</height>
+      </dimensions>
+    </parcel-characteristics>
+    <print-preferences>
+      <output-format>4x6</output-format>
+    </print-preferences>
+    <preferences>
+      <show-packing-instructions>true</show-packing-instructions>
+      <show-postage-rate>false</show-postage-rate>
+      <show-insured-value>true</show-insured-value>
+    </preferences>
+    <references>
+      <customer-ref-1>{order_id}</customer-ref-1>
+    </references>
+    <settlement-info>
+      <paid-by-customer>{paid_by_customer}</paid-by-customer>
+      <contract-id>{contract_id}</contract-id>
+      <intended-method-of-payment>Account</intended-method-of-payment>
+    </settlement-info>
+  </delivery-spec>
+</shipment>
+"""
+# Set to True to emit indented XML (easier to read in the spool, slightly larger).
+PRETTY_PRINT_XML = False
+
+_TEMPLATE_FIELD = re.compile(r'\{(\w+)\}')
+
+
+def _xml_text(value):
+    """ Escapes a value for use as XML element text. """
+    return escape('' if value is None else str(value))
+
+@lru_cache(maxsize=8)
+def compile_shipment_template(contract_id, paid_by_customer, pretty=False):
+    """
+    Compiles SHIPMENT_TEMPLATE into alternating literal text and per-order field names.
+
+    The sender and settlement values are constant for a process, so they are
+    escaped and merged into the literal text once. Rendering an order then
+    only escapes its own fields and joins the pieces. Unless `pretty` is
+    set, the indentation between elements is removed when compiling.
+    """
+    template = SHIPMENT_TEMPLATE
+    if not pretty:
+        lines = [line.strip() for line in template.splitlines()]
+        template = lines[0] + '\n' + ''.join(lines[1:])
+
+    static_fields = {
+        'shipping_point': SENDER_POSTAL_CODE.replace(" ", ""),
+        'sender_name': SENDER_NAME,
+        'sender_company': SENDER_COMPANY,
+        'sender_contact_phone': SENDER_CONTACT_PHONE,
+        'sender_address': SENDER_ADDRESS,
+        'sender_city': SENDER_CITY,
+        'sender_province': SENDER_PROVINCE,
+        'sender_country': SENDER_COUNTRY,
+        'sender_postal_code': SENDER_POSTAL_CODE,
+        'paid_by_customer': paid_by_customer,
+        'contract_id': contract_id,
+    }
+
+    parts = ['']
+    position = 0
+    for match in _TEMPLATE_FIELD.finditer(template):
+        parts[-1] += template[position:match.start()]
+        field = match.group(1)
+        if field in static_fields:
+            parts[-1] += _xml_text(static_fields[field])
+        else:
+            parts.extend([field, ''])
+        position = match.end()
+    parts[-1] += template[position:]
+    return tuple(parts)
+
+def create_xml_payload(order, contract_id, paid_by_customer, pretty=None):
     """ Creates the XML payload for a single order. """
-    order_id = order['order_id']
-    customer = order['customer']
-    shipping = customer['shipping_address']
-    offer_sku = order['order_lines'][0]['offer_sku']
-    quantity = order['order_lines'][0]['quantity']
-
-    shipment = ET.Element('shipment', xmlns="http://www.canadapost.ca/ws/shipment-v8")
-    ET.SubElement(shipment, 'transmit-shipment').text = 'true'
-    ET.SubElement(shipment, 'requested-shipping-point').text = SENDER_POSTAL_CODE.replace(" ", "")
-
-    delivery_spec = ET.SubElement(shipment, 'delivery-spec')
-    ET.SubElement(delivery_spec, 'service-code').text = 'DOM.EP'
-
-    sender = ET.SubElement(delivery_spec, 'sender')
-    ET.SubElement(sender, 'name').text = SENDER_NAME
-    ET.SubElement(sender, 'company').text = SENDER_COMPANY
-    ET.SubElement(sender, 'contact-phone').text = SENDER_CONTACT_PHONE
-    sender_address_details = ET.SubElement(sender, 'address-details')
-    ET.SubElement(sender_address_details, 'address-line-1').text = SENDER_ADDRESS
-    ET.SubElement(sender_address_details, 'city').text = SENDER_CITY
-    ET.SubElement(sender_address_details, 'prov-state').text = SENDER_PROVINCE
-    ET.SubElement(sender_address_details, 'country-code').text = SENDER_COUNTRY
-    ET.SubElement(sender_address_details, 'postal-zip-code').text = SENDER_POSTAL_CODE
-
-    destination = ET.SubElement(delivery_spec, 'destination')
-    ET.SubElement(destination, 'name').text = f"{shipping['firstname']} {shipping['lastname']}"
-    ET.SubElement(destination, 'company').text = f"{quantity}x {offer_sku}"
-    dest_address_details = ET.SubElement(destination, 'address-details')
-    ET.SubElement(dest_address_details, 'address-line-1').text = shipping['street_1']
-    ET.SubElement(dest_address_details, 'city').text = shipping['city']
-    ET.SubElement(dest_address_details, 'prov-state').text = shipping['state']
-    ET.SubElement(dest_address_details, 'country-code').text = 'CA'
-    ET.SubElement(dest_address_details, 'postal-zip-code').text = shipping['zip_code']
-
-    options = ET.SubElement(delivery_spec, 'options')
-    option = ET.SubElement(options, 'option')
-    ET.SubElement(option, 'option-code').text = 'DC'
-
-    parcel_characteristics = ET.SubElement(delivery_spec, 'parcel-characteristics')
-    ET.SubElement(parcel_characteristics, 'weight').text = '1.8'
-    dimensions = ET.SubElement(parcel_characteristics, 'dimensions')
-    ET.SubElement(dimensions, 'length').text = '35'
-    ET.SubElement(dimensions, 'width').text = '25'
-    ET.SubElement(dimensions, 'height').text = '5'
-
-    print_preferences = ET.SubElement(delivery_spec, 'print-preferences')
-    ET.SubElement(print_preferences, 'output-format').text = '4x6'
-
-    preferences = ET.SubElement(delivery_spec, 'preferences')
-    ET.SubElement(preferences, 'show-packing-instructions').text = 'true'
-    ET.SubElement(preferences, 'show-postage-rate').text = 'false'
-    ET.SubElement(preferences, 'show-insured-value').text = 'true'
-
-    references = ET.SubElement(delivery_spec, 'references')
-    ET.SubElement(references, 'customer-ref-1').text = order_id
-
-    settlement_info = ET.SubElement(delivery_spec, 'settlement-info')
-    ET.SubElement(settlement_info, 'paid-by-customer').text = paid_by_customer
-    ET.SubElement(settlement_info, 'contract-id').text = contract_id
-    ET.SubElement(settlement_info, 'intended-method-of-payment').text = 'Account'
-
-    xml_str = ET.tostring(shipment, 'utf-8')
-    dom = minidom.parseString(xml_str)
-    return dom.toprettyxml(indent="  ")
+    shipping = order['customer']['shipping_address']
+    order_line = order['order_lines'][0]
+    fields = {
+        'order_id': order['order_id'],
+        'recipient_name': f"{shipping['firstname']} {shipping['lastname']}",
+        'recipient_company': f"{order_line['quantity']}x {order_line['offer_sku']}",
+        'street_1': shipping['street_1'],
+        'city': shipping['city'],
+        'state': shipping['state'],
+        'zip_code': shipping['zip_code'],
+    }
+
+    parts = compile_shipment_template(contract_id, paid_by_customer, PRETTY_PRINT_XML if pretty is None else pretty)
+    rendered = [parts[0]]
+    for index in range(1, len(parts), 2):
+        rendered.append(_xml_text(fields[parts[index]]))
+        rendered.append(parts[index + 1])
+    return ''.join(rendered)
+
+def iter_shipment_payloads(orders, contract_id, paid_by_customer):
+    """ Lazily renders (order, xml_content) pairs so payloads can be streamed straight into label creation. """
+    for order in orders:
+        try:
+            xml_content = create_xml_payload(order, contract_id, paid_by_customer)
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"ERROR: Could not build the shipment payload for order {order.get('order_id')}: missing {e}. Skipping.")
+            continue
+        yield order, xml_content
 
 def main():
     """ Main function to read orders and generate XML files. """
@@ -100,8 +182,6 @@ def main():
     if not all([paid_by_customer, contract_id]):
         return
 
-    os.makedirs(XML_OUTPUT_DIR, exist_ok=True)
-
     if not os.path.exists(ORDERS_FILE):
         print(f"ERROR: {ORDERS_FILE} not found.")
         return
@@ -119,18 +199,17 @@ def main():
 
     print(f"INFO: Found {len(orders)} orders to process.")
 
-    for order in orders:
+    spool = SpoolQueue(XML_OUTPUT_DIR)
+    for order, xml_content in iter_shipment_payloads(orders, contract_id, paid_by_customer):
         order_id = order['order_id']
         print(f"INFO: Processing order {order_id}...")
-    
-        xml_content = create_xml_payload(order, contract_id, paid_by_customer)
-    
-        xml_filename = os.path.join(XML_OUTPUT_DIR, f"{order_id}.xml")
-        with open(xml_filename, 'w') as xml_file:
-            xml_file.write(xml_content)
-        
-        print(f"SUCCESS: Created XML file: {xml_filename}")
-    
+
+        xml_filename = f"{order_id}.xml"
+        if spool.enqueue(xml_filename, xml_content):
+            print(f"SUCCESS: Queued XML file: {xml_filename}")
+        else:
+            print(f"INFO: {xml_filename} is already claimed or done in the spool. Not queueing it again.")
+
     print("--- Transform Shipping Data to XML Script Finished ---\n")
 
 if __name__ == '__main__':
@@ -0,0 +1,79 @@
+import base64
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Configuration ---
+CP_API_BASE_URL = 'https://soa-gw.canadapost.ca'
+POOL_CONNECTIONS = 2
+POOL_MAXSIZE = 16
+
+# (connect, read) timeouts in seconds for each Canada Post operation.
+CREATE_SHIPMENT_TIMEOUT = (5, 60)
+SHIPMENT_DETAILS_TIMEOUT = (5, 30)
+LABEL_TIMEOUT = (5, 60)
+TRACKING_SUMMARY_TIMEOUT = (5, 15)
+
+SHIPMENT_MEDIA_TYPE = 'application/vnd.cpc.shipment-v8+xml'
+TRACKING_MEDIA_TYPE = 'application/vnd.cpc.track-v2+xml'
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class CanadaPostClient:
+    """
+    Shared HTTP client for the Canada Post shipping and tracking APIs.
+
+    The Basic auth header is built once, and all calls share one pooled,
+    keep-alive session to soa-gw.canadapost.ca. Each method covers one
+    operation and sets that operation's content type and timeout. Methods
+    return the raw `requests.Response` and leave `raise_for_status()` to the
+    caller.
+    """
+
+    def __init__(self, api_user, api_password, base_url=CP_API_BASE_URL,
+                 pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+        self.base_url = base_url.rstrip('/')
+        auth_b64 = base64.b64encode(f"{api_user}:{api_password}".encode('utf-8')).decode('utf-8')
+        self.session = requests.Session()
+        self.session.headers.update({'Authorization': f'Basic {auth_b64}'})
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def create_shipment(self, customer_number, xml_content):
+        """ POSTs a shipment-v8 document to the Create Shipment API. """
+        url = f"{self.base_url}/rs/{customer_number}/{customer_number}/shipment"
+        headers = {'Content-Type': SHIPMENT_MEDIA_TYPE, 'Accept': SHIPMENT_MEDIA_TYPE}
+        return self.session.post(url, headers=headers, data=xml_content, timeout=CREATE_SHIPMENT_TIMEOUT)
+
+    def get_shipment_details(self, details_url):
+        """ GETs the shipment details document from a 'details' link. """
+        headers = {'Accept': SHIPMENT_MEDIA_TYPE}
+        return self.session.get(details_url, headers=headers, timeout=SHIPMENT_DETAILS_TIMEOUT)
+
+    def get_label(self, label_url, stream=False):
+        """ GETs the PDF label from a 'label' link. """
+        headers = {'Accept': 'application/pdf'}
+        return self.session.get(label_url, headers=headers, timeout=LABEL_TIMEOUT, stream=stream)
+
+    def get_tracking_summary(self, tracking_pin):
+        """ GETs the tracking summary for a PIN. """
+        headers = {'Accept': TRACKING_MEDIA_TYPE}
+        url = f"{self.base_url}/vis/track/pin/{tracking_pin}/summary"
+        return self.session.get(url, headers=headers, timeout=TRACKING_SUMMARY_TIMEOUT)
+
+    def close(self):
+        self.session.close()
+
+
+def get_canada_post_client(api_user, api_password):
+    """ Returns the process-wide client for a set of credentials, creating it on first use. """
+    key = (api_user, api_password)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = CanadaPostClient(api_user, api_password)
+            _clients[key] = client
+        return client
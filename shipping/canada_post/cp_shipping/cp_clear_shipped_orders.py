@@ -1,47 +1,35 @@
+import os
+import sys
 
-import os 
-import json
-
---- Configuration ---
-ORDERS_FILE = os.path.join(os.path.dirname(file), '..', '..', '..', 'Orders', 'awaiting_shipment', 'orders_awaiting_shipment', 'orders_pending_shipping.json') CP_SHIPPING_DATA_FILE = os.path.join(os.path.dirname(file), 'cp_shipping_labels_data.json')
-
-def main(): """ Validates label creation and cleans up the pending shipping list. """ print("\n--- Starting Clear Shipped Orders Script ---")
-
-if not os.path.exists(CP_SHIPPING_DATA_FILE):
-    print("ERROR: cp_shipping_labels_data.json not found. Cannot perform cleanup.")
-    return
-    
-with open(CP_SHIPPING_DATA_FILE, 'r') as f:
-    try:
-        shipped_data = json.load(f)
-    except json.JSONDecodeError:
-        print("ERROR: cp_shipping_labels_data.json is corrupted.")
-        return
-        
-if not os.path.exists(ORDERS_FILE):
-    print("ERROR: orders_pending_shipping.json not found.")
-    return
-    
-with open(ORDERS_FILE, 'r') as f:
-    try:
-        pending_orders = json.load(f)
-    except json.JSONDecodeError:
-        print("ERROR: orders_pending_shipping.json is corrupted.")
-        return
-
-shipped_order_ids = {entry['order_id'] for entry in shipped_data if entry.get('tracking_pin')}
-
-print(f"INFO: Found {len(shipped_order_ids)} successfully created shipments.")
-
-remaining_pending_orders = [order for order in pending_orders if order['order_id'] not in shipped_order_ids]
-
-if len(remaining_pending_orders) < len(pending_orders):
-    print(f"INFO: Removing {len(pending_orders) - len(remaining_pending_orders)} shipped orders from the pending list.")
-    with open(ORDERS_FILE, 'w') as f:
-        json.dump(remaining_pending_orders, f, indent=4)
-    print("SUCCESS: orders_pending_shipping.json has been updated.")
-else:
-    print("INFO: No orders to remove from the pending list.")
-    
-print("--- Clear Shipped Orders Script Finished ---\n")
-if name == 'main': main() 
+# Add project root to the Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(project_root, '..', '..', '..'))
+from common.order_store import open_order_store
+from common.pending_queue import PendingOrderQueue
+
+# --- Configuration ---
+LOGS_DIR_BB = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'best_buy')
+ORDERS_FILE = os.path.join(LOGS_DIR_BB, 'orders_pending_shipping.json')
+
+
+def main():
+    """ Evicts orders that are no longer awaiting shipment from the pending shipping list. """
+    print("\n--- Starting Clear Shipped Orders Script ---")
+
+    if not os.path.exists(ORDERS_FILE):
+        print("ERROR: orders_pending_shipping.json not found.")
+        return []
+
+    with open_order_store() as store:
+        evicted = PendingOrderQueue(ORDERS_FILE, 'SHIPPING').compact(store)
+
+    if evicted:
+        print(f"SUCCESS: Removed {len(evicted)} shipped orders from orders_pending_shipping.json.")
+    else:
+        print("INFO: No orders to remove from the pending list.")
+
+    print("--- Clear Shipped Orders Script Finished ---\n")
+    return evicted
+
+if __name__ == '__main__':
+    main()
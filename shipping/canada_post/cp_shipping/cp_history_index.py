@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import threading
+import xml.etree.ElementTree as ET
+
+# Add project root to the Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(project_root, '..', '..', '..'))
+from common.segmented_log import get_segmented_log, segmented_log_dir
+
+# --- Configuration ---
+LOGS_DIR_CP = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'canada_post')
+CP_HISTORY_LOG_FILE = os.path.join(LOGS_DIR_CP, 'cp_shipping_history_log.json')
+CP_HISTORY_INDEX_FILE = os.path.join(LOGS_DIR_CP, 'cp_shipping_history_index.json')
+SHIPMENT_NS = '{http://www.canadapost.ca/ws/shipment-v8}'
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def extract_shipment_keys(shipment_details_xml):
+    """ Returns (order_id, tracking_pin) parsed from a shipment details XML document. """
+    try:
+        root = ET.fromstring(shipment_details_xml)
+    except (ET.ParseError, TypeError):
+        return None, None
+
+    order_ref = root.find(f".//{SHIPMENT_NS}customer-ref-1")
+    tracking_pin = root.find(f".//{SHIPMENT_NS}tracking-pin")
+    return (
+        order_ref.text.strip() if order_ref is not None and order_ref.text else None,
+        tracking_pin.text.strip() if tracking_pin is not None and tracking_pin.text else None,
+    )
+
+
+class ShipmentHistoryIndex:
+    """
+    Lookup table of shipments already created with Canada Post.
+
+    Maps order IDs to tracking PINs and back, so label dedup is a dictionary
+    lookup instead of a scan over every stored shipment details XML blob.
+    New shipments are added in memory; `flush()` writes the file only when
+    something changed, once per label batch.
+    """
+
+    def __init__(self, order_ids=None, tracking_pins=None, path=CP_HISTORY_INDEX_FILE):
+        self.path = path
+        self.order_ids = order_ids or {}
+        self.tracking_pins = tracking_pins or {}
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def add(self, order_id, tracking_pin):
+        """ Records a shipment under its order ID and tracking PIN. """
+        with self._lock:
+            if order_id and self.order_ids.get(order_id, object()) != tracking_pin:
+                self.order_ids[order_id] = tracking_pin
+                self.dirty = True
+            if tracking_pin and self.tracking_pins.get(tracking_pin, object()) != order_id:
+                self.tracking_pins[tracking_pin] = order_id
+                self.dirty = True
+
+    def has_order(self, order_id):
+        return order_id in self.order_ids
+
+    def order_for_tracking_pin(self, tracking_pin):
+        return self.tracking_pins.get(tracking_pin)
+
+    def save(self):
+        """ Writes the index atomically next to the history log. """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({"order_ids": self.order_ids, "tracking_pins": self.tracking_pins}, f, indent=4)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def flush(self):
+        """ Saves the index if shipments were added since it was last written. """
+        with self._lock:
+            if self.dirty:
+                self.save()
+
+
+def rebuild_history_index(history_log_file=CP_HISTORY_LOG_FILE, index_file=CP_HISTORY_INDEX_FILE):
+    """ Rebuilds the index from the full (segmented) shipment history log. """
+    index = ShipmentHistoryIndex(path=index_file)
+    if not os.path.exists(history_log_file) and not os.path.isdir(segmented_log_dir(history_log_file)):
+        return index
+
+    history = get_segmented_log(history_log_file).read()
+    for entry in history:
+        order_id = entry.get('order_id')
+        tracking_pin = entry.get('tracking_pin')
+        if not order_id or not tracking_pin:
+            parsed_order_id, parsed_tracking_pin = extract_shipment_keys(entry.get('shipment_details'))
+            order_id = order_id or parsed_order_id
+            tracking_pin = tracking_pin or parsed_tracking_pin
+        index.add(order_id, tracking_pin)
+
+    print(f"INFO: Rebuilt shipment history index with {len(index.order_ids)} orders.")
+    index.save()
+    return index
+
+
+def load_history_index(index_file=CP_HISTORY_INDEX_FILE, history_log_file=CP_HISTORY_LOG_FILE):
+    """ Loads the shipment history index, rebuilding it from the history log if needed. """
+    if os.path.exists(index_file):
+        with open(index_file, 'r') as f:
+            try:
+                data = json.load(f)
+                return ShipmentHistoryIndex(data.get('order_ids'), data.get('tracking_pins'), index_file)
+            except (json.JSONDecodeError, AttributeError):
+                print(f"WARNING: {index_file} is corrupted. Rebuilding from history log.")
+    return rebuild_history_index(history_log_file, index_file)
+
+
+def get_history_index(index_file=CP_HISTORY_INDEX_FILE, history_log_file=CP_HISTORY_LOG_FILE):
+    """ Returns the process-wide index for `index_file`, loading it on first use. """
+    with _indexes_lock:
+        index = _indexes.get(os.path.abspath(index_file))
+        if index is None:
+            index = load_history_index(index_file, history_log_file)
+            _indexes[os.path.abspath(index_file)] = index
+        return index
+
+
+def record_shipment(order_id, tracking_pin, index_file=CP_HISTORY_INDEX_FILE):
+    """ Adds a single shipment to the in-memory index. Call save_history_index() to persist it. """
+    index = get_history_index(index_file)
+    index.add(order_id, tracking_pin)
+    return index
+
+
+def save_history_index(index_file=CP_HISTORY_INDEX_FILE):
+    """ Writes the in-memory index to disk if shipments were recorded since the last save. """
+    with _indexes_lock:
+        index = _indexes.get(os.path.abspath(index_file))
+    if index is not None:
+        index.flush()
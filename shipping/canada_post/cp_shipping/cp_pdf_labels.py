@@ -1,30 +1,56 @@
 import os
 import sys
 import requests
-import base64
 import json
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import xml.etree.ElementTree as ET
 
 # Add project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(project_root, '..', '..', '..'))
 from common.utils import get_canada_post_credentials
+from common.order_store import open_order_store
+from common.spool_queue import SpoolQueue
+from common.blob_store import BlobStore
+from common.segmented_log import get_segmented_log, segmented_log_dir
+from shipping.canada_post.cp_create_labels.cp_transform_shipping_data import iter_shipment_payloads
 from .validate_cp_shipment import get_shipment_details, get_tracking_summary
+from .cp_history_index import record_shipment, save_history_index
+from .cp_shipment_details import SHIPMENT_DETAIL_COLUMNS, parse_shipment_details
+from .cp_api_client import get_canada_post_client
+from .cp_tracking_validation import TrackingValidationQueue
 
 # --- Configuration ---
 LOGS_DIR_BB = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'best_buy')
 LOGS_DIR_CP = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'canada_post')
+# Spool of shipment XML payloads, with pending/, claimed/, done/ and failed/ subdirectories.
 XML_INPUT_DIR = os.path.join(LOGS_DIR_CP, 'create_label_xml_files')
 PDF_OUTPUT_DIR = os.path.join(LOGS_DIR_CP, 'cp_pdf_shipping_labels')
 CP_SHIPPING_DATA_FILE = os.path.join(LOGS_DIR_CP, 'cp_shipping_labels_data.json')
 CP_HISTORY_LOG_FILE = os.path.join(LOGS_DIR_CP, 'cp_shipping_history_log.json')
 CUSTOMER_SERVICE_CP_HISTORY_LOG_FILE = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'logs', 'customer_service', 'cp_shipping_history_log.json')
-
-
-def log_shipping_data(order_id, tracking_pin=None, label_url=None, api_response_text=None, error=None):
-    """ Logs the shipping data to cp_shipping_labels_data.json. """
-    os.makedirs(os.path.dirname(CP_SHIPPING_DATA_FILE), exist_ok=True)
+# Raw shipment details XML, gzip-compressed and addressed by SHA-256. History entries reference it by `details_blob_id`.
+SHIPMENT_DETAILS_BLOB_DIR = os.path.join(LOGS_DIR_CP, 'shipment_details_blobs')
+
+# Shipments are created by SHIPMENT_WORKERS threads; details fetches and label downloads for
+# created shipments run on LABEL_WORKERS threads, so the stages overlap across orders.
+SHIPMENT_WORKERS = 4
+LABEL_WORKERS = 4
+# When True, the in-memory pipeline also writes each shipment payload to the XML spool as an audit trail.
+SPOOL_SHIPMENT_XML = False
+# Label PDFs are streamed to disk in chunks of this many bytes.
+LABEL_CHUNK_SIZE = 64 * 1024
+
+# Process-wide tracking validation queue. It keeps draining between shipping runs and is only
+# joined at process shutdown (see shutdown_tracking_validation()).
+_validation_queue = None
+_validation_queue_lock = threading.Lock()
+
+
+def log_shipping_data(order_id, tracking_pin=None, label_url=None, api_response_text=None, error=None, tracking_validated=None):
+    """ Appends the shipping data to the segmented cp_shipping_labels_data log. """
     print(f"INFO: Logging shipping data for order {order_id}...")
 
     log_entry = {
@@ -33,64 +59,66 @@ def log_shipping_data(order_id, tracking_pin=None, label_url=None, api_response_
         "label_url": label_url,
         "timestamp": datetime.now().isoformat(),
         "api_response": api_response_text,
-        "error": str(error) if error else None
+        "error": str(error) if error else None,
+        "tracking_validated": tracking_validated
     }
+    get_segmented_log(CP_SHIPPING_DATA_FILE).append(log_entry)
+
+def log_tracking_validation(order_id, tracking_pin, is_valid):
+    """ Records the outcome of a deferred tracking PIN validation in the shipping log. """
+    if not is_valid:
+        print(f"CRITICAL WARNING: Tracking PIN for order {order_id} could not be validated. Proceeding with Best Buy update.")
+    log_shipping_data(order_id, tracking_pin, tracking_validated=is_valid)
+
+def log_cp_history(shipment_details_xml, store, order_id=None):
+    """
+    Records a shipment details document. It is parsed once into structured fields, which go to the
+    order store and the history logs, while the raw XML is kept in the compressed blob store.
+    `store` is the label pipeline's open order store, shared by its worker threads.
+    """
+    if not shipment_details_xml:
+        return
 
-    log_entries = []
-    if os.path.exists(CP_SHIPPING_DATA_FILE):
-        with open(CP_SHIPPING_DATA_FILE, 'r') as f:
-            try:
-                log_entries = json.load(f)
-            except json.JSONDecodeError:
-                print("WARNING: cp_shipping_labels_data.json is corrupted. Starting fresh.")
+    details = parse_shipment_details(shipment_details_xml) or dict.fromkeys(SHIPMENT_DETAIL_COLUMNS)
+    details['order_id'] = order_id or details.get('order_id')
+    order_id, tracking_pin = details['order_id'], details.get('tracking_pin')
+    details_blob_id = BlobStore(SHIPMENT_DETAILS_BLOB_DIR).put(shipment_details_xml)
+    timestamp = datetime.now().isoformat()
 
-    log_entries.append(log_entry)
+    store.record_shipment_details(details_blob_id, details, timestamp)
 
-    with open(CP_SHIPPING_DATA_FILE, 'w') as f:
-        json.dump(log_entries, f, indent=4)
-
-def log_cp_history(shipment_details_xml):
-    """ Appends the full shipment details XML to the history logs. """
-    if not shipment_details_xml:
-        return
+    entry = {"timestamp": timestamp}
+    entry.update(details)
+    entry["details_blob_id"] = details_blob_id
 
     for log_path in [CP_HISTORY_LOG_FILE, CUSTOMER_SERVICE_CP_HISTORY_LOG_FILE]:
-        os.makedirs(os.path.dirname(log_path), exist_ok=True)
-        log_entries = []
-        if os.path.exists(log_path):
-            with open(log_path, 'r') as f:
-                try:
-                    log_entries = json.load(f)
-                except json.JSONDecodeError:
-                    log_entries = []
-
-        log_entries.append({
-            "timestamp": datetime.now().isoformat(),
-            "shipment_details": shipment_details_xml
-        })
-
-        with open(log_path, 'w') as f:
-            json.dump(log_entries, f, indent=4)
-        print(f"SUCCESS: Appended shipment details to {log_path}")
-
-
-def create_shipment_and_get_label(api_user, api_password, customer_number, xml_content, order):
-    """ Sends the request to Canada Post, logs the data, and returns the label URL. """
+        get_segmented_log(log_path).append(entry)
+        print(f"SUCCESS: Appended shipment details to {segmented_log_dir(log_path)}")
+
+    if order_id or tracking_pin:
+        record_shipment(order_id, tracking_pin)
+
+
+def record_label_created(order_id, tracking_pin, store=None):
+    """ Marks the label in the order store, which also queues the tracking push to Best Buy. """
+    if store is not None:
+        store.mark_label_created(order_id, tracking_pin)
+        return
+    with open_order_store() as store:
+        store.mark_label_created(order_id, tracking_pin)
+
+def create_shipment_and_get_label(api_user, api_password, customer_number, xml_content, order, store=None):
+    """
+    Sends the request to Canada Post, logs the data, and returns the label URL.
+    A created shipment is marked in the order store (opened here unless `store` is given),
+    so its tracking number is pushed whichever workflow created the label.
+    """
     order_id = order['order_id']
-    auth_string = f"{api_user}:{api_password}"
-    auth_b64 = base64.b64encode(auth_string.encode('utf-8')).decode('utf-8')
-    
-    cp_api_url = f'https://soa-gw.canadapost.ca/rs/{customer_number}/{customer_number}/shipment'
-
-    headers = {
-        'Authorization': f'Basic {auth_b64}',
-        'Content-Type': 'application/vnd.cpc.shipment-v8+xml',
-        'Accept': 'application/vnd.cpc.shipment-v8+xml'
-    }
+    client = get_canada_post_client(api_user, api_password)
 
     print("INFO: Sending request to Canada Post 'Create Shipment' API...")
     try:
-        response = requests.post(cp_api_url, headers=headers, data=xml_content)
+        response = client.create_shipment(customer_number, xml_content)
         response.raise_for_status()
         response_text = response.text
         print("SUCCESS: 'Create Shipment' API call was successful.")
@@ -116,45 +144,265 @@ def create_shipment_and_get_label(api_user, api_password, customer_number, xml_c
             return None, None, None
 
         log_shipping_data(order_id, tracking_pin, label_url, response_text)
+        if tracking_pin:
+            record_label_created(order_id, tracking_pin, store)
         return label_url, details_url, tracking_pin
 
     except requests.exceptions.RequestException as e:
         print(f"ERROR: 'Create Shipment' API request failed: {e}")
-        response_text = e.response.text if e.response else "No response from server."
+        response_text = e.response.text if e.response is not None else "No response from server."
         print("Response Body:", response_text)
         log_shipping_data(order_id, api_response_text=response_text, error=e)
         return None, None, None
 
 def download_label(label_url, api_user, api_password, output_path):
-    """ Downloads the shipping label PDF from the provided URL. """
+    """ Streams the shipping label PDF from the provided URL to a temporary file, then renames it into place. """
     if not label_url:
         return
 
-    auth_string = f"{api_user}:{api_password}"
-    auth_b64 = base64.b64encode(auth_string.encode('utf-8')).decode('utf-8')
-
-    headers = {
-        'Accept': 'application/pdf',
-        'Authorization': f'Basic {auth_b64}'
-    }
+    client = get_canada_post_client(api_user, api_password)
+    partial_path = f"{output_path}.part"
 
     print(f"INFO: Downloading label from {label_url}...")
     try:
-        response = requests.get(label_url, headers=headers)
-        response.raise_for_status()
-        
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+        response = client.get_label(label_url, stream=True)
+        try:
+            response.raise_for_status()
+            with open(partial_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=LABEL_CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+        finally:
+            response.close()
+        os.replace(partial_path, output_path)
 
         print(f"SUCCESS: Saved label to {output_path}")
 
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, OSError) as e:
         print(f"ERROR: Failed to download label: {e}")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
         return False
     return True
 
+def fetch_and_log_shipment_details(api_user, api_password, order_id, details_url, store):
+    """ Label stage: fetches the shipment details and appends them to the history logs. """
+    try:
+        shipment_details_xml = get_shipment_details(api_user, api_password, details_url)
+        if shipment_details_xml:
+            log_cp_history(shipment_details_xml, store, order_id)
+    except Exception as e:
+        print(f"CRITICAL: An unexpected error occurred while logging shipment details for order {order_id}: {e}")
+        log_shipping_data(order_id, error=e)
+
+def download_order_label(api_user, api_password, order_id, label_url):
+    """ Label stage: downloads the PDF label for a created shipment. """
+    try:
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        pdf_path = os.path.join(PDF_OUTPUT_DIR, f"{order_id}_{timestamp}.pdf")
+        if not download_label(label_url, api_user, api_password, pdf_path):
+            print(f"ERROR: Failed to download label for order {order_id}. See logs for details.")
+    except Exception as e:
+        print(f"CRITICAL: An unexpected error occurred while downloading the label for order {order_id}: {e}")
+        log_shipping_data(order_id, error=e)
+
+def create_order_shipment(order_id, xml_content, order_details, api_user, api_password, customer_number, store, validation_queue, label_executor):
+    """
+    Shipment stage: creates the shipment for one order and hands the follow-up work to the label stage.
+    Returns (created, follow-up futures).
+    """
+    label_url, details_url, tracking_pin = create_shipment_and_get_label(api_user, api_password, customer_number, xml_content, order_details, store)
+
+    if tracking_pin:
+        validation_queue.schedule(order_id, tracking_pin)
+
+    follow_ups = []
+    if details_url:
+        follow_ups.append(label_executor.submit(fetch_and_log_shipment_details, api_user, api_password, order_id, details_url, store))
+    if label_url:
+        follow_ups.append(label_executor.submit(download_order_label, api_user, api_password, order_id, label_url))
+    return bool(tracking_pin or label_url), follow_ups
+
+def has_existing_label(store, order_id):
+    """ Returns True when the order store already records a label for the order. """
+    stored = store.get_order(order_id)
+    return bool(stored and stored.get('label_created'))
+
+def process_spool_item(item, orders_map, api_user, api_password, customer_number, store, spool, validation_queue, label_executor):
+    """
+    Shipment stage for a claimed spool item. The item is moved to done/ once
+    a shipment exists, or to failed/ otherwise. Returns the follow-up futures.
+    """
+    order_id = item.key
+    try:
+        spool.renew(item)
+        print(f"\nINFO: Processing {item.name} for order {order_id}...")
+
+        if has_existing_label(store, order_id):
+            # A reclaimed lease whose shipment was already created; never submit it twice.
+            print(f"INFO: Order {order_id} already has a label. Marking {item.name} as done.")
+            spool.complete(item)
+            return []
+
+        xml_content = item.read()
+
+        order_details = orders_map.get(order_id)
+        if not order_details:
+            print(f"WARNING: Could not find order details for {order_id}. Skipping.")
+            spool.fail(item)
+            return []
+
+        created, follow_ups = create_order_shipment(order_id, xml_content, order_details, api_user, api_password,
+                                                    customer_number, store, validation_queue, label_executor)
+        if created:
+            spool.complete(item)
+        else:
+            spool.fail(item)
+        return follow_ups
+    except Exception as e:
+        print(f"CRITICAL: An unexpected error occurred while processing {item.name}: {e}")
+        log_shipping_data(order_id, error=e)
+        if spool.state_of(item.name) == 'claimed':
+            spool.fail(item)
+        return []
+
+def process_order_payload(order, xml_content, api_user, api_password, customer_number, store, validation_queue, label_executor):
+    """ Shipment stage for an order whose payload was rendered in memory. Returns the follow-up futures. """
+    order_id = order['order_id']
+    try:
+        print(f"\nINFO: Processing order {order_id}...")
+        if has_existing_label(store, order_id):
+            print(f"INFO: Order {order_id} already has a label. Skipping.")
+            return []
+        _, follow_ups = create_order_shipment(order_id, xml_content, order, api_user, api_password,
+                                              customer_number, store, validation_queue, label_executor)
+        return follow_ups
+    except Exception as e:
+        print(f"CRITICAL: An unexpected error occurred while processing order {order_id}: {e}")
+        log_shipping_data(order_id, error=e)
+        return []
+
+def run_label_pipeline(submit_shipments, shipment_workers=SHIPMENT_WORKERS, label_workers=LABEL_WORKERS):
+    """
+    Runs the two-stage label pipeline.
+
+    `submit_shipments(shipment_executor, label_executor, store)` submits one
+    shipment-stage task per order and returns their futures. As soon as a
+    shipment exists, its details fetch and label download are queued on the
+    label stage, so a batch takes about as long as its slowest order, not
+    the sum of all orders. The shipment history index is written once, at the end of the batch.
+    """
+    try:
+        with open_order_store() as store:
+            with ThreadPoolExecutor(max_workers=max(1, label_workers)) as label_executor:
+                with ThreadPoolExecutor(max_workers=max(1, shipment_workers)) as shipment_executor:
+                    shipments = submit_shipments(shipment_executor, label_executor, store)
+                    follow_ups = [future for shipment in as_completed(shipments) for future in shipment.result()]
+                for future in as_completed(follow_ups):
+                    future.result()
+    finally:
+        save_history_index()
+
+def process_spool_items(items, orders_map, api_user, api_password, customer_number, spool, validation_queue,
+                        shipment_workers=SHIPMENT_WORKERS, label_workers=LABEL_WORKERS):
+    """ Runs the label pipeline over claimed spool items. """
+    if not items:
+        return
+    run_label_pipeline(
+        lambda shipment_executor, label_executor, store: [
+            shipment_executor.submit(process_spool_item, item, orders_map, api_user, api_password,
+                                     customer_number, store, spool, validation_queue, label_executor)
+            for item in items
+        ],
+        min(shipment_workers, len(items)), label_workers,
+    )
+
+def process_order_payloads(payloads, api_user, api_password, customer_number, validation_queue,
+                           shipment_workers=SHIPMENT_WORKERS, label_workers=LABEL_WORKERS):
+    """
+    Runs the label pipeline over (order, xml_content) pairs, such as those
+    from iter_shipment_payloads(). Each payload is submitted as soon as it
+    is produced, so rendering overlaps with shipment creation.
+    """
+    run_label_pipeline(
+        lambda shipment_executor, label_executor, store: [
+            shipment_executor.submit(process_order_payload, order, xml_content, api_user, api_password,
+                                     customer_number, store, validation_queue, label_executor)
+            for order, xml_content in payloads
+        ],
+        shipment_workers, label_workers,
+    )
+
+def start_tracking_validation(api_user, api_password):
+    """ Returns a tracking validation queue that logs results to the shipping log. """
+    return TrackingValidationQueue(
+        lambda tracking_pin: get_tracking_summary(api_user, api_password, tracking_pin),
+        on_result=log_tracking_validation,
+    )
+
+def get_tracking_validation_queue(api_user, api_password):
+    """ Returns the process-wide tracking validation queue, starting it on first use. """
+    global _validation_queue
+    with _validation_queue_lock:
+        if _validation_queue is None:
+            _validation_queue = start_tracking_validation(api_user, api_password)
+        return _validation_queue
+
+def shutdown_tracking_validation():
+    """ Waits for the process-wide tracking validation queue to drain. Call once, when the process stops. """
+    global _validation_queue
+    with _validation_queue_lock:
+        validation_queue, _validation_queue = _validation_queue, None
+    if validation_queue is None:
+        return []
+    return finish_tracking_validation(validation_queue)
+
+def finish_tracking_validation(validation_queue):
+    """ Waits for outstanding tracking validations and prints a summary. """
+    if len(validation_queue):
+        print(f"INFO: Waiting for {len(validation_queue)} tracking PIN validation(s) to finish...")
+    results = validation_queue.close()
+    invalid = [order_id for order_id, _, is_valid in results if not is_valid]
+    print(f"INFO: Validated {len(results)} tracking PIN(s); {len(invalid)} could not be confirmed.")
+    return results
+
+def create_labels_for_orders(orders, spool_xml=SPOOL_SHIPMENT_XML):
+    """
+    Creates shipments and labels for orders passed in memory.
+
+    Payloads are rendered lazily and streamed into the label pipeline.
+    Nothing is read back from disk. With `spool_xml`, each payload is also
+    queued in the XML spool, and the spool is processed as in main(). This
+    keeps an on-disk audit trail and lets label workers share the work.
+    """
+    print("\n--- Starting Create PDF Labels Pipeline ---")
+    if not orders:
+        print("INFO: No orders to create labels for.")
+        return
+
+    os.makedirs(PDF_OUTPUT_DIR, exist_ok=True)
+
+    api_user, api_password, customer_number, paid_by_customer, contract_id = get_canada_post_credentials()
+    if not all([api_user, api_password, customer_number, paid_by_customer, contract_id]):
+        return
+
+    payloads = iter_shipment_payloads(orders, contract_id, paid_by_customer)
+    # PINs are validated in the background; this run does not wait for them.
+    validation_queue = get_tracking_validation_queue(api_user, api_password)
+    if spool_xml:
+        spool = SpoolQueue(XML_INPUT_DIR)
+        for order, xml_content in payloads:
+            spool.enqueue(f"{order['order_id']}.xml", xml_content)
+        orders_map = {order['order_id']: order for order in orders}
+        process_spool_items(spool.claim(), orders_map, api_user, api_password, customer_number, spool, validation_queue)
+    else:
+        process_order_payloads(payloads, api_user, api_password, customer_number, validation_queue)
+    if len(validation_queue):
+        print(f"INFO: {len(validation_queue)} tracking PIN validation(s) will finish in the background.")
+    print("--- Create PDF Labels Pipeline Finished ---\n")
+
 def main():
-    """ Main function to process XML files and get PDF labels. """
+    """ Main function to claim spooled XML payloads and get PDF labels. """
     print("\n--- Starting Create PDF Labels Script ---")
 
     os.makedirs(PDF_OUTPUT_DIR, exist_ok=True)
@@ -163,14 +411,6 @@ def main():
     if not all([api_user, api_password, customer_number]):
         return
 
-    if not os.path.exists(XML_INPUT_DIR) or not os.listdir(XML_INPUT_DIR):
-        print("INFO: No XML files found to process.")
-        return
-
-    xml_files = [f for f in os.listdir(XML_INPUT_DIR) if f.endswith('.xml')]
-    
-    print(f"INFO: Found {len(xml_files)} XML files to process.")
-
     orders_file_path = os.path.join(LOGS_DIR_BB, 'orders_pending_shipping.json')
     if not os.path.exists(orders_file_path):
         print(f"ERROR: {orders_file_path} not found.")
@@ -180,47 +420,20 @@ def main():
         all_orders = json.load(f)
     orders_map = {order['order_id']: order for order in all_orders}
 
-    for xml_file in xml_files:
-        try:
-            order_id = os.path.splitext(xml_file)[0]
-            xml_path = os.path.join(XML_INPUT_DIR, xml_file)
-            details_url = None
-
-            print(f"\nINFO: Processing {xml_file} for order {order_id}...")
-
-            with open(xml_path, 'r') as f:
-                xml_content = f.read()
-
-            order_details = orders_map.get(order_id)
-            if not order_details:
-                print(f"WARNING: Could not find order details for {order_id}. Skipping.")
-                continue
-
-            label_url, details_url, tracking_pin = create_shipment_and_get_label(api_user, api_password, customer_number, xml_content, order_details)
-
-            if details_url:
-                shipment_details_xml = get_shipment_details(api_user, api_password, details_url)
-                if shipment_details_xml:
-                    log_cp_history(shipment_details_xml)
-
-            if tracking_pin:
-                import time
-                print("INFO: Waiting for 30 seconds for tracking pin to become active...")
-                time.sleep(30)
-                is_valid_tracking = get_tracking_summary(api_user, api_password, tracking_pin)
-                if not is_valid_tracking:
-                    print(f"CRITICAL WARNING: Tracking PIN for order {order_id} could not be validated in real-time. Proceeding with Best Buy update.")
-
-            if label_url:
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                pdf_path = os.path.join(PDF_OUTPUT_DIR, f"{order_id}_{timestamp}.pdf")
-                if not download_label(label_url, api_user, api_password, pdf_path):
-                    print(f"ERROR: Failed to download label for order {order_id}. See logs for details.")
-        except Exception as e:
-            print(f"CRITICAL: An unexpected error occurred while processing {xml_file}: {e}")
-            log_shipping_data(order_id, error=e)
+    spool = SpoolQueue(XML_INPUT_DIR)
+    items = spool.claim()
+    if not items:
+        print("INFO: No XML files found to process.")
+        return
 
+    print(f"INFO: Claimed {len(items)} XML files to process.")
+
+    process_spool_items(items, orders_map, api_user, api_password, customer_number, spool,
+                        get_tracking_validation_queue(api_user, api_password))
     print("--- Create PDF Labels Script Finished ---\n")
 
 if __name__ == '__main__':
-    main()
+    try:
+        main()
+    finally:
+        shutdown_tracking_validation()
@@ -0,0 +1,71 @@
+import io
+import xml.etree.ElementTree as ET
+
+# --- Configuration ---
+CANADA_POST_NS_PREFIX = 'http://www.canadapost.ca/ws/'
+
+# Structured columns extracted from a shipment details document, keyed by element name.
+# Elements listed under a parent only count inside that parent (e.g. the destination's <name>, not the sender's).
+SHIPMENT_DETAIL_FIELDS = {
+    'tracking-pin': 'tracking_pin',
+    'customer-ref-1': 'order_id',
+    'shipment-status': 'shipment_status',
+    'service-code': 'service_code',
+    'expected-mailing-date': 'expected_mailing_date',
+    'expected-delivery-date': 'expected_delivery_date',
+    'due-amount': 'due_amount',
+}
+DESTINATION_FIELDS = {
+    'name': 'destination_name',
+    'city': 'destination_city',
+    'prov-state': 'destination_province',
+    'postal-zip-code': 'destination_postal_code',
+    'country-code': 'destination_country',
+}
+SHIPMENT_DETAIL_COLUMNS = tuple(SHIPMENT_DETAIL_FIELDS.values()) + tuple(DESTINATION_FIELDS.values())
+
+
+def _local_name(tag):
+    """ Returns the local name of a Canada Post element, or None for elements in other namespaces. """
+    if tag.startswith('{'):
+        namespace, _, local = tag[1:].partition('}')
+        return local if namespace.startswith(CANADA_POST_NS_PREFIX) else None
+    return tag
+
+
+def parse_shipment_details(shipment_details_xml):
+    """
+    Extracts the structured fields of a shipment details document in one streaming pass.
+
+    Returns a dict with every column in SHIPMENT_DETAIL_COLUMNS (None where
+    the element is absent), or None if the document cannot be parsed.
+    Elements are matched by local name within the Canada Post namespaces,
+    and the first occurrence of each field wins. Each element is cleared
+    once it has been read, so large documents are never held in memory as
+    a full tree.
+    """
+    if not shipment_details_xml:
+        return None
+    if isinstance(shipment_details_xml, str):
+        shipment_details_xml = shipment_details_xml.encode('utf-8')
+
+    details = dict.fromkeys(SHIPMENT_DETAIL_COLUMNS)
+    path = []
+    try:
+        for event, element in ET.iterparse(io.BytesIO(shipment_details_xml), events=('start', 'end')):
+            if event == 'start':
+                path.append(_local_name(element.tag))
+                continue
+
+            name = path.pop()
+            text = element.text.strip() if element.text and element.text.strip() else None
+            if name and text:
+                column = DESTINATION_FIELDS.get(name) if 'destination' in path else None
+                column = column or SHIPMENT_DETAIL_FIELDS.get(name)
+                if column and details[column] is None:
+                    details[column] = text
+            element.clear()
+    except ET.ParseError:
+        return None
+    return details
+
@@ -0,0 +1,109 @@
+import heapq
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+# Canada Post needs a little time before a freshly created PIN shows up in tracking.
+TRACKING_VALIDATION_DELAY_SECONDS = 30
+# Due PINs checked together on each wake-up, and how many checks run at once.
+TRACKING_VALIDATION_BATCH_SIZE = 10
+TRACKING_VALIDATION_WORKERS = 4
+
+
+class TrackingValidationQueue:
+    """
+    Background queue that validates tracking PINs after a delay, without blocking label creation.
+
+    `schedule()` queues a PIN for validation at created_at + delay and
+    returns immediately. A worker thread sleeps until the earliest PIN is
+    due, then checks every due PIN (up to `batch_size`) concurrently with
+    `validate(tracking_pin)`. Each result goes to `on_result(order_id,
+    tracking_pin, is_valid)`. `close()` stops accepting work, waits for the
+    remaining PINs to come due and be checked, and returns all results.
+    """
+
+    def __init__(self, validate, on_result=None, delay=TRACKING_VALIDATION_DELAY_SECONDS,
+                 batch_size=TRACKING_VALIDATION_BATCH_SIZE, max_workers=TRACKING_VALIDATION_WORKERS,
+                 clock=time.monotonic):
+        self._validate = validate
+        self._on_result = on_result
+        self.delay = delay
+        self.batch_size = batch_size
+        self._clock = clock
+        self._heap = []
+        self._sequence = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.results = []
+        self._worker = threading.Thread(target=self._run, name='cp-tracking-validation', daemon=True)
+        self._worker.start()
+
+    def schedule(self, order_id, tracking_pin, created_at=None):
+        """ Queues a PIN for validation `delay` seconds after `created_at` (default: now, on the queue's clock). """
+        created_at = self._clock() if created_at is None else created_at
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Tracking validation queue is closed.")
+            heapq.heappush(self._heap, (created_at + self.delay, self._sequence, order_id, tracking_pin))
+            self._sequence += 1
+            self._condition.notify()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._heap)
+
+    def _next_batch(self):
+        """ Blocks until PINs are due and returns them, or returns None once closed and drained. """
+        with self._condition:
+            while True:
+                if self._heap and self._heap[0][0] <= self._clock():
+                    batch = []
+                    while self._heap and self._heap[0][0] <= self._clock() and len(batch) < self.batch_size:
+                        _, _, order_id, tracking_pin = heapq.heappop(self._heap)
+                        batch.append((order_id, tracking_pin))
+                    return batch
+                if self._closed and not self._heap:
+                    return None
+                timeout = max(0.0, self._heap[0][0] - self._clock()) if self._heap else None
+                self._condition.wait(timeout)
+
+    def _check(self, item):
+        order_id, tracking_pin = item
+        try:
+            is_valid = bool(self._validate(tracking_pin))
+        except Exception as e:
+            print(f"ERROR: Tracking validation for order {order_id} failed unexpectedly: {e}")
+            is_valid = False
+        return order_id, tracking_pin, is_valid
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            print(f"INFO: Validating {len(batch)} tracking PIN(s)...")
+            for order_id, tracking_pin, is_valid in self._executor.map(self._check, batch):
+                self.results.append((order_id, tracking_pin, is_valid))
+                if self._on_result:
+                    try:
+                        self._on_result(order_id, tracking_pin, is_valid)
+                    except Exception as e:
+                        print(f"ERROR: Could not record tracking validation for order {order_id}: {e}")
+
+    def close(self, wait=True):
+        """ Stops accepting PINs and, with `wait`, blocks until every queued PIN has been validated. """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if wait:
+            self._worker.join()
+            self._executor.shutdown(wait=True)
+        return list(self.results)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,12 +1,12 @@
 import os
 import sys
 import requests
-import base64
 
 # Add project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(project_root, '..', '..', '..'))
 from common.utils import get_canada_post_credentials
+from shipping.canada_post.cp_shipping.cp_api_client import get_canada_post_client
 
 
 def get_tracking_summary(api_user, api_password, tracking_pin):
@@ -15,20 +15,11 @@ def get_tracking_summary(api_user, api_password, tracking_pin):
         print("ERROR: No tracking PIN provided for validation.")
         return False
 
-    # Use the production URL for tracking
-    tracking_url = f"https://soa-gw.canadapost.ca/vis/track/pin/{tracking_pin}/summary"
+    client = get_canada_post_client(api_user, api_password)
 
-    auth_string = f"{api_user}:{api_password}"
-    auth_b64 = base64.b64encode(auth_string.encode('utf-8')).decode('utf-8')
-
-    headers = {
-        'Accept': 'application/vnd.cpc.track-v2+xml', # Note: different Accept header for tracking
-        'Authorization': f'Basic {auth_b64}'
-    }
-
-    print(f"INFO: Validating tracking PIN {tracking_pin} with URL: {tracking_url}...")
+    print(f"INFO: Validating tracking PIN {tracking_pin}...")
     try:
-        response = requests.get(tracking_url, headers=headers)
+        response = client.get_tracking_summary(tracking_pin)
         response.raise_for_status()
         print(f"SUCCESS: Tracking PIN {tracking_pin} is valid and recognized by Canada Post.")
         print("Tracking Summary:", response.text)
@@ -46,17 +37,11 @@ def get_shipment_details(api_user, api_password, shipment_details_url):
         print("ERROR: No shipment details URL provided for validation.")
         return None
 
-    auth_string = f"{api_user}:{api_password}"
-    auth_b64 = base64.b64encode(auth_string.encode('utf-8')).decode('utf-8')
-
-    headers = {
-        'Accept': 'application/vnd.cpc.shipment-v8+xml',
-        'Authorization': f'Basic {auth_b64}'
-    }
+    client = get_canada_post_client(api_user, api_password)
 
     print(f"INFO: Getting shipment details with URL: {shipment_details_url}...")
     try:
-        response = requests.get(shipment_details_url, headers=headers)
+        response = client.get_shipment_details(shipment_details_url)
         response.raise_for_status()
         print("SUCCESS: Get Shipment Details API call was successful.")
         return response.text
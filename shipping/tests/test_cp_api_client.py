@@ -0,0 +1,44 @@
+import unittest
+import os
+from unittest.mock import patch
+
+# Add project root to path to allow importing 'shipping'
+import sys
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from shipping.canada_post.cp_shipping import cp_api_client
+
+class TestCanadaPostClient(unittest.TestCase):
+
+    def test_auth_header_is_built_once_per_session(self):
+        client = cp_api_client.CanadaPostClient("user", "pass")
+        self.assertEqual(client.session.headers['Authorization'], 'Basic dXNlcjpwYXNz')
+
+    def test_clients_are_shared_per_credentials(self):
+        first = cp_api_client.get_canada_post_client("shared-user", "pass")
+        self.assertIs(first, cp_api_client.get_canada_post_client("shared-user", "pass"))
+        self.assertIsNot(first, cp_api_client.get_canada_post_client("other-user", "pass"))
+
+    @patch('requests.Session.post')
+    def test_create_shipment_posts_to_customer_endpoint(self, mock_post):
+        client = cp_api_client.CanadaPostClient("user", "pass")
+        client.create_shipment("123", "<shipment/>")
+
+        args, kwargs = mock_post.call_args
+        self.assertEqual(args[0], 'https://soa-gw.canadapost.ca/rs/123/123/shipment')
+        self.assertEqual(kwargs['headers']['Content-Type'], cp_api_client.SHIPMENT_MEDIA_TYPE)
+        self.assertEqual(kwargs['timeout'], cp_api_client.CREATE_SHIPMENT_TIMEOUT)
+
+    @patch('requests.Session.get')
+    def test_tracking_summary_uses_tracking_media_type(self, mock_get):
+        client = cp_api_client.CanadaPostClient("user", "pass")
+        client.get_tracking_summary("PIN-1")
+
+        args, kwargs = mock_get.call_args
+        self.assertEqual(args[0], 'https://soa-gw.canadapost.ca/vis/track/pin/PIN-1/summary')
+        self.assertEqual(kwargs['headers']['Accept'], cp_api_client.TRACKING_MEDIA_TYPE)
+        self.assertEqual(kwargs['timeout'], cp_api_client.TRACKING_SUMMARY_TIMEOUT)
+
+if __name__ == '__main__':
+    unittest.main()
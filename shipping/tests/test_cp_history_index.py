@@ -0,0 +1,71 @@
+import unittest
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+# Add project root to path to allow importing 'shipping'
+import sys
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from shipping.canada_post.cp_shipping import cp_history_index
+
+SHIPMENT_DETAILS_XML = """
+<shipment-details xmlns="http://www.canadapost.ca/ws/shipment-v8">
+    <tracking-pin>TRACK-123</tracking-pin>
+    <delivery-spec>
+        <references>
+            <customer-ref-1>ORDER-1</customer-ref-1>
+        </references>
+    </delivery-spec>
+</shipment-details>
+"""
+
+class TestShipmentHistoryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.history_file = os.path.join(self.temp_dir.name, 'cp_shipping_history_log.json')
+        self.index_file = os.path.join(self.temp_dir.name, 'cp_shipping_history_index.json')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_extract_shipment_keys(self):
+        order_id, tracking_pin = cp_history_index.extract_shipment_keys(SHIPMENT_DETAILS_XML)
+        self.assertEqual(order_id, "ORDER-1")
+        self.assertEqual(tracking_pin, "TRACK-123")
+
+    def test_extract_shipment_keys_invalid_xml(self):
+        self.assertEqual(cp_history_index.extract_shipment_keys("not xml"), (None, None))
+
+    def test_load_rebuilds_index_from_history_log(self):
+        with open(self.history_file, 'w') as f:
+            json.dump([{"timestamp": "t0", "shipment_details": SHIPMENT_DETAILS_XML}], f)
+
+        index = cp_history_index.load_history_index(self.index_file, self.history_file)
+        self.assertTrue(index.has_order("ORDER-1"))
+        self.assertFalse(index.has_order("ORDER-2"))
+        self.assertEqual(index.order_for_tracking_pin("TRACK-123"), "ORDER-1")
+        self.assertTrue(os.path.exists(self.index_file))
+
+    def test_record_shipment_is_saved_once_per_batch(self):
+        self.addCleanup(cp_history_index._indexes.clear)
+        cp_history_index.record_shipment("ORDER-2", "TRACK-456", self.index_file)
+        cp_history_index.record_shipment("ORDER-3", "TRACK-789", self.index_file)
+        self.assertFalse(os.path.exists(self.index_file))
+        self.assertTrue(cp_history_index.get_history_index(self.index_file).has_order("ORDER-3"))
+
+        with patch.object(cp_history_index.ShipmentHistoryIndex, 'save', autospec=True,
+                          side_effect=cp_history_index.ShipmentHistoryIndex.save) as mock_save:
+            cp_history_index.save_history_index(self.index_file)
+            cp_history_index.save_history_index(self.index_file)
+        self.assertEqual(mock_save.call_count, 1)
+
+        index = cp_history_index.load_history_index(self.index_file, self.history_file)
+        self.assertTrue(index.has_order("ORDER-2"))
+        self.assertEqual(index.order_for_tracking_pin("TRACK-789"), "ORDER-3")
+
+if __name__ == '__main__':
+    unittest.main()
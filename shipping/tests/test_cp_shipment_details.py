@@ -0,0 +1,60 @@
+import unittest
+import os
+
+# Add project root to path to allow importing 'shipping'
+import sys
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from shipping.canada_post.cp_shipping.cp_shipment_details import parse_shipment_details
+
+SHIPMENT_DETAILS_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<shipment-details xmlns="http://www.canadapost.ca/ws/shipment-v8">
+    <shipment-status>transmitted</shipment-status>
+    <tracking-pin>TRACK-123</tracking-pin>
+    <shipment-detail>
+        <expected-mailing-date>2026-01-05</expected-mailing-date>
+        <delivery-spec>
+            <service-code>DOM.EP</service-code>
+            <sender>
+                <name>VISIONVATION INC.</name>
+                <address-details><city>North York</city></address-details>
+            </sender>
+            <destination>
+                <name>Jane Doe</name>
+                <address-details>
+                    <city>Toronto</city>
+                    <prov-state>ON</prov-state>
+                    <country-code>CA</country-code>
+                    <postal-zip-code>M1M1M1</postal-zip-code>
+                </address-details>
+            </destination>
+            <references>
+                <customer-ref-1>ORDER-1</customer-ref-1>
+            </references>
+        </delivery-spec>
+    </shipment-detail>
+</shipment-details>
+"""
+
+class TestParseShipmentDetails(unittest.TestCase):
+
+    def test_extracts_structured_fields(self):
+        details = parse_shipment_details(SHIPMENT_DETAILS_XML)
+
+        self.assertEqual(details['tracking_pin'], "TRACK-123")
+        self.assertEqual(details['order_id'], "ORDER-1")
+        self.assertEqual(details['shipment_status'], "transmitted")
+        self.assertEqual(details['service_code'], "DOM.EP")
+        self.assertEqual(details['expected_mailing_date'], "2026-01-05")
+        self.assertEqual(details['destination_name'], "Jane Doe")
+        self.assertEqual(details['destination_city'], "Toronto")
+        self.assertEqual(details['destination_postal_code'], "M1M1M1")
+        self.assertIsNone(details['due_amount'])
+
+    def test_invalid_xml_returns_none(self):
+        self.assertIsNone(parse_shipment_details("<shipment-details>"))
+        self.assertIsNone(parse_shipment_details(""))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import threading
+
+# Add project root to path to allow importing 'shipping'
+import sys
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from shipping.canada_post.cp_shipping.cp_tracking_validation import TrackingValidationQueue
+
+class TestTrackingValidationQueue(unittest.TestCase):
+
+    def test_close_drains_every_scheduled_pin(self):
+        recorded = []
+        queue = TrackingValidationQueue(lambda pin: pin != "BAD", on_result=lambda *r: recorded.append(r), delay=0)
+        queue.schedule("ORDER-1", "PIN-1")
+        queue.schedule("ORDER-2", "BAD")
+        results = queue.close()
+
+        self.assertCountEqual(results, [("ORDER-1", "PIN-1", True), ("ORDER-2", "BAD", False)])
+        self.assertCountEqual(recorded, results)
+
+    def test_schedule_does_not_wait_for_validation(self):
+        release = threading.Event()
+        queue = TrackingValidationQueue(lambda pin: release.wait(5), delay=0)
+        queue.schedule("ORDER-1", "PIN-1")
+        queue.schedule("ORDER-2", "PIN-2")
+        release.set()
+        self.assertEqual(len(queue.close()), 2)
+
+    def test_pins_are_not_checked_before_they_are_due(self):
+        now = [100.0]
+        checked = []
+        queue = TrackingValidationQueue(checked.append, delay=30, clock=lambda: now[0])
+        queue.schedule("ORDER-1", "PIN-1")
+        self.assertEqual(checked, [])
+        self.assertEqual(len(queue), 1)
+        now[0] = 130.0
+        queue.close()
+        self.assertEqual(checked, ["PIN-1"])
+
+    def test_validation_errors_count_as_invalid(self):
+        def explode(pin):
+            raise ValueError("boom")
+        queue = TrackingValidationQueue(explode, delay=0)
+        queue.schedule("ORDER-1", "PIN-1")
+        self.assertEqual(queue.close(), [("ORDER-1", "PIN-1", False)])
+
+    def test_schedule_after_close_is_rejected(self):
+        queue = TrackingValidationQueue(lambda pin: True, delay=0)
+        queue.close()
+        with self.assertRaises(RuntimeError):
+            queue.schedule("ORDER-1", "PIN-1")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import os
+import xml.etree.ElementTree as ET
+
+# Add project root to path to allow importing 'shipping'
+import sys
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from shipping.canada_post.cp_create_labels import cp_transform_shipping_data
+
+NS = {'cp': 'http://www.canadapost.ca/ws/shipment-v8'}
+
+class TestShipmentRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.order = {
+            "order_id": "ORDER-1",
+            "customer": {"shipping_address": {
+                "firstname": "Jane", "lastname": "O'Neil & Sons <Ltd>", "street_1": "1 Main St",
+                "city": "Toronto", "state": "ON", "zip_code": "M1M 1M1"}},
+            "order_lines": [{"offer_sku": "SKU-1", "quantity": 2}],
+        }
+
+    def test_payload_fills_order_fields(self):
+        root = ET.fromstring(cp_transform_shipping_data.create_xml_payload(self.order, "CONTRACT", "PAYER").encode('utf-8'))
+
+        self.assertEqual(root.find('.//cp:destination/cp:name', NS).text, "Jane O'Neil & Sons <Ltd>")
+        self.assertEqual(root.find('.//cp:destination/cp:company', NS).text, "2x SKU-1")
+        self.assertEqual(root.find('.//cp:customer-ref-1', NS).text, "ORDER-1")
+        self.assertEqual(root.find('.//cp:contract-id', NS).text, "CONTRACT")
+        self.assertEqual(root.find('.//cp:paid-by-customer', NS).text, "PAYER")
+        self.assertEqual(root.find('.//cp:requested-shipping-point', NS).text, "M2J4N3")
+
+    def test_pretty_and_compact_payloads_are_equivalent(self):
+        compact = cp_transform_shipping_data.create_xml_payload(self.order, "CONTRACT", "PAYER", pretty=False)
+        pretty = cp_transform_shipping_data.create_xml_payload(self.order, "CONTRACT", "PAYER", pretty=True)
+
+        self.assertLess(len(compact), len(pretty))
+        self.assertEqual(
+            ET.canonicalize(compact.split('\n', 1)[1], strip_text=True),
+            ET.canonicalize(pretty.split('\n', 1)[1], strip_text=True),
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import json
 import os
+import tempfile
 from unittest.mock import patch, mock_open
 
 # Add project root to path to allow importing 'shipping'
@@ -9,6 +10,7 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 sys.path.insert(0, PROJECT_ROOT)
 
 from shipping.canada_post.cp_shipping import cp_pdf_labels
+from common.spool_queue import SpoolQueue
 
 class TestShipping(unittest.TestCase):
 
@@ -17,18 +19,30 @@ class TestShipping(unittest.TestCase):
         self.mock_order_data = {"order_id": "ORDER-1"}
         self.mock_xml_content = "<shipment></shipment>"
 
-    @patch('builtins.open', new_callable=mock_open)
-    def test_log_shipping_data(self, mock_file):
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.get_segmented_log')
+    def test_log_shipping_data(self, mock_get_log):
         cp_pdf_labels.log_shipping_data("ORDER-1", "TRACK-123", "http://example.com/label.pdf", "<response/>")
-        mock_file().write.assert_called()
+        mock_get_log.assert_called_once_with(cp_pdf_labels.CP_SHIPPING_DATA_FILE)
+        entry = mock_get_log.return_value.append.call_args.args[0]
+        self.assertEqual((entry['order_id'], entry['tracking_pin']), ("ORDER-1", "TRACK-123"))
 
-    @patch('builtins.open', new_callable=mock_open)
-    def test_log_cp_history(self, mock_file):
-        cp_pdf_labels.log_cp_history("<shipment_details/>")
-        mock_file().write.assert_called()
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.record_shipment')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.get_segmented_log')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.open_order_store')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.BlobStore')
+    def test_log_cp_history(self, mock_blob_store, mock_open_store, mock_get_log, mock_record_shipment):
+        mock_blob_store.return_value.put.return_value = "BLOB-1"
+        store = unittest.mock.Mock()
+        cp_pdf_labels.log_cp_history("<shipment_details/>", store, order_id="ORDER-1")
+        mock_open_store.assert_not_called()
+        self.assertEqual(store.record_shipment_details.call_args.args[0], "BLOB-1")
+        self.assertEqual(mock_get_log.return_value.append.call_count, 2)
+        self.assertEqual(mock_get_log.return_value.append.call_args.args[0]['details_blob_id'], "BLOB-1")
+        mock_record_shipment.assert_called_once_with("ORDER-1", None)
 
-    @patch('requests.post')
-    def test_create_shipment_and_get_label_success(self, mock_post):
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.get_segmented_log')
+    @patch('requests.Session.post')
+    def test_create_shipment_and_get_label_success(self, mock_post, mock_get_log):
         # Mock the API response
         mock_response = unittest.mock.Mock()
         mock_response.status_code = 200
@@ -43,23 +57,102 @@ class TestShipping(unittest.TestCase):
         """
         mock_post.return_value = mock_response
 
-        label_url, details_url, tracking_pin = cp_pdf_labels.create_shipment_and_get_label("user", "pass", "123", self.mock_xml_content, self.mock_order_data)
+        store = unittest.mock.Mock()
+        label_url, details_url, tracking_pin = cp_pdf_labels.create_shipment_and_get_label("user", "pass", "123", self.mock_xml_content, self.mock_order_data, store)
         self.assertEqual(label_url, "http://example.com/label.pdf")
         self.assertEqual(details_url, "http://example.com/details")
         self.assertEqual(tracking_pin, "TRACK-123")
+        store.mark_label_created.assert_called_once_with("ORDER-1", "TRACK-123")
+        mock_get_log.return_value.append.assert_called_once()
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_download_label_success(self, mock_get):
         # Mock the API response
         mock_response = unittest.mock.Mock()
         mock_response.status_code = 200
-        mock_response.content = b"PDF content"
+        mock_response.iter_content.return_value = [b"PDF ", b"content"]
         mock_get.return_value = mock_response
 
-        with patch('builtins.open', mock_open()) as mock_file:
+        with patch('builtins.open', mock_open()) as mock_file, patch('os.replace') as mock_replace:
             result = cp_pdf_labels.download_label("http://example.com/label.pdf", "user", "pass", "label.pdf")
             self.assertTrue(result)
-            mock_file().write.assert_called_with(b"PDF content")
+            mock_file.assert_called_with("label.pdf.part", 'wb')
+            mock_file().write.assert_called_with(b"content")
+            mock_replace.assert_called_once_with("label.pdf.part", "label.pdf")
+        self.assertTrue(mock_get.call_args.kwargs['stream'])
+
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.download_order_label')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.fetch_and_log_shipment_details')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.create_shipment_and_get_label')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.open_order_store')
+    def test_process_spool_items_runs_every_stage(self, mock_open_store, mock_create, mock_details, mock_download):
+        mock_create.side_effect = lambda user, password, customer, xml, order, store: (
+            f"http://example.com/{order['order_id']}.pdf", f"http://example.com/{order['order_id']}", f"PIN-{order['order_id']}")
+        store = mock_open_store.return_value.__enter__.return_value
+        store.get_order.return_value = None
+        validation_queue = unittest.mock.Mock()
+        orders_map = {"ORDER-1": {"order_id": "ORDER-1"}, "ORDER-2": {"order_id": "ORDER-2"}}
+
+        with tempfile.TemporaryDirectory() as spool_dir:
+            spool = SpoolQueue(spool_dir)
+            for order_id in ["ORDER-1", "ORDER-2", "ORDER-3"]:
+                spool.enqueue(f"{order_id}.xml", self.mock_xml_content)
+            items = spool.claim()
+
+            cp_pdf_labels.process_spool_items(items, orders_map, "user", "pass", "123", spool, validation_queue)
+
+            self.assertEqual(spool.state_of("ORDER-1.xml"), 'done')
+            self.assertEqual(spool.state_of("ORDER-2.xml"), 'done')
+            self.assertEqual(spool.state_of("ORDER-3.xml"), 'failed')
+
+        self.assertEqual(mock_create.call_count, 2)
+        self.assertIs(mock_create.call_args.args[5], store)
+        self.assertEqual(validation_queue.schedule.call_count, 2)
+        self.assertEqual(mock_details.call_count, 2)
+        self.assertIs(mock_details.call_args.args[4], store)
+        mock_download.assert_any_call("user", "pass", "ORDER-1", "http://example.com/ORDER-1.pdf")
+        mock_download.assert_any_call("user", "pass", "ORDER-2", "http://example.com/ORDER-2.pdf")
+
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.download_order_label')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.fetch_and_log_shipment_details')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.create_shipment_and_get_label')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.open_order_store')
+    def test_process_order_payloads_skips_orders_with_labels(self, mock_open_store, mock_create, mock_details, mock_download):
+        mock_create.return_value = ("http://example.com/label.pdf", None, "PIN-1")
+        store = mock_open_store.return_value.__enter__.return_value
+        store.get_order.side_effect = lambda order_id: {"label_created": 1} if order_id == "ORDER-2" else None
+        validation_queue = unittest.mock.Mock()
+        payloads = iter([({"order_id": "ORDER-1"}, "<a/>"), ({"order_id": "ORDER-2"}, "<b/>")])
+
+        cp_pdf_labels.process_order_payloads(payloads, "user", "pass", "123", validation_queue)
+
+        mock_create.assert_called_once_with("user", "pass", "123", "<a/>", {"order_id": "ORDER-1"}, store)
+        validation_queue.schedule.assert_called_once_with("ORDER-1", "PIN-1")
+        mock_details.assert_not_called()
+        mock_download.assert_called_once_with("user", "pass", "ORDER-1", "http://example.com/label.pdf")
+
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.process_order_payloads')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.iter_shipment_payloads')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.start_tracking_validation')
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.get_canada_post_credentials',
+           return_value=("user", "pass", "123", "paid", "contract"))
+    @patch('shipping.canada_post.cp_shipping.cp_pdf_labels.os.makedirs')
+    def test_label_runs_share_the_validation_queue_until_shutdown(self, mock_makedirs, mock_credentials, mock_start,
+                                                                  mock_payloads, mock_process):
+        validation_queue = mock_start.return_value
+        validation_queue.__len__.return_value = 0
+        validation_queue.close.return_value = [("ORDER-1", "PIN-1", True)]
+
+        cp_pdf_labels.create_labels_for_orders([{"order_id": "ORDER-1"}])
+        cp_pdf_labels.create_labels_for_orders([{"order_id": "ORDER-2"}])
+
+        mock_start.assert_called_once()
+        validation_queue.close.assert_not_called()
+        self.assertIs(mock_process.call_args.args[4], validation_queue)
+
+        self.assertEqual(cp_pdf_labels.shutdown_tracking_validation(), [("ORDER-1", "PIN-1", True)])
+        validation_queue.close.assert_called_once()
+        self.assertEqual(cp_pdf_labels.shutdown_tracking_validation(), [])
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import requests
+from unittest.mock import patch, MagicMock
+
+from Orders.pending_acceptance.accept_orders_pending_confirmation import accept_orders
+
+class TestAcceptOrdersConcurrently(unittest.TestCase):
+
+    @patch('Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders.accept_order')
+    def test_results_keep_order_and_capture_errors(self, mock_accept_order):
+        def fake_accept(api_key, order):
+            if order['order_id'] == "B":
+                raise ValueError("boom")
+            if order['order_id'] == "C":
+                return None
+            return {"status": "success"}
+        mock_accept_order.side_effect = fake_accept
+
+        orders = [{"order_id": "A"}, {"order_id": "B"}, {"order_id": "C"}, {"order_id": "D"}]
+        results = accept_orders.accept_orders_concurrently("fake_api_key", orders, max_workers=3)
+
+        self.assertEqual([order_id for order_id, _ in results], ["A", "B", "D"])
+        self.assertEqual(results[1][1], {"error": "boom"})
+        self.assertEqual(mock_accept_order.call_count, 4)
+
+    @patch('Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders.get_best_buy_client')
+    def test_http_error_body_is_marked_as_failed(self, mock_get_client):
+        error_response = MagicMock(status_code=400)
+        error_response.json.return_value = {"message": "Order is not in WAITING_ACCEPTANCE"}
+        client = mock_get_client.return_value
+        client.put.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("400", response=error_response)
+
+        api_response = accept_orders.accept_order("fake_api_key", {"order_id": "A", "order_lines": []})
+        self.assertEqual(api_response["response"], {"message": "Order is not in WAITING_ACCEPTANCE"})
+        self.assertFalse(accept_orders.is_accepted(api_response))
+        self.assertTrue(accept_orders.is_accepted({"status": "success"}))
+
+    def test_log_acceptances_marks_only_accepted_orders(self):
+        ledger, store = MagicMock(), MagicMock()
+        results = [("A", {"status": "success"}), ("B", {"error": "400", "response": {}})]
+
+        accept_orders.log_acceptances(results, ledger, store)
+
+        self.assertEqual([entry['order_id'] for entry in ledger.append_batch.call_args[0][0]], ["A", "B"])
+        store.mark_accepted.assert_called_once()
+        self.assertEqual(store.mark_accepted.call_args[0][0], ["A"])
+
+    @patch('Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders.invalidate_cycle_snapshot')
+    @patch('Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders.log_acceptances')
+    @patch('Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders.accept_orders_concurrently')
+    @patch('Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders.get_orders_to_accept')
+    @patch('Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders.open_order_store')
+    @patch('Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders.AcceptanceLedger')
+    @patch('Orders.pending_acceptance.accept_orders_pending_confirmation.accept_orders.get_best_buy_api_key', return_value="fake_api_key")
+    def test_main_returns_only_successful_acceptances(self, mock_key, mock_ledger, mock_store, mock_get_orders,
+                                                      mock_accept, mock_log, mock_invalidate):
+        mock_accept.return_value = [("A", {"status": "success"}), ("B", {"error": "400", "response": {}}), ("C", {"error": "timeout"})]
+
+        self.assertEqual(accept_orders.main(), ["A"])
+        mock_log.assert_called_once()
+        mock_invalidate.assert_called_once_with('WAITING_ACCEPTANCE')
+
+    def test_no_orders(self):
+        self.assertEqual(accept_orders.accept_orders_concurrently("fake_api_key", []), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import json
+import os
+import tempfile
+
+from common.acceptance_ledger import AcceptanceLedger
+
+class TestAcceptanceLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ledger_path = os.path.join(self.temp_dir.name, 'order_acceptance_ledger.jsonl')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_append_batch_is_indexed_and_persisted(self):
+        ledger = AcceptanceLedger(self.ledger_path)
+        ledger.append_batch([
+            {"order_id": "A-1", "timestamp": "t1", "api_response": {"status": "success"}},
+            {"order_id": "A-2", "timestamp": "t1", "api_response": {"status": "success"}},
+        ])
+
+        self.assertIn("A-1", ledger)
+        self.assertNotIn("A-3", ledger)
+
+        reopened = AcceptanceLedger(self.ledger_path)
+        self.assertEqual(reopened.accepted_order_ids(), {"A-1", "A-2"})
+        with open(self.ledger_path, 'r') as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_corrupted_line_is_skipped(self):
+        with open(self.ledger_path, 'w') as f:
+            f.write(json.dumps({"order_id": "A-1", "timestamp": "t1", "api_response": None}) + '\n')
+            f.write('{"order_id": "A-2", "times')
+
+        ledger = AcceptanceLedger(self.ledger_path)
+        self.assertEqual(ledger.accepted_order_ids(), {"A-1"})
+
+    def test_append_after_torn_line_starts_a_new_line(self):
+        with open(self.ledger_path, 'w') as f:
+            f.write(json.dumps({"order_id": "A-1", "timestamp": "t1", "api_response": None}) + '\n')
+            f.write('{"order_id": "A-2", "times')
+
+        AcceptanceLedger(self.ledger_path).append("A-3", "t2", {"status": "success"})
+        self.assertEqual(AcceptanceLedger(self.ledger_path).accepted_order_ids(), {"A-1", "A-3"})
+
+    def test_legacy_logs_are_imported(self):
+        with open(os.path.join(self.temp_dir.name, 'accepted_orders_log.json'), 'w') as f:
+            json.dump([{"order_id": "OLD-1", "timestamp": "t0"}], f)
+        with open(os.path.join(self.temp_dir.name, 'order_acceptance_journal.json'), 'w') as f:
+            json.dump([{"order_id": "OLD-1", "timestamp": "t0", "api_response": {"status": "success"}}], f)
+
+        ledger = AcceptanceLedger(self.ledger_path)
+        self.assertIn("OLD-1", ledger)
+        self.assertEqual(ledger.get("OLD-1")["api_response"], {"status": "success"})
+        self.assertTrue(os.path.exists(self.ledger_path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,18 @@
 import unittest
 from unittest.mock import patch, mock_open
 import json
+import requests
 from accounting.fetch_transactions import get_transactions, save_transactions_to_json
 
 class TestAccounting(unittest.TestCase):
 
-    @patch('requests.get')
+    def setUp(self):
+        # Keep the shared client's rate limiter from pacing these mocked calls.
+        patcher = patch('common.rate_limiter.TokenBucket.acquire')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('requests.Session.get')
     def test_get_transactions_success(self, mock_get):
         # Mock the API response for a successful call
         mock_response = {
@@ -24,16 +31,19 @@ class TestAccounting(unittest.TestCase):
         self.assertEqual(transactions[0]['id'], '1')
         self.assertEqual(transactions[1]['amount'], 200)
 
-    @patch('requests.get')
-    def test_get_transactions_api_error(self, mock_get):
-        # Mock an API error
+    @patch('common.best_buy_client.compute_backoff', return_value=0)
+    @patch('requests.Session.get')
+    def test_get_transactions_api_error(self, mock_get, mock_backoff):
+        # Mock an API error that persists through every retry
         mock_get.return_value.status_code = 500
         mock_get.return_value.text = "Internal Server Error"
+        mock_get.return_value.headers = {}
+        mock_get.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("500 Server Error")
 
         with self.assertRaises(requests.exceptions.HTTPError):
             get_transactions("fake_api_key")
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_transactions_empty_response(self, mock_get):
         # Mock an empty response from the API
         mock_response = {
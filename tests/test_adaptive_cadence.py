@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.adaptive_cadence import AdaptiveCadence, CadenceProfile
+
+
+class TestAdaptiveCadence(unittest.TestCase):
+
+    def setUp(self):
+        # 2026-10-14 is a Wednesday.
+        self.now = [datetime(2026, 10, 14, 10, 0)]
+        self.business_hours = CadenceProfile('business hours', 60, 300, days=range(0, 5), start_hour=8, end_hour=20)
+        self.off_hours = CadenceProfile('off hours', 120, 1800)
+        self.cadence = AdaptiveCadence(self.off_hours, [self.business_hours], decay=2,
+                                       recent_window=timedelta(minutes=10), clock=lambda: self.now[0])
+
+    def advance(self, seconds):
+        self.now[0] += timedelta(seconds=seconds)
+
+    def test_arrivals_keep_the_floor_and_idle_runs_decay_to_the_ceiling(self):
+        self.assertEqual(self.cadence.observe(3), 60)
+        self.advance(60)
+        self.assertEqual(self.cadence.observe(0), 60)
+
+        self.advance(600)
+        self.assertEqual(self.cadence.observe(0), 120)
+        self.assertEqual(self.cadence.observe(0), 240)
+        self.assertEqual(self.cadence.observe(0), 300)
+
+    def test_profile_follows_the_clock(self):
+        self.assertIs(self.cadence.profile(), self.business_hours)
+        self.now[0] = datetime(2026, 10, 14, 3, 0)
+        self.assertIs(self.cadence.profile(), self.off_hours)
+        self.now[0] = datetime(2026, 10, 17, 10, 0)
+        self.assertIs(self.cadence.profile(), self.off_hours)
+
+    def test_interval_is_clamped_when_business_hours_start(self):
+        self.now[0] = datetime(2026, 10, 14, 3, 0)
+        for _ in range(6):
+            self.cadence.observe(0)
+        self.assertEqual(self.cadence.interval(), 1800)
+
+        self.now[0] = datetime(2026, 10, 14, 8, 0)
+        self.assertEqual(self.cadence.interval(), 300)
+
+    def test_invalid_profile_raises(self):
+        with self.assertRaises(ValueError):
+            CadenceProfile('broken', 300, 60)
+
+if __name__ == '__main__':
+    unittest.main()
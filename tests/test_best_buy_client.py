@@ -0,0 +1,107 @@
+import unittest
+import requests
+from unittest.mock import patch
+
+from common.best_buy_client import BestBuyClient, get_best_buy_client
+
+class TestBestBuyClient(unittest.TestCase):
+
+    def test_auth_headers_are_built_once(self):
+        client = BestBuyClient("fake_api_key")
+        self.assertEqual(client.session.headers['Authorization'], "fake_api_key")
+
+    def test_url_resolution(self):
+        client = BestBuyClient("fake_api_key")
+        self.assertEqual(client.url('/orders'), "https://marketplace.bestbuy.ca/api/orders")
+        self.assertEqual(client.url('https://example.com/x'), "https://example.com/x")
+
+    @patch('requests.Session.get')
+    def test_get_applies_default_timeout(self, mock_get):
+        client = BestBuyClient("fake_api_key", timeout=(1, 2))
+        client.get('/orders', params={'order_state_codes': 'SHIPPING'})
+        mock_get.assert_called_once_with(
+            "https://marketplace.bestbuy.ca/api/orders",
+            params={'order_state_codes': 'SHIPPING'},
+            timeout=(1, 2)
+        )
+
+    @patch('requests.Session.get')
+    def test_retry_waits_for_the_full_retry_after(self, mock_get):
+        throttled = unittest.mock.Mock(status_code=429, headers={'Retry-After': '45'})
+        ok = unittest.mock.Mock(status_code=200, headers={})
+        mock_get.side_effect = [throttled, ok]
+        sleeps = []
+        client = BestBuyClient("fake_api_key", sleep=sleeps.append)
+
+        self.assertIs(client.get('/orders'), ok)
+        self.assertIn(45, sleeps)
+
+    @patch('requests.Session.get')
+    def test_retry_after_above_the_limit_is_not_retried(self, mock_get):
+        throttled = unittest.mock.Mock(status_code=429, headers={'Retry-After': '600'})
+        mock_get.return_value = throttled
+        client = BestBuyClient("fake_api_key", sleep=lambda seconds: None)
+
+        self.assertIs(client.get('/orders'), throttled)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_iter_order_pages_follows_total_count(self):
+        client = BestBuyClient("fake_api_key")
+        pages = {
+            0: {"orders": [{"order_id": "1"}, {"order_id": "2"}], "total_count": 5},
+            2: {"orders": [{"order_id": "3"}, {"order_id": "4"}], "total_count": 5},
+            4: {"orders": [{"order_id": "5"}], "total_count": 5},
+        }
+        with patch.object(client, '_fetch_orders_page', side_effect=lambda params, size, offset: pages[offset]) as mock_fetch:
+            result = list(client.iter_order_pages({'order_state_codes': 'SHIPPING'}, page_size=2))
+
+        self.assertEqual([[o['order_id'] for o in page] for page in result], [["1", "2"], ["3", "4"], ["5"]])
+        self.assertEqual([c.args[2] for c in mock_fetch.call_args_list], [0, 2, 4])
+
+    def test_iter_orders_without_prefetch(self):
+        client = BestBuyClient("fake_api_key")
+        pages = {
+            0: {"orders": [{"order_id": "1"}], "total_count": 2},
+            1: {"orders": [{"order_id": "2"}], "total_count": 2},
+        }
+        with patch.object(client, '_fetch_orders_page', side_effect=lambda params, size, offset: pages[offset]):
+            result = list(client.iter_orders(page_size=1, prefetch=False))
+        self.assertEqual([o['order_id'] for o in result], ["1", "2"])
+
+    def test_iter_orders_empty_listing(self):
+        client = BestBuyClient("fake_api_key")
+        with patch.object(client, '_fetch_orders_page', return_value={"orders": [], "total_count": 0}):
+            self.assertEqual(list(client.iter_orders()), [])
+
+    @patch('requests.Session.get')
+    def test_fetch_orders_page_sends_paging_params(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"orders": [], "total_count": 0}
+        client = BestBuyClient("fake_api_key")
+        client._fetch_orders_page({'order_state_codes': 'SHIPPING'}, 50, 100)
+        self.assertEqual(mock_get.call_args.kwargs['params'], {'order_state_codes': 'SHIPPING', 'max': 50, 'offset': 100})
+
+    def test_get_orders_by_ids_batches_and_skips_failed_chunks(self):
+        client = BestBuyClient("fake_api_key")
+
+        def fake_fetch(params, size, offset):
+            ids = params['order_ids'].split(',')
+            if "3" in ids:
+                raise requests.exceptions.ConnectionError("down")
+            return {"orders": [{"order_id": order_id, "order_state": "SHIPPED"} for order_id in ids]}
+
+        with patch.object(client, '_fetch_orders_page', side_effect=fake_fetch) as mock_fetch:
+            result = client.get_orders_by_ids(["1", "2", "2", "3", "4", None], chunk_size=2)
+
+        self.assertEqual(set(result), {"1", "2"})
+        self.assertEqual(mock_fetch.call_count, 2)
+
+    def test_get_orders_by_ids_empty(self):
+        self.assertEqual(BestBuyClient("fake_api_key").get_orders_by_ids([]), {})
+
+    def test_client_is_shared_per_api_key(self):
+        self.assertIs(get_best_buy_client("key-a"), get_best_buy_client("key-a"))
+        self.assertIsNot(get_best_buy_client("key-a"), get_best_buy_client("key-b"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.blob_store import BlobStore
+
+
+class TestBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = BlobStore(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip_is_content_addressed(self):
+        blob_id = self.store.put("<shipment-details/>" * 100)
+
+        self.assertEqual(self.store.put(("<shipment-details/>" * 100).encode('utf-8')), blob_id)
+        self.assertIn(blob_id, self.store)
+        self.assertEqual(self.store.get_text(blob_id), "<shipment-details/>" * 100)
+
+    def test_blobs_are_compressed(self):
+        blob_id = self.store.put("x" * 10000)
+        path = os.path.join(self.temp_dir.name, blob_id[:2], f"{blob_id}.gz")
+        self.assertLess(os.path.getsize(path), 10000)
+
+    def test_missing_blob_returns_none(self):
+        self.assertIsNone(self.store.get("0" * 64))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+import threading
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.event_queue import (EventValidationError, MAX_EVENT_ATTEMPTS, validate_event, enqueue_event,
+                                has_pending_events, consume_events, open_event_queue)
+import main_scheduler
+from customer_service.message_aggregation import fetch_messages
+
+
+def message_event(event_id='evt-1'):
+    return {
+        "event_id": event_id,
+        "event_type": "message.created",
+        "occurred_at": "2026-10-17T12:00:00Z",
+        "data": {"thread_id": "T-1", "message_id": "M-1", "order_id": "ORDER-1", "body": "Where is my order?"},
+    }
+
+def order_event(event_id, order_id, order_state, occurred_at):
+    return {
+        "event_id": event_id,
+        "event_type": "order.state_changed",
+        "occurred_at": occurred_at,
+        "data": {"order_id": order_id, "order_state": order_state},
+    }
+
+
+class TestEventQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.events_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_validate_event_rejects_bad_payloads(self):
+        for payload in ([], {"event_type": "message.created", "data": {}}, dict(message_event(), event_id='../escape'),
+                        dict(message_event(), occurred_at='yesterday')):
+            with self.assertRaises(EventValidationError):
+                validate_event(payload)
+        self.assertEqual(validate_event(message_event())['event_id'], 'evt-1')
+
+    def test_events_are_deduplicated(self):
+        event = validate_event(message_event('evt:1'))
+        self.assertTrue(enqueue_event(event, self.events_dir))
+        self.assertFalse(enqueue_event(event, self.events_dir))
+        self.assertTrue(has_pending_events('messages', self.events_dir))
+
+        handled = consume_events('messages', lambda events: None, self.events_dir)
+        self.assertEqual([e['event_id'] for e in handled], ['evt:1'])
+        self.assertFalse(enqueue_event(event, self.events_dir))
+
+    def test_failed_events_are_retried_a_limited_number_of_times(self):
+        enqueue_event(validate_event(message_event('evt-1')), self.events_dir)
+        failing = MagicMock(side_effect=RuntimeError("disk full"))
+
+        for attempt in range(1, MAX_EVENT_ATTEMPTS):
+            with self.assertRaises(RuntimeError):
+                consume_events('messages', failing, self.events_dir)
+            self.assertTrue(has_pending_events('messages', self.events_dir))
+            with open(os.path.join(self.events_dir, 'messages', 'pending', 'evt-1.json')) as f:
+                self.assertEqual(json.load(f)['attempts'], attempt)
+
+        with self.assertRaises(RuntimeError):
+            consume_events('messages', failing, self.events_dir)
+        self.assertFalse(has_pending_events('messages', self.events_dir))
+        self.assertEqual(open_event_queue('messages', self.events_dir).state_of('evt-1.json'), 'failed')
+        self.assertEqual(failing.call_count, MAX_EVENT_ATTEMPTS)
+
+    def test_event_that_succeeds_on_retry_is_done(self):
+        enqueue_event(validate_event(message_event('evt-1')), self.events_dir)
+        with self.assertRaises(RuntimeError):
+            consume_events('messages', MagicMock(side_effect=RuntimeError("locked")), self.events_dir)
+
+        handled = consume_events('messages', lambda events: None, self.events_dir)
+        self.assertEqual(handled[0]['attempts'], 1)
+        self.assertEqual(open_event_queue('messages', self.events_dir).state_of('evt-1.json'), 'done')
+
+    def test_dispatch_only_triggers_jobs(self):
+        for event in (order_event('evt-2', 'ORDER-1', 'SHIPPING', '2026-10-17T12:05:00Z'),
+                      order_event('evt-1', 'ORDER-1', 'WAITING_ACCEPTANCE', '2026-10-17T12:00:00Z'),
+                      order_event('evt-3', 'ORDER-2', 'WAITING_ACCEPTANCE', '2026-10-17T12:01:00Z')):
+            enqueue_event(validate_event(event), self.events_dir)
+        enqueue_event(validate_event(message_event()), self.events_dir)
+
+        triggered = []
+
+        with patch('common.order_store.OrderStore') as mock_store, \
+             patch('main_scheduler.has_pending_events', lambda name: has_pending_events(name, self.events_dir)), \
+             patch('main_scheduler.consume_events', lambda name, handler: consume_events(name, handler, self.events_dir)):
+            main_scheduler.dispatch_events(triggered.append)
+
+        # Event payloads never change the order store; the triggered jobs read the orders from the API.
+        mock_store.assert_not_called()
+        self.assertEqual(triggered, ['acceptance', 'shipping', 'messages'])
+        self.assertFalse(has_pending_events('orders', self.events_dir))
+
+    def test_message_events_are_saved_like_polled_messages(self):
+        enqueue_event(validate_event(message_event()), self.events_dir)
+        messages_file = os.path.join(self.events_dir, 'messages.json')
+
+        with patch('main_customer_service.consume_events', lambda name, handler: consume_events(name, handler, self.events_dir)), \
+             patch('customer_service.message_aggregation.fetch_messages.save_messages_to_json.__defaults__', (messages_file,)):
+            self.assertEqual(main_scheduler.ingest_message_events(), 1)
+
+        with open(messages_file) as f:
+            saved = json.load(f)
+        self.assertEqual(saved[0]['message_id'], 'M-1')
+        self.assertEqual(saved[0]['message'], 'Where is my order?')
+        self.assertEqual(saved[0]['timestamp'], '2026-10-17T12:00:00Z')
+
+    def test_concurrent_message_saves_do_not_lose_messages(self):
+        messages_file = os.path.join(self.events_dir, 'messages.json')
+        first_loaded, release = threading.Event(), threading.Event()
+        real_load = json.load
+
+        def slow_first_load(f):
+            data = real_load(f)
+            if not first_loaded.is_set():
+                # Hold the first save between its read and its write while the second save starts.
+                first_loaded.set()
+                release.wait(5)
+            return data
+
+        with open(messages_file, 'w') as f:
+            json.dump([], f)
+        with patch.object(fetch_messages.json, 'load', slow_first_load):
+            polled = threading.Thread(target=fetch_messages.save_messages_to_json, args=([{"message_id": "M-1"}], messages_file))
+            polled.start()
+            first_loaded.wait(5)
+            pushed = threading.Thread(target=fetch_messages.save_messages_to_json, args=([{"message_id": "M-2"}], messages_file))
+            pushed.start()
+            pushed.join(0.2)
+            release.set()
+            polled.join(5)
+            pushed.join(5)
+
+        with open(messages_file) as f:
+            self.assertEqual(sorted(message['message_id'] for message in json.load(f)), ["M-1", "M-2"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import os
+import sys
+import threading
+from datetime import timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.job_scheduler import Job, JobScheduler
+from common.adaptive_cadence import AdaptiveCadence, CadenceProfile
+
+
+class TestJobScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.calls = []
+
+    def make_scheduler(self, jobs):
+        scheduler = JobScheduler(jobs, max_workers=4, clock=lambda: self.now[0])
+        self.addCleanup(scheduler.shutdown)
+        return scheduler
+
+    def recorder(self, name):
+        return lambda: self.calls.append(name)
+
+    def test_jobs_run_on_their_own_intervals(self):
+        scheduler = self.make_scheduler([
+            Job('fast', self.recorder('fast'), 60),
+            Job('slow', self.recorder('slow'), 300),
+        ])
+
+        self.assertEqual(sorted(scheduler.run_pending()), ['fast', 'slow'])
+        scheduler.wait_idle()
+        self.now[0] = 60
+        self.assertEqual(scheduler.run_pending(), ['fast'])
+        scheduler.wait_idle()
+        self.assertEqual(scheduler.seconds_until_next_run(), 60)
+
+    def test_dependent_job_waits_for_and_follows_its_dependency(self):
+        release = threading.Event()
+        scheduler = self.make_scheduler([
+            Job('shipping', release.wait, 900),
+            Job('tracking', self.recorder('tracking'), 900, after=('shipping',)),
+        ])
+
+        self.assertEqual(scheduler.run_pending(), ['shipping'])
+        self.assertEqual(scheduler.run_pending(), [])
+        release.set()
+        scheduler.wait_idle()
+
+        self.now[0] = 10
+        self.assertEqual(scheduler.run_pending(), ['tracking'])
+        scheduler.wait_idle()
+        self.assertEqual(self.calls, ['tracking'])
+
+    def test_overlapping_run_is_skipped(self):
+        release = threading.Event()
+        scheduler = self.make_scheduler([Job('slow', release.wait, 60)])
+
+        scheduler.run_pending()
+        self.now[0] = 61
+        self.assertEqual(scheduler.run_pending(), [])
+        self.assertEqual(scheduler.jobs['slow'].skipped, 1)
+        release.set()
+        scheduler.wait_idle()
+        self.assertEqual(scheduler.jobs['slow'].runs, 1)
+
+    def test_failing_job_is_recorded_and_rescheduled(self):
+        def fail():
+            raise RuntimeError("boom")
+        scheduler = self.make_scheduler([Job('broken', fail, 60)])
+
+        scheduler.run_pending()
+        scheduler.wait_idle()
+        job = scheduler.jobs['broken']
+        self.assertEqual((job.runs, job.failures), (1, 1))
+        self.now[0] = 60
+        self.assertEqual(scheduler.run_pending(), ['broken'])
+
+    def test_cadence_sets_the_next_interval_from_the_job_result(self):
+        cadence = AdaptiveCadence(CadenceProfile('always', 60, 600), decay=2, recent_window=timedelta(0))
+        new_orders = [0]
+        scheduler = self.make_scheduler([Job('acceptance', lambda: new_orders[0], cadence=cadence)])
+
+        scheduler.run_pending()
+        scheduler.wait_idle()
+        self.assertEqual(scheduler.jobs['acceptance'].interval, 120)
+        self.assertEqual(scheduler.seconds_until_next_run(), 120)
+
+        self.now[0] = 120
+        new_orders[0] = 2
+        scheduler.run_pending()
+        scheduler.wait_idle()
+        self.assertEqual(scheduler.jobs['acceptance'].interval, 60)
+
+    def test_trigger_runs_a_job_before_its_interval(self):
+        release = threading.Event()
+        scheduler = self.make_scheduler([Job('acceptance', release.wait, 600)])
+
+        scheduler.run_pending()
+        scheduler.trigger('acceptance')
+        self.assertEqual(scheduler.run_pending(), [])
+        release.set()
+        scheduler.wait_idle()
+
+        self.now[0] = 5
+        self.assertEqual(scheduler.seconds_until_next_run(), 0)
+        self.assertEqual(scheduler.run_pending(), ['acceptance'])
+        scheduler.wait_idle()
+        self.assertEqual(scheduler.run_pending(), [])
+
+    def test_invalid_dependencies_raise(self):
+        with self.assertRaises(ValueError):
+            JobScheduler([Job('a', self.recorder('a'), 60, after=('missing',))])
+        with self.assertRaises(ValueError):
+            JobScheduler([Job('a', self.recorder('a'), 60, after=('b',)), Job('b', self.recorder('b'), 60, after=('a',))])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch, MagicMock
+
+from common.order_store import OrderStore
+from common import order_snapshot
+from common.order_snapshot import OrderSnapshot
+
+class TestOrderSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store_path = os.path.join(self.temp_dir.name, 'order_lifecycle.db')
+
+        store_patcher = patch('common.order_snapshot.open_order_store', side_effect=lambda: OrderStore(self.store_path))
+        store_patcher.start()
+        self.addCleanup(store_patcher.stop)
+
+        self.client = MagicMock()
+        self.client.iter_order_pages.side_effect = self._pages
+        client_patcher = patch('common.order_snapshot.get_best_buy_client', return_value=self.client)
+        client_patcher.start()
+        self.addCleanup(client_patcher.stop)
+
+        self.listing = [
+            {"order_id": "A-1", "order_state": "WAITING_ACCEPTANCE", "last_updated_date": "2025-09-01T10:00:00Z"},
+            {"order_id": "S-1", "order_state": "SHIPPING", "last_updated_date": "2025-09-01T10:00:00Z"},
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _pages(self, params):
+        codes = params['order_state_codes'].split(',')
+        yield [order for order in self.listing if order['order_state'] in codes]
+
+    def test_one_pass_serves_every_state(self):
+        snapshot = OrderSnapshot("fake_api_key")
+        self.assertEqual([o['order_id'] for o in snapshot.orders('WAITING_ACCEPTANCE')], ["A-1"])
+        self.assertEqual([o['order_id'] for o in snapshot.orders('SHIPPING')], ["S-1"])
+        self.assertEqual(self.client.iter_order_pages.call_count, 1)
+        self.assertEqual(self.client.iter_order_pages.call_args.args[0]['order_state_codes'], 'WAITING_ACCEPTANCE,SHIPPING')
+
+    def test_invalidate_refetches_only_that_state(self):
+        snapshot = OrderSnapshot("fake_api_key")
+        snapshot.orders('WAITING_ACCEPTANCE')
+        snapshot.invalidate('WAITING_ACCEPTANCE')
+        self.listing[0] = dict(self.listing[0], order_state='WAITING_DEBIT_PAYMENT')
+
+        self.assertEqual(snapshot.orders('WAITING_ACCEPTANCE'), [])
+        self.assertEqual(self.client.iter_order_pages.call_args.args[0]['order_state_codes'], 'WAITING_ACCEPTANCE')
+        snapshot.orders('SHIPPING')
+        self.assertEqual(self.client.iter_order_pages.call_count, 2)
+
+    def test_complete_read_after_incremental_load_refetches(self):
+        first = OrderSnapshot("fake_api_key")
+        first.orders('SHIPPING')
+
+        # A second cycle now has a watermark, so its first pass is incremental.
+        snapshot = OrderSnapshot("fake_api_key")
+        snapshot.orders('WAITING_ACCEPTANCE')
+        self.assertIn('start_update_date', self.client.iter_order_pages.call_args.args[0])
+
+        snapshot.orders('WAITING_ACCEPTANCE', complete=True)
+        self.assertNotIn('start_update_date', self.client.iter_order_pages.call_args.args[0])
+        snapshot.orders('WAITING_ACCEPTANCE', complete=True)
+        self.assertEqual(self.client.iter_order_pages.call_count, 3)
+
+    def test_cycle_snapshot_lifecycle(self):
+        self.assertIsNone(order_snapshot.get_cycle_snapshot())
+        with order_snapshot.shared_cycle_snapshot("fake_api_key") as snapshot:
+            self.assertIs(order_snapshot.get_cycle_snapshot(), snapshot)
+        self.assertIsNone(order_snapshot.get_cycle_snapshot())
+
+    def test_shared_cycle_snapshot_is_reused_while_in_use(self):
+        with order_snapshot.shared_cycle_snapshot("fake_api_key") as first:
+            with order_snapshot.shared_cycle_snapshot("fake_api_key") as second:
+                self.assertIs(first, second)
+            with order_snapshot.shared_cycle_snapshot("fake_api_key", max_age=-1) as stale:
+                self.assertIsNot(stale, first)
+            self.assertIs(order_snapshot.get_cycle_snapshot(), stale)
+        self.assertIsNone(order_snapshot.get_cycle_snapshot())
+
+if __name__ == '__main__':
+    unittest.main()
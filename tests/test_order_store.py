@@ -0,0 +1,149 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from common import order_store
+from common.order_store import OrderStore, import_json_logs, open_order_store
+
+class TestOrderStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = OrderStore(os.path.join(self.temp_dir.name, 'order_lifecycle.db'))
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_upsert_and_select_by_state(self):
+        self.store.upsert_orders([
+            {"order_id": "A-1", "order_state": "WAITING_ACCEPTANCE"},
+            {"order_id": "A-2", "order_state": "SHIPPING"},
+        ])
+
+        pending = self.store.select_orders('WAITING_ACCEPTANCE', accepted=False)
+        self.assertEqual([row['order_id'] for row in pending], ["A-1"])
+        self.assertEqual(pending[0]['order']['order_state'], "WAITING_ACCEPTANCE")
+
+    def test_lifecycle_flags(self):
+        self.store.upsert_orders([{"order_id": "A-1", "order_state": "SHIPPING"}])
+        self.store.mark_label_created("A-1", "TRACK-1")
+
+        self.assertEqual(self.store.select_orders('SHIPPING', label_created=False), [])
+        to_push = self.store.select_orders(label_created=True, tracking_pushed=False)
+        self.assertEqual(to_push[0]['tracking_pin'], "TRACK-1")
+
+        self.store.mark_tracking_pushed(["A-1"])
+        self.assertEqual(self.store.select_orders(label_created=True, tracking_pushed=False), [])
+
+    def test_upsert_keeps_lifecycle_flags(self):
+        self.store.mark_accepted(["A-1"])
+        self.store.upsert_orders([{"order_id": "A-1", "order_state": "SHIPPING"}])
+
+        row = self.store.get_order("A-1")
+        self.assertEqual(row['accepted'], 1)
+        self.assertEqual(row['order_state'], "SHIPPING")
+
+    def test_record_and_select_shipments(self):
+        self.store.record_shipment_details("BLOB-1", {"order_id": "A-1", "tracking_pin": "TRACK-1", "destination_city": "Toronto"})
+        self.store.record_shipment_details("BLOB-1", {"order_id": "A-1", "tracking_pin": "TRACK-1", "destination_city": "Toronto"})
+
+        rows = self.store.select_shipments(order_id="A-1")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['details_blob_id'], "BLOB-1")
+        self.assertEqual(rows[0]['destination_city'], "Toronto")
+        self.assertEqual(self.store.select_shipments(tracking_pin="TRACK-2"), [])
+
+    def test_tracking_outbox(self):
+        self.store.mark_label_created("A-1", "TRACK-1")
+        self.store.mark_label_created("A-1", "TRACK-1")
+
+        due = self.store.select_due_tracking_pushes()
+        self.assertEqual([(entry['order_id'], entry['tracking_pin']) for entry in due], [("A-1", "TRACK-1")])
+
+        self.store.mark_tracking_updated("A-1")
+        self.store.record_tracking_push_failure("A-1", "ship call failed", "2999-01-01T00:00:00")
+        self.assertEqual(self.store.select_due_tracking_pushes(), [])
+        retry = self.store.select_due_tracking_pushes(now="2999-01-01T00:00:00")[0]
+        self.assertEqual((retry['attempts'], retry['tracking_updated']), (1, 1))
+        self.assertEqual(self.store.select_due_tracking_pushes(now="2999-01-01T00:00:00", max_attempts=1), [])
+
+        self.store.mark_tracking_pushed(["A-1"])
+        self.assertEqual(self.store.select_due_tracking_pushes(now="2999-01-01T00:00:00"), [])
+
+    def test_validation_window_and_checks(self):
+        self.store.mark_tracking_pushed(["OLD-1"], "2026-01-01T00:00:00")
+        self.store.mark_tracking_pushed(["NEW-1"], "2026-10-01T00:00:00")
+
+        candidates = self.store.select_orders_to_validate("2026-09-24T00:00:00")
+        self.assertEqual([row['order_id'] for row in candidates], ["NEW-1"])
+        self.assertEqual(candidates[0]['checks'], 0)
+        self.assertEqual(self.store.count_unvalidated_before("2026-09-24T00:00:00"), 1)
+
+        self.store.record_validation_checks({"NEW-1": "SHIPPING"}, "2026-10-01T01:00:00")
+        self.store.record_validation_checks({"NEW-1": None}, "2026-10-01T02:00:00")
+        row = self.store.select_orders_to_validate("2026-09-24T00:00:00")[0]
+        self.assertEqual((row['checks'], row['last_state'], row['last_checked_at']), (2, "SHIPPING", "2026-10-01T02:00:00"))
+
+        self.store.mark_shipped_validated(["NEW-1"])
+        self.assertEqual(self.store.select_orders_to_validate("2026-09-24T00:00:00"), [])
+
+    def test_unknown_stage_raises(self):
+        with self.assertRaises(ValueError):
+            self.store.select_orders(delivered=True)
+
+    def test_import_json_logs(self):
+        logs_root = os.path.join(self.temp_dir.name, 'logs')
+        os.makedirs(os.path.join(logs_root, 'best_buy'))
+        os.makedirs(os.path.join(logs_root, 'canada_post'))
+        with open(os.path.join(logs_root, 'best_buy', 'orders_pending_shipping.json'), 'w') as f:
+            json.dump([{"order_id": "S-1", "order_state": "SHIPPING"}], f)
+        with open(os.path.join(logs_root, 'canada_post', 'cp_shipping_labels_data.json'), 'w') as f:
+            json.dump([{"order_id": "S-1", "tracking_pin": "TRACK-1", "timestamp": "t0"},
+                       {"order_id": "D-1", "tracking_pin": "TRACK-2", "timestamp": "2026-01-02T10:00:00"}], f)
+        with open(os.path.join(logs_root, 'best_buy', 'orders_shipped_and_validated.json'), 'w') as f:
+            json.dump([{"order_id": "D-1", "order_state": "SHIPPED", "last_updated_date": "2026-01-05T09:00:00"}], f)
+
+        import_json_logs(self.store, logs_root)
+
+        row = self.store.get_order("S-1")
+        self.assertEqual(row['label_created'], 1)
+        self.assertEqual(row['tracking_pin'], "TRACK-1")
+        shipped = self.store.get_order("D-1")
+        self.assertEqual(shipped['tracking_pushed_at'], "2026-01-05T09:00:00")
+        self.assertEqual(shipped['shipped_validated'], 1)
+        self.assertIsNotNone(self.store.get_meta('json_import_completed_at'))
+
+        # Imported history is neither pushed nor validated again.
+        self.assertEqual(self.store.select_due_tracking_pushes(), [])
+        self.assertEqual(self.store.select_orders_to_validate("2000-01-01T00:00:00"), [])
+
+    def test_concurrent_first_opens_import_once(self):
+        path = os.path.join(self.temp_dir.name, 'fresh.db')
+        logs_root = os.path.join(self.temp_dir.name, 'logs')
+        real_import = order_store.import_json_logs
+        imports = []
+
+        def slow_import(store, root):
+            imports.append(root)
+            time.sleep(0.1)
+            real_import(store, root)
+
+        def open_and_close():
+            open_order_store(path, logs_root).close()
+
+        with patch.object(order_store, 'import_json_logs', slow_import):
+            threads = [threading.Thread(target=open_and_close) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(len(imports), 1)
+
+if __name__ == '__main__':
+    unittest.main()
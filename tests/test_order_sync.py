@@ -0,0 +1,61 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from common.order_store import OrderStore
+from common.order_sync import IncrementalOrderSync, WATERMARK_OVERLAP
+
+class TestIncrementalOrderSync(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = OrderStore(os.path.join(self.temp_dir.name, 'order_lifecycle.db'))
+        self.now = datetime(2025, 9, 1, 12, 0, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_first_sync_is_full(self):
+        sync = IncrementalOrderSync(self.store, 'SHIPPING', now=self.now)
+        self.assertTrue(sync.is_full_sync)
+        self.assertEqual(sync.params(), {'order_state_codes': 'SHIPPING'})
+
+    def test_committed_watermark_drives_next_sync(self):
+        sync = IncrementalOrderSync(self.store, 'SHIPPING', now=self.now)
+        sync.observe([
+            {"order_id": "1", "last_updated_date": "2025-09-01T10:00:00Z"},
+            {"order_id": "2", "last_updated_date": "2025-09-01T11:30:00Z"},
+        ])
+        sync.commit()
+
+        next_sync = IncrementalOrderSync(self.store, 'SHIPPING', now=self.now + timedelta(minutes=15))
+        self.assertFalse(next_sync.is_full_sync)
+        expected_since = datetime(2025, 9, 1, 11, 30, tzinfo=timezone.utc) - WATERMARK_OVERLAP
+        self.assertEqual(next_sync.params()['start_update_date'], expected_since.strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+    def test_uncommitted_sync_keeps_old_watermark(self):
+        sync = IncrementalOrderSync(self.store, 'SHIPPING', now=self.now)
+        sync.observe([{"order_id": "1", "last_updated_date": "2025-09-01T10:00:00Z"}])
+
+        next_sync = IncrementalOrderSync(self.store, 'SHIPPING', now=self.now)
+        self.assertTrue(next_sync.is_full_sync)
+
+    def test_periodic_full_resync(self):
+        sync = IncrementalOrderSync(self.store, 'SHIPPING', now=self.now, full_resync_interval=timedelta(hours=6))
+        sync.observe([{"order_id": "1", "last_updated_date": "2025-09-01T10:00:00Z"}])
+        sync.commit()
+
+        later = IncrementalOrderSync(self.store, 'SHIPPING', now=self.now + timedelta(hours=7),
+                                     full_resync_interval=timedelta(hours=6))
+        self.assertTrue(later.is_full_sync)
+
+    def test_watermarks_are_kept_per_state(self):
+        sync = IncrementalOrderSync(self.store, 'SHIPPING', now=self.now)
+        sync.observe([{"order_id": "1", "last_updated_date": "2025-09-01T10:00:00Z"}])
+        sync.commit()
+        self.assertTrue(IncrementalOrderSync(self.store, 'WAITING_ACCEPTANCE', now=self.now).is_full_sync)
+
+if __name__ == '__main__':
+    unittest.main()
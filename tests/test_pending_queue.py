@@ -0,0 +1,89 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.order_store import OrderStore
+from common.pending_queue import PendingOrderQueue, refresh_pending_queue
+
+
+class TestPendingOrderQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'orders_pending_shipping.json')
+        self.queue = PendingOrderQueue(self.path, 'SHIPPING')
+        self.store = OrderStore(os.path.join(self.temp_dir.name, 'order_lifecycle.db'))
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def queued_ids(self):
+        with open(self.path, 'r') as f:
+            return [order['order_id'] for order in json.load(f)]
+
+    def test_incremental_listing_adds_without_evicting(self):
+        self.queue.sync([{"order_id": "S-1", "order_state": "SHIPPING"}], complete=True)
+        added, evicted = self.queue.sync([{"order_id": "S-2", "order_state": "SHIPPING"}], complete=False)
+
+        self.assertEqual((added, evicted), (["S-2"], []))
+        self.assertEqual(self.queued_ids(), ["S-1", "S-2"])
+
+    def test_complete_listing_evicts_missing_orders(self):
+        self.queue.sync([{"order_id": "S-1", "order_state": "SHIPPING"}, {"order_id": "S-2", "order_state": "SHIPPING"}])
+        added, evicted = self.queue.sync([{"order_id": "S-2", "order_state": "SHIPPING"}], complete=True)
+
+        self.assertEqual((added, evicted), ([], ["S-1"]))
+        self.assertEqual(self.queued_ids(), ["S-2"])
+
+    def test_orders_the_store_reports_in_another_state_are_evicted(self):
+        self.queue.sync([{"order_id": "S-1", "order_state": "SHIPPING"}, {"order_id": "S-2", "order_state": "SHIPPING"}])
+        self.store.upsert_orders([{"order_id": "S-1", "order_state": "SHIPPED"}, {"order_id": "S-2", "order_state": "SHIPPING"}])
+
+        self.assertEqual(self.queue.compact(self.store), ["S-1"])
+        self.assertEqual(self.queued_ids(), ["S-2"])
+
+    def test_complete_listing_evicts_missing_orders_from_the_store(self):
+        self.store.upsert_orders([{"order_id": "S-1", "order_state": "SHIPPING"}, {"order_id": "S-2", "order_state": "SHIPPING"}])
+        self.queue.sync([{"order_id": "S-2", "order_state": "SHIPPING"}], complete=False, store=self.store)
+        self.assertEqual(len(self.store.select_orders('SHIPPING', label_created=False)), 2)
+
+        added, evicted = self.queue.sync([{"order_id": "S-2", "order_state": "SHIPPING"}], complete=True, store=self.store)
+        self.assertEqual(evicted, ["S-1"])
+        self.assertEqual([row['order_id'] for row in self.store.select_orders('SHIPPING', label_created=False)], ["S-2"])
+
+        # An order that shows up again gets its real state back.
+        self.store.upsert_orders([{"order_id": "S-1", "order_state": "SHIPPING"}])
+        self.assertEqual(len(self.store.select_orders('SHIPPING')), 2)
+
+    def test_unchanged_queue_is_not_rewritten(self):
+        self.queue.sync([{"order_id": "S-1", "order_state": "SHIPPING"}])
+        mtime = os.path.getmtime(self.path)
+        os.utime(self.path, (mtime - 100, mtime - 100))
+
+        self.queue.sync([{"order_id": "S-1", "order_state": "SHIPPING"}])
+        self.assertEqual(os.path.getmtime(self.path), mtime - 100)
+
+    def test_refresh_from_cycle_snapshot(self):
+        self.queue.sync([{"order_id": "S-1", "order_state": "SHIPPING"}], store=self.store)
+        snapshot = MagicMock()
+        snapshot.orders.return_value = [{"order_id": "S-2", "order_state": "SHIPPING"}]
+        snapshot.is_complete.return_value = True
+
+        with patch('common.pending_queue.get_cycle_snapshot', return_value=snapshot), \
+             patch('common.pending_queue.open_order_store', return_value=self.store), \
+             patch.object(self.store, 'close'):
+            added = refresh_pending_queue("fake_api_key", 'SHIPPING', self.path)
+
+        snapshot.orders.assert_called_once_with('SHIPPING')
+        self.assertEqual(added, ["S-2"])
+        self.assertEqual(self.queued_ids(), ["S-2"])
+        self.assertEqual(self.store.get_order("S-2")['order_state'], 'SHIPPING')
+
+if __name__ == '__main__':
+    unittest.main()
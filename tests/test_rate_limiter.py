@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch, Mock
+
+from common.rate_limiter import TokenBucket, compute_backoff, parse_retry_after
+from common.best_buy_client import BestBuyClient
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_waits_when_burst_is_exhausted(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+        for _ in range(4):
+            bucket.acquire()
+        self.assertAlmostEqual(clock.now, 1.0)
+
+    def test_penalize_and_reward(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=4, capacity=4, clock=clock, sleep=clock.sleep)
+        bucket.penalize()
+        self.assertEqual(bucket.rate, 2)
+        for _ in range(10):
+            bucket.reward()
+        self.assertEqual(bucket.rate, 4)
+
+class TestBackoff(unittest.TestCase):
+
+    def test_parse_retry_after_seconds(self):
+        self.assertEqual(parse_retry_after("7"), 7.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("not a date"))
+
+    def test_compute_backoff_honours_retry_after_and_cap(self):
+        self.assertEqual(compute_backoff(0, 1, 30, retry_after=12), 12)
+        self.assertEqual(compute_backoff(10, 1, 30, retry_after=100), 100)
+        self.assertLessEqual(compute_backoff(10, 1, 30), 30)
+        self.assertLessEqual(compute_backoff(3, 1, 30), 8)
+
+class TestClientRetries(unittest.TestCase):
+
+    @patch('requests.Session.get')
+    def test_retries_throttled_call_then_succeeds(self, mock_get):
+        throttled = Mock(status_code=429, headers={'Retry-After': '2'})
+        ok = Mock(status_code=200, headers={})
+        mock_get.side_effect = [throttled, ok]
+        sleeps = []
+
+        client = BestBuyClient("fake_api_key", sleep=sleeps.append)
+        response = client.get('/orders')
+
+        self.assertIs(response, ok)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertIn(2.0, sleeps)
+        self.assertLess(client.limiter_for(client.url('/orders')).rate, 5)
+
+    @patch('requests.Session.get')
+    def test_gives_up_after_max_retries(self, mock_get):
+        mock_get.return_value = Mock(status_code=503, headers={})
+        client = BestBuyClient("fake_api_key", max_retries=2, sleep=lambda seconds: None)
+        response = client.get('/inbox/threads')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(mock_get.call_count, 3)
+
+    def test_limiter_family(self):
+        client = BestBuyClient("fake_api_key")
+        self.assertIs(client.limiter_for(client.url('/orders/1/accept')), client._limiters['orders'])
+        self.assertIs(client.limiter_for(client.url('/sellerpayment/transactions_logs')), client._limiters['sellerpayment'])
+
+if __name__ == '__main__':
+    unittest.main()
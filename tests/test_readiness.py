@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import readiness
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestWaitUntil(unittest.TestCase):
+
+    def test_returns_immediately_when_condition_already_holds(self):
+        clock = FakeClock()
+        self.assertTrue(readiness.wait_until(lambda: True, sleep=clock.sleep, clock=clock))
+        self.assertEqual(clock.sleeps, [])
+
+    def test_backs_off_exponentially_until_condition_holds(self):
+        clock = FakeClock()
+        results = iter([False, False, False, True])
+        self.assertTrue(readiness.wait_until(lambda: next(results), initial_delay=1, max_delay=8,
+                                             sleep=clock.sleep, clock=clock))
+        self.assertEqual(clock.sleeps, [1, 2, 4])
+
+    def test_gives_up_at_the_deadline(self):
+        clock = FakeClock()
+        self.assertFalse(readiness.wait_until(lambda: False, timeout=10, initial_delay=1, max_delay=8,
+                                              sleep=clock.sleep, clock=clock))
+        self.assertEqual(clock.sleeps, [1, 2, 4, 3])
+
+
+class TestWaitForOrders(unittest.TestCase):
+
+    @patch('common.readiness.get_best_buy_client')
+    def test_polls_only_orders_that_are_not_ready(self, mock_get_client):
+        client = MagicMock()
+        client.get_orders_by_ids.side_effect = [
+            {'A': {'order_id': 'A', 'order_state': 'SHIPPING'}, 'B': {'order_id': 'B', 'order_state': 'WAITING_ACCEPTANCE'}},
+            {'B': {'order_id': 'B', 'order_state': 'SHIPPING'}},
+        ]
+        mock_get_client.return_value = client
+        clock = FakeClock()
+
+        remaining = readiness.wait_for_orders('key', ['A', 'B'], lambda o: o['order_state'] != 'WAITING_ACCEPTANCE',
+                                              sleep=clock.sleep, clock=clock)
+
+        self.assertEqual(remaining, set())
+        self.assertEqual(client.get_orders_by_ids.call_args_list[1].args[0], ['B'])
+
+    @patch('common.readiness.get_best_buy_client')
+    def test_no_orders_means_no_polling(self, mock_get_client):
+        self.assertEqual(readiness.wait_for_orders('key', [], lambda o: True), set())
+        mock_get_client.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
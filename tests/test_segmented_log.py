@@ -0,0 +1,107 @@
+import unittest
+import os
+import sys
+import json
+import time
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.segmented_log import SegmentedLog, segmented_log_dir
+
+
+class TestSegmentedLog(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp_dir.name, 'log.segments')
+        self.now = [datetime(2026, 9, 30, 23, 0)]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def open_log(self, **kwargs):
+        return SegmentedLog(self.directory, clock=lambda: self.now[0], **kwargs)
+
+    def test_new_period_seals_previous_segment(self):
+        log = self.open_log()
+        log.append({"order_id": "A-1", "timestamp": "2026-09-30T23:00:00"})
+        self.now[0] = datetime(2026, 10, 1, 8, 0)
+        log.append([{"order_id": "A-2", "timestamp": "2026-10-01T08:00:00"}])
+
+        self.assertTrue(os.path.exists(os.path.join(self.directory, '2026-09.jsonl.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, '2026-09.jsonl')))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, '2026-10.jsonl')))
+        self.assertEqual([entry['order_id'] for entry in log.read()], ["A-1", "A-2"])
+        self.assertEqual(len(self.open_log()), 2)
+
+    def test_append_after_torn_line_starts_a_new_line(self):
+        log = self.open_log()
+        log.append({"order_id": "A-1", "timestamp": "2026-09-30T22:00:00"})
+        with open(os.path.join(self.directory, '2026-09.jsonl'), 'a') as f:
+            f.write('{"order_id": "A-2", "times')
+
+        log.append({"order_id": "A-3", "timestamp": "2026-09-30T23:00:00"})
+        self.assertEqual([entry['order_id'] for entry in self.open_log().read()], ["A-1", "A-3"])
+
+    def test_read_skips_segments_outside_range(self):
+        log = self.open_log()
+        log.append({"order_id": "A-1", "timestamp": "2026-09-30T23:00:00"})
+        self.now[0] = datetime(2026, 10, 1, 8, 0)
+        log.append({"order_id": "A-2", "timestamp": "2026-10-01T08:00:00"})
+
+        self.assertEqual(log.segments(start="2026-10-01T00:00:00"), ["2026-10"])
+        self.assertEqual([entry['order_id'] for entry in log.read(start=datetime(2026, 10, 1))], ["A-2"])
+
+    def test_utc_timestamps_are_compared_in_local_time(self):
+        tz_patch = patch.dict(os.environ, {'TZ': 'America/Toronto'})
+        tz_patch.start()
+        self.addCleanup(time.tzset)
+        self.addCleanup(tz_patch.stop)
+        time.tzset()
+
+        log = self.open_log(timestamp_key='last_updated_date')
+        # 02:30 UTC on October 1st is still September 30th in Toronto.
+        log.append({"order_id": "A-1", "last_updated_date": "2026-10-01T02:30:00Z"})
+        self.now[0] = datetime(2026, 10, 1, 8, 0)
+        log.append({"order_id": "A-2", "last_updated_date": "2026-10-01T12:00:00Z"})
+
+        self.assertEqual(log.manifest['segments']['2026-09']['last'], "2026-09-30T23:00:00")
+        self.assertEqual(log.segments(start=datetime(2026, 10, 1)), ["2026-10"])
+        self.assertEqual([entry['order_id'] for entry in log.read(end="2026-09-30T23:59:59")], ["A-1"])
+        self.assertEqual([entry['order_id'] for entry in log.read(start="2026-10-01T04:00:00Z")], ["A-2"])
+
+    def test_legacy_json_log_is_imported_once(self):
+        legacy_path = os.path.join(self.temp_dir.name, 'log.json')
+        with open(legacy_path, 'w') as f:
+            json.dump([
+                {"order_id": "OLD-1", "timestamp": "2026-08-15T10:00:00"},
+                {"order_id": "OLD-2", "timestamp": "2026-09-02T10:00:00"},
+                {"order_id": "OLD-3"},
+            ], f)
+
+        log = self.open_log(legacy_path=legacy_path)
+        self.assertEqual(sorted(log.manifest['segments']), ["2026-08", "2026-09", "legacy"])
+        self.assertTrue(log.manifest['segments']['2026-08']['sealed'])
+        self.assertFalse(log.manifest['segments']['2026-09']['sealed'])
+
+        log.append({"order_id": "NEW-1", "timestamp": "2026-09-30T23:00:00"})
+        reopened = self.open_log(legacy_path=legacy_path)
+        self.assertEqual(len(reopened), 4)
+        self.assertEqual(sorted(entry['order_id'] for entry in reopened.read()), ["NEW-1", "OLD-1", "OLD-2", "OLD-3"])
+
+    def test_corrupted_manifest_is_rebuilt(self):
+        log = self.open_log()
+        log.append({"order_id": "A-1", "timestamp": "2026-09-30T23:00:00"})
+        with open(os.path.join(self.directory, 'manifest.json'), 'w') as f:
+            f.write("{not json")
+
+        self.assertEqual([entry['order_id'] for entry in self.open_log().read()], ["A-1"])
+
+    def test_segmented_log_dir(self):
+        self.assertEqual(segmented_log_dir(os.path.join('logs', 'history.json')), os.path.join('logs', 'history.segments'))
+
+if __name__ == '__main__':
+    unittest.main()
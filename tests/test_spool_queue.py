@@ -0,0 +1,69 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.spool_queue import SpoolQueue
+
+
+class TestSpoolQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.now = [1000.0]
+        self.spool = SpoolQueue(self.root, lease_seconds=60, clock=lambda: self.now[0])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_claimed_items_move_through_the_queue(self):
+        self.spool.enqueue("ORDER-1.xml", "<shipment/>")
+        items = self.spool.claim()
+
+        self.assertEqual([item.key for item in items], ["ORDER-1"])
+        self.assertEqual(items[0].read(), "<shipment/>")
+        self.assertEqual(self.spool.state_of("ORDER-1.xml"), 'claimed')
+        self.assertEqual(self.spool.claim(), [])
+
+        self.spool.complete(items[0])
+        self.assertEqual(self.spool.state_of("ORDER-1.xml"), 'done')
+
+    def test_done_work_is_not_resubmitted_but_failed_work_is(self):
+        self.spool.enqueue("ORDER-1.xml", "<a/>")
+        self.spool.enqueue("ORDER-2.xml", "<b/>")
+        first, second = self.spool.claim()
+        self.spool.complete(first)
+        self.spool.fail(second)
+
+        self.assertFalse(self.spool.enqueue("ORDER-1.xml", "<a/>"))
+        self.assertTrue(self.spool.enqueue("ORDER-2.xml", "<b/>"))
+        self.assertEqual(self.spool.state_of("ORDER-2.xml"), 'pending')
+
+    def test_expired_leases_return_to_pending(self):
+        self.spool.enqueue("ORDER-1.xml", "<shipment/>")
+        self.spool.claim()
+
+        self.now[0] += 30
+        self.assertEqual(self.spool.claim(), [])
+
+        self.now[0] += 31
+        self.assertEqual([item.name for item in self.spool.claim()], ["ORDER-1.xml"])
+
+    def test_claim_limit_leaves_the_rest_pending(self):
+        for order_id in range(3):
+            self.spool.enqueue(f"ORDER-{order_id}.xml", "<shipment/>")
+        self.assertEqual(len(self.spool.claim(limit=2)), 2)
+        self.assertEqual(self.spool.pending(), ["ORDER-2.xml"])
+
+    def test_loose_files_from_the_old_layout_are_adopted(self):
+        with open(os.path.join(self.root, "ORDER-9.xml"), 'w') as f:
+            f.write("<shipment/>")
+        spool = SpoolQueue(self.root)
+        self.assertEqual(spool.pending(), ["ORDER-9.xml"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import sys
+import tempfile
+import requests
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.order_store import OrderStore
+from Orders.shipped_orders.update_tracking_info import update_tracking_numbers
+
+
+class TestTrackingOutboxDrain(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = OrderStore(os.path.join(self.temp_dir.name, 'order_lifecycle.db'))
+        self.store.mark_label_created("ORDER-1", "PIN-1")
+        self.store.mark_label_created("ORDER-2", "PIN-2")
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def run_main(self, client):
+        with patch.object(update_tracking_numbers, 'get_best_buy_api_key', return_value="fake_api_key"), \
+             patch.object(update_tracking_numbers, 'get_best_buy_client', return_value=client), \
+             patch.object(update_tracking_numbers, 'open_order_store', return_value=self.store), \
+             patch.object(update_tracking_numbers, 'log_bb_history') as mock_log_history, \
+             patch.object(self.store, 'close'):
+            return update_tracking_numbers.main(), mock_log_history
+
+    def test_due_pushes_are_closed_or_retried_with_backoff(self):
+        def fake_put(url, json=None):
+            response = MagicMock()
+            if url == "/orders/ORDER-2/ship":
+                response.raise_for_status.side_effect = requests.exceptions.HTTPError("503")
+            return response
+        client = MagicMock()
+        client.put.side_effect = fake_put
+        client.get_orders_by_ids.return_value = {"ORDER-1": {"order_id": "ORDER-1", "order_state": "SHIPPED"}}
+
+        started_at = datetime.now()
+        shipped, mock_log_history = self.run_main(client)
+
+        self.assertEqual(shipped, ["ORDER-1"])
+        client.get_orders_by_ids.assert_called_once_with(["ORDER-1"])
+        mock_log_history.assert_called_once_with([{"order_id": "ORDER-1", "order_state": "SHIPPED"}])
+        self.assertEqual(self.store.get_order("ORDER-1")['tracking_pushed'], 1)
+        self.assertEqual(self.store.get_order("ORDER-1")['order_state'], "SHIPPED")
+        self.assertEqual(self.store.get_order("ORDER-2")['tracking_pushed'], 0)
+
+        # ORDER-1 is closed; ORDER-2 keeps its successful tracking update and waits for its first backoff.
+        self.assertEqual(self.store.select_due_tracking_pushes(), [])
+        retry = self.store.select_due_tracking_pushes(now="2999-01-01T00:00:00")
+        self.assertEqual([entry['order_id'] for entry in retry], ["ORDER-2"])
+        self.assertEqual((retry[0]['attempts'], retry[0]['tracking_updated']), (1, 1))
+        self.assertEqual(retry[0]['last_error'], "ship call failed")
+        retry_at = datetime.fromisoformat(retry[0]['next_attempt_at'])
+        delay = timedelta(seconds=update_tracking_numbers.TRACKING_PUSH_RETRY_BASE_SECONDS)
+        self.assertGreaterEqual(retry_at, started_at + delay)
+        self.assertLessEqual(retry_at, datetime.now() + delay)
+
+        # Nothing is due until the backoff has passed, so the next run makes no calls.
+        client.reset_mock()
+        shipped, _ = self.run_main(client)
+        self.assertEqual(shipped, [])
+        client.put.assert_not_called()
+
+    def test_retry_delay_doubles_up_to_the_maximum(self):
+        now = datetime(2026, 10, 17, 12, 0)
+        delays = [datetime.fromisoformat(update_tracking_numbers.tracking_push_retry_at(attempts, now)) - now
+                  for attempts in (1, 2, 3, 20)]
+        base = update_tracking_numbers.TRACKING_PUSH_RETRY_BASE_SECONDS
+        self.assertEqual([delay.total_seconds() for delay in delays],
+                         [base, base * 2, base * 4, update_tracking_numbers.TRACKING_PUSH_RETRY_MAX_SECONDS])
+
+if __name__ == '__main__':
+    unittest.main()
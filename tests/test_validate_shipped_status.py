@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.order_store import OrderStore
+from Orders.shipped_orders.update_tracking_info import validate_shipped_status
+
+
+class TestValidateShippedStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = OrderStore(os.path.join(self.temp_dir.name, 'order_lifecycle.db'))
+        self.now = datetime(2026, 10, 17, 12, 0)
+        self.store.mark_tracking_pushed(["SHIPPED-1"], "2026-10-16T09:00:00")
+        self.store.mark_tracking_pushed(["PENDING-1"], "2026-10-15T09:00:00")
+        self.store.mark_tracking_pushed(["EXPIRED-1", "EXPIRED-2"], "2026-10-01T09:00:00")
+        self.store.mark_tracking_pushed(["DONE-1"], "2026-10-16T10:00:00")
+        self.store.mark_shipped_validated(["DONE-1"], "2026-10-16T11:00:00")
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def run_main(self, client):
+        with patch.object(validate_shipped_status, 'get_best_buy_api_key', return_value="fake_api_key"), \
+             patch.object(validate_shipped_status, 'get_best_buy_client', return_value=client), \
+             patch.object(validate_shipped_status, 'open_order_store', return_value=self.store), \
+             patch.object(self.store, 'close'):
+            return validate_shipped_status.main(now=self.now)
+
+    def test_main_checks_the_window_and_stores_its_summary(self):
+        client = MagicMock()
+        client.get_orders_by_ids.return_value = {
+            "SHIPPED-1": {"order_id": "SHIPPED-1", "order_state": "SHIPPED"},
+            "PENDING-1": {"order_id": "PENDING-1", "order_state": "WAITING_DEBIT_PAYMENT"},
+        }
+
+        summary = self.run_main(client)
+
+        # Only unvalidated orders pushed within VALIDATION_MAX_AGE are looked up.
+        self.assertEqual(sorted(client.get_orders_by_ids.call_args.args[0]), ["PENDING-1", "SHIPPED-1"])
+        self.assertEqual(json.loads(self.store.get_meta('last_shipped_validation_summary')), summary)
+        self.assertEqual(summary, {
+            "checked_at": "2026-10-17T12:00:00",
+            "checked": 2,
+            "validated": 1,
+            "unconfirmed": 1,
+            "expired": 2,
+            "unconfirmed_orders": {"PENDING-1": "WAITING_DEBIT_PAYMENT"},
+        })
+        self.assertEqual(self.store.get_order("SHIPPED-1")['shipped_validated'], 1)
+        self.assertEqual(self.store.get_order("PENDING-1")['order_state'], "WAITING_DEBIT_PAYMENT")
+        self.assertEqual(self.store.select_orders_to_validate("2026-10-10T12:00:00")[0]['checks'], 1)
+
+    def test_main_without_candidates_still_stores_a_summary(self):
+        self.now = datetime(2026, 11, 30, 12, 0)
+        client = MagicMock()
+
+        summary = self.run_main(client)
+
+        client.get_orders_by_ids.assert_not_called()
+        self.assertEqual((summary['checked'], summary['expired']), (0, 4))
+        self.assertEqual(json.loads(self.store.get_meta('last_shipped_validation_summary'))['expired'], 4)
+
+if __name__ == '__main__':
+    unittest.main()